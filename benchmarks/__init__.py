@@ -0,0 +1,9 @@
+"""Headless benchmarks for the terminal core.
+
+Run all of them with `python -m benchmarks` from the repository root.
+"""
+import os
+import sys
+
+# The terminal modules import each other as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'terminal'))
@@ -0,0 +1,54 @@
+import sys
+import json
+import argparse
+
+from benchmarks import bench_roundtrip, bench_throughput, bench_screen, bench_memory, bench_startup, bench_replay
+from benchmarks.common import work_directory
+
+
+BENCHMARKS = {
+    'roundtrip': bench_roundtrip,
+    'throughput': bench_throughput,
+    'screen': bench_screen,
+    'memory': bench_memory,
+    'startup': bench_startup,
+    'replay': bench_replay,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the headless terminal benchmarks')
+    parser.add_argument('names', nargs='*', help=f'benchmarks to run: {", ".join(BENCHMARKS)} (default: all)')
+    parser.add_argument('--json', action='store_true', help='print results as one JSON object')
+    parser.add_argument(
+        '--check', action='store_true',
+        help="exit with status 1 if a result is over its benchmark's BUDGETS"
+    )
+    args = parser.parse_args()
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f'unknown benchmarks: {", ".join(sorted(unknown))}')
+
+    work_directory()
+    results = {}
+    failures = []
+    for name in args.names or BENCHMARKS:
+        metrics = BENCHMARKS[name].run()
+        results.update(metrics)
+        for metric, budget in getattr(BENCHMARKS[name], 'BUDGETS', {}).items():
+            if metrics[metric] > budget:
+                failures.append(f'{metric} = {metrics[metric]:,.2f}, budget {budget:,}')
+        if not args.json:
+            for metric, value in metrics.items():
+                print(f'{metric:>24}: {value:,.2f}')
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    if args.check and failures:
+        for failure in failures:
+            print(f'over budget: {failure}', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
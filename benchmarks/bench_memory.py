@@ -0,0 +1,23 @@
+import gc
+
+from benchmarks.common import start_session, rss_kb
+from utils import child_pids
+
+
+def run(tabs=20):
+    """Memory per tab: app-side growth plus the RSS of each tab's shell"""
+    gc.collect()
+    before = rss_kb()
+    sessions = [start_session('/tmp') for _ in range(tabs)]
+    try:
+        gc.collect()
+        app_kb = (rss_kb() - before) / tabs
+        shell_kb = sum(rss_kb(s.shell.child.pid) for s in sessions) / tabs
+        # Anything the shells have started themselves
+        for session in sessions:
+            for pid in child_pids(session.shell.child.pid):
+                shell_kb += rss_kb(pid) / tabs
+    finally:
+        for session in sessions:
+            session.close()
+    return {'app_kb_per_tab': app_kb, 'shell_kb_per_tab': shell_kb}
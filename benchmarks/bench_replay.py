@@ -0,0 +1,52 @@
+import os
+import glob
+import time
+import tempfile
+
+from recording import Recorder, read_header, replay
+from renderer import screen_line
+from benchmarks.bench_screen import frame
+
+
+def record_corpus(path, frames=2000, rows=24, cols=80):
+    """Record a synthetic full-screen session; returns seconds spent recording"""
+    payloads = [frame(n, rows, cols) for n in range(frames)]
+    recorder = Recorder(path, cols, rows, 'benchmark')
+    start = time.perf_counter()
+    for payload in payloads:
+        recorder.output(payload)
+    elapsed = time.perf_counter() - start
+    recorder.close()
+    return elapsed
+
+
+def replay_throughput(path):
+    """Characters per second fed from a recording to a pyte screen and rendered"""
+    import pyte
+
+    header = read_header(path)
+    screen = pyte.Screen(header['width'], header['height'])
+    stream = pyte.Stream(screen)
+    start = time.perf_counter()
+    fed = replay(path, stream, screen)
+    for y in sorted(screen.dirty):
+        screen_line(screen, y)
+    return fed / (time.perf_counter() - start)
+
+
+def run(frames=2000):
+    """Cost of recording an event, and replay throughput of a recording.
+
+    Real recordings can be replayed too: OWL_BENCH_CASTS is a glob of .cast
+    files to use instead of the synthetic corpus.
+    """
+    directory = tempfile.mkdtemp(prefix='owl-cast-')
+    path = os.path.join(directory, 'synthetic.cast')
+    elapsed = record_corpus(path, frames)
+    pattern = os.environ.get('OWL_BENCH_CASTS')
+    paths = sorted(glob.glob(os.path.expanduser(pattern))) if pattern else [path]
+    rates = [replay_throughput(cast) for cast in paths]
+    return {
+        'record_event_us': elapsed / frames * 1e6,
+        'replay_mb_s': sum(rates) / len(rates) / (1024 * 1024),
+    }
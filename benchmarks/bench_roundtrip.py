@@ -0,0 +1,23 @@
+import time
+import statistics
+
+from benchmarks.common import start_session, wait_for
+
+
+def run(iterations=200):
+    """Latency from writing a trivial command to seeing it finish"""
+    session = start_session('/tmp')
+    samples = []
+    try:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            session.execute('true')
+            wait_for(session, 'done')
+            samples.append((time.perf_counter() - start) * 1000)
+    finally:
+        session.close()
+    samples.sort()
+    return {
+        'roundtrip_median_ms': statistics.median(samples),
+        'roundtrip_p95_ms': samples[int(len(samples) * 0.95) - 1],
+    }
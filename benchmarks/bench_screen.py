@@ -0,0 +1,28 @@
+import time
+
+from engine import TerminalSession
+from renderer import screen_line
+
+
+def frame(n, rows=24, cols=80):
+    """One full redraw of a top-like program: home, then every line rewritten"""
+    lines = [f'\x1b[{y + 1};1H{(str(n + y) * cols)[:cols]}' for y in range(rows)]
+    return '\x1b[H' + ''.join(lines)
+
+
+def run(frames=500):
+    """Screen updates per second: feeding frames and extracting the dirty lines"""
+    session = TerminalSession('/tmp')
+    session.sink.push('interactive', '\x1b[?1049h')
+    session.poll(1)
+    payloads = [frame(n) for n in range(frames)]
+    start = time.perf_counter()
+    for payload in payloads:
+        session.sink.push('screen', payload)
+        session.poll(len(payload))
+        screen = session.screen
+        for y in sorted(screen.dirty):
+            screen_line(screen, y)
+        screen.dirty.clear()
+    elapsed = time.perf_counter() - start
+    return {'screen_updates_per_s': frames / elapsed}
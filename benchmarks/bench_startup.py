@@ -0,0 +1,81 @@
+import os
+import sys
+import json
+import statistics
+import subprocess
+
+
+TERMINAL_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'terminal')
+# Modules that must not be imported before the first window draws
+DEFERRED_MODULES = (
+    'pexpect', 'pyte', 'cryptography', 'settings', 'tempfile', 'subprocess',
+    'model.suggest', 'model.assistant', 'assistant_pane', 'find', 'broadcast', 'recording',
+)
+
+# Startup regression budgets, checked by `python -m benchmarks startup --check`
+BUDGETS = {
+    'startup_import_ms': 150,
+    'startup_first_prompt_ms': 1500,
+    'startup_deferred_modules': 0,
+}
+
+IMPORT_SCRIPT = '''
+import sys, time, json
+start = time.perf_counter()
+import terminal_app
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps([elapsed, [m for m in %r if m in sys.modules]]))
+''' % (DEFERRED_MODULES,)
+
+PROMPT_SCRIPT = '''
+import time
+start = time.perf_counter()
+from benchmarks.common import start_session
+session = start_session('/tmp')
+print((time.perf_counter() - start) * 1000)
+session.close()
+'''
+
+
+def python(script, *options):
+    """Run a script in a fresh interpreter, as a cold start would"""
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [os.path.dirname(TERMINAL_DIRECTORY), TERMINAL_DIRECTORY]
+    ))
+    return subprocess.run(
+        [sys.executable, *options, '-c', script],
+        capture_output=True, text=True, check=True, env=environment
+    )
+
+
+def import_times():
+    """Cumulative `-X importtime` microseconds of the slowest top-level imports of terminal_app"""
+    result = python('import terminal_app', '-X', 'importtime')
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Two spaces of indent per nesting level; level one is imported by terminal_app
+        if len(name) - len(name.lstrip()) == 3:
+            times[name.strip()] = int(cumulative)
+    return sorted(times.items(), key=lambda item: -item[1])
+
+
+def run(iterations=5):
+    """Cold import time of the app, modules loaded too early, and time to the first prompt"""
+    import_samples = []
+    for _ in range(iterations):
+        elapsed, loaded = json.loads(python(IMPORT_SCRIPT).stdout)
+        import_samples.append(elapsed)
+    prompt_samples = [float(python(PROMPT_SCRIPT).stdout) for _ in range(iterations)]
+    if os.environ.get('OWL_BENCH_VERBOSE'):
+        for name, microseconds in import_times()[:10]:
+            print(f'{name:>24}: {microseconds / 1000:.1f} ms', file=sys.stderr)
+        if loaded:
+            print(f'imported too early: {", ".join(loaded)}', file=sys.stderr)
+    return {
+        'startup_import_ms': statistics.median(import_samples),
+        'startup_first_prompt_ms': statistics.median(prompt_samples),
+        'startup_deferred_modules': len(loaded),
+    }
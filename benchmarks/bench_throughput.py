@@ -0,0 +1,25 @@
+import time
+
+from benchmarks.common import start_session, wait_for
+
+
+def run(megabytes=64):
+    """Output throughput of a line-oriented command through the session"""
+    session = start_session('/tmp')
+    # Measure the pipeline rather than the spill-to-file fast path
+    session.sink.truncate_chars = float('inf')
+    received = 0
+
+    def count(kind, payload):
+        nonlocal received
+        if kind == 'output':
+            received += len(payload)
+
+    try:
+        start = time.perf_counter()
+        session.execute(f'yes 0123456789abcdef0123456789abcdef | head -c {megabytes * 1024 * 1024}')
+        wait_for(session, 'done', timeout=300, on_event=count)
+        elapsed = time.perf_counter() - start
+    finally:
+        session.close()
+    return {'throughput_mb_s': received / (1024 * 1024) / elapsed}
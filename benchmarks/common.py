@@ -0,0 +1,44 @@
+import os
+import time
+import tempfile
+
+from engine import TerminalSession
+
+
+POLL_BUDGET_CHARS = 64 * 1024
+
+
+def work_directory():
+    """Run from a scratch directory so cache files do not land in the repo"""
+    directory = tempfile.mkdtemp(prefix='owl-bench-')
+    os.chdir(directory)
+    return directory
+
+
+def start_session(current_directory, timeout=30):
+    """Start a terminal session and wait until its shell is ready"""
+    session = TerminalSession(current_directory).start()
+    wait_for(session, 'ready', timeout)
+    return session
+
+
+def wait_for(session, kind, timeout=30, on_event=None):
+    """Poll a session until it reports an event of `kind`; returns its payload"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for event_kind, payload in session.poll(POLL_BUDGET_CHARS):
+            if on_event is not None:
+                on_event(event_kind, payload)
+            if event_kind == kind:
+                return payload
+        time.sleep(0.0005)
+    raise TimeoutError(f'no {kind!r} event within {timeout}s')
+
+
+def rss_kb(pid='self'):
+    """Resident set size of a process in KiB"""
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
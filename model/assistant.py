@@ -0,0 +1,182 @@
+import os
+import json
+import asyncio
+import hashlib
+import threading
+
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+
+DEFAULT_URL = 'http://127.0.0.1:8765/v1/stream'
+# Responses kept in the cache
+MAX_CACHED_RESPONSES = 256
+# Characters of recent terminal output sent with a prompt
+CONTEXT_CHARS = 4000
+
+
+def cache_key(prompt, current_directory, recent_output):
+    """Key a response by prompt, cwd and a digest of the recent output"""
+    digest = hashlib.sha256()
+    for part in (prompt.strip(), current_directory, recent_output[-CONTEXT_CHARS:]):
+        digest.update(part.encode('utf-8', 'replace'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """LRU cache of complete responses, persisted to a (optionally encrypted) file"""
+
+    def __init__(self, path, cipher=None, max_entries=MAX_CACHED_RESPONSES):
+        self.path = path
+        self.cipher = cipher
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            if self.cipher is not None:
+                data = self.cipher.decrypt(data)
+            entries = json.loads(data)
+        except Exception:
+            return
+        for key, response in entries[-self.max_entries:]:
+            self._entries[key] = response
+
+    def get(self, key):
+        with self._lock:
+            response = self._entries.get(key)
+            if response is not None:
+                self._entries.move_to_end(key)
+            return response
+
+    def put(self, key, response):
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            data = json.dumps(list(self._entries.items())).encode()
+        if self.cipher is not None:
+            data = self.cipher.encrypt(data)
+        temporary = f'{self.path}.tmp'
+        try:
+            with open(temporary, 'wb') as f:
+                f.write(data)
+            os.replace(temporary, self.path)
+        except OSError:
+            pass
+
+
+class HttpBackend:
+    """Streams a response from an HTTP server speaking newline-delimited JSON.
+
+    The prompt is POSTed as {"prompt", "cwd", "output"}; the server answers
+    with one {"token": "..."} object per line, optionally ending with
+    {"error": "..."}. See model.stub_server for a local implementation.
+    """
+
+    def __init__(self, url=None):
+        self.url = url or os.environ.get('OWL_ASSISTANT_URL', DEFAULT_URL)
+
+    async def stream(self, prompt, current_directory, recent_output):
+        parts = urlsplit(self.url)
+        body = json.dumps({
+            'prompt': prompt,
+            'cwd': current_directory,
+            'output': recent_output[-CONTEXT_CHARS:],
+        }).encode()
+        reader, writer = await asyncio.open_connection(
+            parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80),
+            ssl=parts.scheme == 'https' or None
+        )
+        try:
+            writer.write(
+                f'POST {parts.path or "/"} HTTP/1.1\r\n'
+                f'Host: {parts.netloc}\r\n'
+                'Content-Type: application/json\r\n'
+                f'Content-Length: {len(body)}\r\n'
+                'Connection: close\r\n\r\n'.encode() + body
+            )
+            await writer.drain()
+            status = await reader.readline()
+            if b' 200 ' not in status:
+                raise ConnectionError(status.decode(errors='replace').strip() or 'no response')
+            while (await reader.readline()).strip():
+                pass
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                message = json.loads(line)
+                if 'error' in message:
+                    raise ConnectionError(message['error'])
+                yield message.get('token', '')
+        finally:
+            writer.close()
+
+
+class AssistantClient:
+    """Runs assistant requests on an asyncio loop in a background thread.
+
+    Events are passed to on_event(request_id, kind, payload) from that
+    thread: ('token', text) as text streams in, then exactly one of
+    ('done', cached), ('error', message) or ('cancelled', None).
+    """
+
+    def __init__(self, backend, cache, on_event):
+        self.backend = backend
+        self.cache = cache
+        self.on_event = on_event
+        self._next_id = 0
+        self._futures = {}
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name='owl-assistant', daemon=True).start()
+
+    def ask(self, prompt, current_directory, recent_output):
+        """Start a request and return its id without waiting"""
+        self._next_id += 1
+        request_id = self._next_id
+        self._futures[request_id] = asyncio.run_coroutine_threadsafe(
+            self._run(request_id, prompt, current_directory, recent_output), self._loop
+        )
+        return request_id
+
+    def cancel(self, request_id):
+        future = self._futures.get(request_id)
+        if future is not None:
+            future.cancel()
+
+    async def _run(self, request_id, prompt, current_directory, recent_output):
+        key = cache_key(prompt, current_directory, recent_output)
+        try:
+            response = self.cache.get(key)
+            if response is not None:
+                self.on_event(request_id, 'token', response)
+                self.on_event(request_id, 'done', True)
+                return
+            tokens = []
+            async for token in self.backend.stream(prompt, current_directory, recent_output):
+                tokens.append(token)
+                self.on_event(request_id, 'token', token)
+            if tokens:
+                await self._loop.run_in_executor(None, self.cache.put, key, ''.join(tokens))
+            self.on_event(request_id, 'done', False)
+        except asyncio.CancelledError:
+            self.on_event(request_id, 'cancelled', None)
+            raise
+        except Exception as e:
+            self.on_event(request_id, 'error', str(e) or e.__class__.__name__)
+        finally:
+            self._futures.pop(request_id, None)
+
+    def close(self):
+        for future in list(self._futures.values()):
+            future.cancel()
+        self._loop.call_soon_threadsafe(self._loop.stop)
@@ -0,0 +1,79 @@
+"""Local stand-in for the assistant backend, for development and tests.
+
+Run with `python -m model.stub_server [--port 8765] [--delay 0.03]` from
+the repository root. It speaks the protocol HttpBackend expects and
+streams a canned answer word by word, without any network access.
+"""
+import re
+import json
+import asyncio
+import argparse
+
+
+def answer(prompt, current_directory, output):
+    """A canned response that echoes what the request carried"""
+    lines = [f'You asked: {prompt.strip()}', f'Working directory: {current_directory}']
+    errors = [
+        line for line in output.splitlines()
+        if re.search(r'error|not found|denied|failed|traceback', line, re.IGNORECASE)
+    ]
+    if errors:
+        lines.append(f'The last error in the output was: {errors[-1].strip()}')
+        lines.append('This is the stub server; point OWL_ASSISTANT_URL at a real backend for explanations.')
+    else:
+        lines.append('No errors in the recent output. This is the stub server.')
+    return '\n'.join(lines) + '\n'
+
+
+async def handle(reader, writer, delay):
+    try:
+        headers = {}
+        request_line = await reader.readline()
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers.get('content-length', 0)))
+        if not request_line.startswith(b'POST '):
+            writer.write(b'HTTP/1.1 405 Method Not Allowed\r\nConnection: close\r\n\r\n')
+            return
+        request = json.loads(body or b'{}')
+        writer.write(
+            b'HTTP/1.1 200 OK\r\n'
+            b'Content-Type: application/x-ndjson\r\n'
+            b'Connection: close\r\n\r\n'
+        )
+        text = answer(request.get('prompt', ''), request.get('cwd', ''), request.get('output', ''))
+        for token in re.findall(r'\S+\s*', text):
+            writer.write(json.dumps({'token': token}).encode() + b'\n')
+            await writer.drain()
+            await asyncio.sleep(delay)
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host, port, delay):
+    server = await asyncio.start_server(lambda r, w: handle(r, w, delay), host, port)
+    print(f'Stub assistant listening on http://{host}:{port}/v1/stream')
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stub assistant backend')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0.03, help='seconds between tokens')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.delay))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
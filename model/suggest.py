@@ -0,0 +1,213 @@
+import os
+import json
+import zlib
+import shlex
+import threading
+
+from array import array
+
+
+# Followers kept per context; the least used one is replaced when full
+MAX_FOLLOWERS = 32
+# Context kinds, so token and command contexts never share a key
+NEXT_COMMAND, NEXT_TOKEN = 0, 1
+# Stands in for "no previous command" and "start of the line"
+START = '\x00'
+SNAPSHOT_VERSION = 1
+
+
+def tokenize(command):
+    try:
+        return shlex.split(command)
+    except ValueError:
+        return command.split()
+
+
+class CommandModel:
+    """Offline next-command and next-argument suggestions learned from history.
+
+    Two back-off n-gram models share one vocabulary of interned strings:
+    whole commands conditioned on (previous command, cwd), and tokens
+    conditioned on the two tokens before them. Each context maps to an
+    array('I') of interleaved (id, count) pairs kept sorted by count, so a
+    prediction is a short scan of at most MAX_FOLLOWERS entries.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._words = []
+        self._ids = {}
+        self._followers = {}
+        # Timestamp of the newest history record learned
+        self.trained_until = 0.0
+        self.learned = 0
+        self._intern(START)
+
+    def _intern(self, word):
+        word_id = self._ids.get(word)
+        if word_id is None:
+            word_id = self._ids[word] = len(self._words)
+            self._words.append(word)
+        return word_id
+
+    def _lookup(self, word):
+        return self._ids.get(word, -1)
+
+    def _count(self, key, word_id):
+        followers = self._followers.get(key)
+        if followers is None:
+            self._followers[key] = array('I', (word_id, 1))
+            return
+        for index in range(0, len(followers), 2):
+            if followers[index] == word_id:
+                followers[index + 1] += 1
+                # Bubble up to keep the pairs sorted by count
+                while index and followers[index - 1] < followers[index + 1]:
+                    followers[index - 2:index + 2] = array('I', (
+                        followers[index], followers[index + 1],
+                        followers[index - 2], followers[index - 1]
+                    ))
+                    index -= 2
+                return
+        if len(followers) < MAX_FOLLOWERS * 2:
+            followers.extend((word_id, 1))
+        else:
+            followers[-2:] = array('I', (word_id, 1))
+
+    def learn(self, command, current_directory, previous=None, timestamp=None):
+        """Update the model with one command as it is run"""
+        tokens = tokenize(command)
+        if not tokens:
+            return
+        with self._lock:
+            command_id = self._intern(command)
+            previous_id = self._intern(previous or START)
+            directory_id = self._intern(current_directory)
+            for key in self._command_contexts(previous_id, directory_id):
+                self._count(key, command_id)
+            before = (0, 0)
+            for token in tokens:
+                token_id = self._intern(token)
+                for key in self._token_contexts(*before):
+                    self._count(key, token_id)
+                before = (before[1], token_id)
+            self.learned += 1
+            if timestamp is not None:
+                self.trained_until = max(self.trained_until, timestamp)
+
+    def train(self, records):
+        """Learn (timestamp, cwd, command) records newer than the model, oldest first"""
+        previous = None
+        for timestamp, current_directory, command in records:
+            if timestamp > self.trained_until:
+                self.learn(command, current_directory, previous, timestamp)
+            previous = command
+
+    @staticmethod
+    def _command_contexts(previous_id, directory_id):
+        """Most to least specific"""
+        return (
+            (NEXT_COMMAND, previous_id, directory_id),
+            (NEXT_COMMAND, previous_id, -1),
+            (NEXT_COMMAND, -1, directory_id),
+            (NEXT_COMMAND, -1, -1),
+        )
+
+    @staticmethod
+    def _token_contexts(first_id, second_id):
+        return (
+            (NEXT_TOKEN, first_id, second_id),
+            (NEXT_TOKEN, -1, second_id),
+        )
+
+    def _best(self, keys, prefix):
+        """The most frequent follower in the first context that has one starting with prefix"""
+        words = self._words
+        for key in keys:
+            followers = self._followers.get(key)
+            if followers is None:
+                continue
+            for index in range(0, len(followers), 2):
+                word = words[followers[index]]
+                if word.startswith(prefix) and word != prefix:
+                    return word
+        return None
+
+    def predict(self, line, current_directory, previous=None):
+        """The text that most likely completes line, or ''"""
+        with self._lock:
+            command_keys = self._command_contexts(
+                self._lookup(previous or START), self._lookup(current_directory)
+            )
+            command = self._best(command_keys, line)
+            if command is not None:
+                return command[len(line):]
+            if not line.strip():
+                return ''
+            tokens = tokenize(line)
+            partial = '' if line[-1].isspace() else tokens.pop()
+            ids = [0, 0] + [self._lookup(token) for token in tokens]
+            token = self._best(self._token_contexts(ids[-2], ids[-1]), partial)
+            if token is None or ' ' in token:
+                return ''
+            return token[len(partial):]
+
+    def save(self, path, cipher=None):
+        """Snapshot the model to path as flat arrays, compressed and optionally encrypted"""
+        with self._lock:
+            keys = array('q')
+            offsets = array('I', [0])
+            data = array('I')
+            for key, followers in self._followers.items():
+                keys.extend(key)
+                data.extend(followers)
+                offsets.append(len(data))
+            header = json.dumps({
+                'version': SNAPSHOT_VERSION,
+                'trained_until': self.trained_until,
+                'words': self._words,
+            }).encode()
+        payload = b''.join(
+            len(part).to_bytes(8, 'little') + part
+            for part in (header, keys.tobytes(), offsets.tobytes(), data.tobytes())
+        )
+        payload = zlib.compress(payload)
+        if cipher is not None:
+            payload = cipher.encrypt(payload)
+        temporary = f'{path}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(payload)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path, cipher=None):
+        """Load a snapshot, or return an empty model if it is missing or unreadable"""
+        model = cls()
+        try:
+            with open(path, 'rb') as f:
+                payload = f.read()
+            if cipher is not None:
+                payload = cipher.decrypt(payload)
+            payload = zlib.decompress(payload)
+            parts = []
+            position = 0
+            while position < len(payload):
+                size = int.from_bytes(payload[position:position + 8], 'little')
+                parts.append(payload[position + 8:position + 8 + size])
+                position += 8 + size
+            header = json.loads(parts[0])
+            if header['version'] != SNAPSHOT_VERSION:
+                return model
+            keys = array('q', parts[1])
+            offsets = array('I', parts[2])
+            data = array('I', parts[3])
+        except Exception:
+            return model
+        model._words = header['words']
+        model._ids = {word: word_id for word_id, word in enumerate(model._words)}
+        model.trained_until = header['trained_until']
+        model._followers = {
+            tuple(keys[index * 3:index * 3 + 3]): data[offsets[index]:offsets[index + 1]]
+            for index in range(len(offsets) - 1)
+        }
+        return model
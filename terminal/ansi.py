@@ -0,0 +1,228 @@
+import re
+
+from tkinter.font import Font
+
+
+# Escape sequences: CSI (group 1 parameters, group 2 final byte), OSC, an
+# escape with intermediate bytes such as the charset designators ESC ( B
+# and ESC ) 0, or a two-character escape
+ESCAPE = re.compile(
+    r'\x1b(?:\[([0-9;:?<=>]*)[ -/]*([@-~])|\][^\x07\x1b]*(?:\x07|\x1b\\)|[ -/]+[0-~]|[0-Z\\^-~])'
+)
+# The start of a sequence cut off at the end of a chunk
+PARTIAL = re.compile(r'\x1b(?:\[[0-9;:?<=>]*[ -/]*|\][^\x07\x1b]*\x1b?|[ -/]+)?\Z')
+# Longest incomplete sequence held back between chunks before giving up on it
+MAX_PENDING = 4096
+# Distinct styles with a tag configured at once
+MAX_TAGS = 256
+
+PALETTE = [
+    '#000000', '#cd3131', '#0dbc79', '#e5e510', '#2472c8', '#bc3fbc', '#11a8cd', '#e5e5e5',
+    '#666666', '#f14c4c', '#23d18b', '#f5f543', '#3b8eea', '#d670d6', '#29b8db', '#ffffff',
+]
+
+
+def color_256(index):
+    if index < 16:
+        return PALETTE[index]
+    if index < 232:
+        index -= 16
+        levels = [0 if level == 0 else 55 + level * 40 for level in range(6)]
+        return f'#{levels[index // 36]:02x}{levels[index // 6 % 6]:02x}{levels[index % 6]:02x}'
+    gray = 8 + (index - 232) * 10
+    return f'#{gray:02x}{gray:02x}{gray:02x}'
+
+
+# A style is (foreground, background, bold, italic, underline, inverse);
+# None is the default style
+DEFAULT_STYLE = (None, None, False, False, False, False)
+
+
+class AnsiParser:
+    """Streaming parser splitting terminal output into (text, style) spans.
+
+    SGR sequences change the current style; every other escape sequence is
+    dropped. A sequence split across chunks is held back until the rest
+    arrives.
+    """
+
+    def __init__(self):
+        self.style = DEFAULT_STYLE
+        self._pending = ''
+        # (style, SGR parameters) -> resulting style
+        self._transitions = {}
+
+    def feed(self, text):
+        """Return [(text, style or None)] for a chunk of output"""
+        text = self._pending + text
+        self._pending = ''
+        style = self.style
+        if '\x1b' not in text:
+            return [(text, None if style == DEFAULT_STYLE else style)] if text else []
+        transitions = self._transitions
+        spans = []
+        position = 0
+        for match in ESCAPE.finditer(text):
+            start = match.start()
+            if start > position:
+                span = text[position:start]
+                current = None if style == DEFAULT_STYLE else style
+                if spans and spans[-1][1] == current:
+                    spans[-1] = (spans[-1][0] + span, current)
+                else:
+                    spans.append((span, current))
+            position = match.end()
+            if match.group(2) == 'm':
+                parameters = match.group(1)
+                following = transitions.get((style, parameters))
+                if following is None:
+                    following = transitions[(style, parameters)] = self._apply(style, parameters)
+                style = following
+        self.style = style
+        rest = text[position:]
+        escape = rest.rfind('\x1b', max(0, len(rest) - MAX_PENDING))
+        if escape != -1 and PARTIAL.match(rest, escape):
+            self._pending = rest[escape:]
+            rest = rest[:escape]
+        if rest:
+            spans.append((rest, None if style == DEFAULT_STYLE else style))
+        return spans
+
+    def reset(self):
+        self.style = DEFAULT_STYLE
+        self._pending = ''
+
+    def _apply(self, style, parameters):
+        """The style after an SGR sequence"""
+        if len(self._transitions) > 4096:
+            self._transitions.clear()
+        foreground, background, bold, italic, underline, inverse = style
+        codes = [int(code) if code.isdigit() else 0 for code in parameters.replace(':', ';').split(';')]
+        index = 0
+        while index < len(codes):
+            code = codes[index]
+            if code == 0:
+                foreground, background, bold, italic, underline, inverse = DEFAULT_STYLE
+            elif code == 1:
+                bold = True
+            elif code == 3:
+                italic = True
+            elif code == 4:
+                underline = True
+            elif code == 7:
+                inverse = True
+            elif code == 22:
+                bold = False
+            elif code == 23:
+                italic = False
+            elif code == 24:
+                underline = False
+            elif code == 27:
+                inverse = False
+            elif 30 <= code <= 37:
+                foreground = PALETTE[code - 30]
+            elif 90 <= code <= 97:
+                foreground = PALETTE[code - 82]
+            elif code == 39:
+                foreground = None
+            elif 40 <= code <= 47:
+                background = PALETTE[code - 40]
+            elif 100 <= code <= 107:
+                background = PALETTE[code - 92]
+            elif code == 49:
+                background = None
+            elif code in (38, 48) and index + 1 < len(codes):
+                color = None
+                if codes[index + 1] == 5 and index + 2 < len(codes):
+                    color = color_256(min(codes[index + 2], 255))
+                    index += 2
+                elif codes[index + 1] == 2 and index + 4 < len(codes):
+                    red, green, blue = (min(value, 255) for value in codes[index + 2:index + 5])
+                    color = f'#{red:02x}{green:02x}{blue:02x}'
+                    index += 4
+                if code == 38:
+                    foreground = color
+                else:
+                    background = color
+            index += 1
+        return (foreground, background, bold, italic, underline, inverse)
+
+
+class TagPool:
+    """Interns styles as Tk text tags, one reusable tag per distinct style.
+
+    At most max_tags tags exist at once. Tags whose text has left the
+    widget are deleted by collect(); when the pool is full of tags still
+    in use, new styles are shown unstyled rather than growing the pool.
+    """
+
+    def __init__(self, output_text, max_tags=MAX_TAGS, variant=None):
+        self.output_text = output_text
+        self.max_tags = max_tags
+        # Gives shared bold/italic fonts (see StyleRegistry.variant)
+        self.variant = variant
+        self._tags = {}
+        self._next = 0
+        self._fonts = {}
+
+    def __len__(self):
+        return len(self._tags)
+
+    def tag(self, style):
+        """The tag name for a style, or None for the default style"""
+        if style is None:
+            return None
+        tag = self._tags.get(style)
+        if tag is None:
+            if len(self._tags) >= self.max_tags and not self.collect():
+                return None
+            tag = f'sgr{self._next}'
+            self._next += 1
+            self._configure(tag, style)
+            self._tags[style] = tag
+        return tag
+
+    def _configure(self, tag, style):
+        foreground, background, bold, italic, underline, inverse = style
+        if inverse:
+            foreground, background = (
+                background or self.output_text.cget('bg'),
+                foreground or self.output_text.cget('fg'),
+            )
+        options = {}
+        if foreground:
+            options['foreground'] = foreground
+        if background:
+            options['background'] = background
+        if underline:
+            options['underline'] = True
+        if bold or italic:
+            options['font'] = self._font(bold, italic)
+        self.output_text.tag_configure(tag, **options)
+        # Selection and search highlights stay on top of output colors
+        self.output_text.tag_lower(tag)
+
+    def _font(self, bold, italic):
+        if self.variant is not None:
+            return self.variant(bold, italic)
+        font = self._fonts.get((bold, italic))
+        if font is None:
+            font = Font(font=self.output_text.cget('font'))
+            font.configure(weight='bold' if bold else 'normal', slant='italic' if italic else 'roman')
+            self._fonts[(bold, italic)] = font
+        return font
+
+    def collect(self):
+        """Delete tags no longer used by any text; returns how many were deleted"""
+        unused = [
+            style for style, tag in self._tags.items()
+            if not self.output_text.tag_nextrange(tag, '1.0')
+        ]
+        for style in unused:
+            self.output_text.tag_delete(self._tags.pop(style))
+        return len(unused)
+
+    def clear(self):
+        for tag in self._tags.values():
+            self.output_text.tag_delete(tag)
+        self._tags = {}
@@ -0,0 +1,125 @@
+from collections import deque
+from tkinter import Frame, Text, Entry, Button, Label, END
+
+
+# How often streamed tokens are moved into the pane
+POLL_MS = 30
+
+
+class AssistantPane:
+    """Side pane that streams OwlAI answers about the current tab.
+
+    The client calls on_event from its own thread; events are queued and
+    drained on the Tk thread, so the UI never waits on the backend.
+    """
+
+    def __init__(self, root, parent, get_context, styles):
+        self.root = root
+        self.get_context = get_context
+        self.client = None
+        self.request_id = None
+        self._events = deque()
+        self._polling = False
+
+        font = styles.fonts['output']
+        self.frame = styles.register(Frame(parent, width=320), 'frame')
+        self.title = Label(
+            self.frame,
+            text='🦉 OwlAI',
+            font=('Arial', 12)
+        )
+        styles.register(self.title, 'label')
+        self.title.pack(anchor='w', padx=10, pady=(10, 0))
+        self.output_text = Text(
+            self.frame,
+            wrap='word',
+            width=40,
+            font=font,
+            relief='flat',
+            highlightthickness=0,
+            state='disabled'
+        )
+        styles.register(self.output_text, 'output')
+        self.output_text.pack(fill='both', expand=True, padx=10, pady=10)
+
+        controls = styles.register(Frame(self.frame), 'frame')
+        controls.pack(fill='x', padx=10, pady=(0, 10))
+        self.entry = Entry(
+            controls,
+            font=font,
+            relief='flat',
+            highlightthickness=0
+        )
+        styles.register(self.entry, 'entry')
+        self.entry.pack(side='left', fill='x', expand=True, ipady=3)
+        self.entry.insert(0, 'Explain the last error')
+        self.ask_button = Button(controls, text='Ask', command=self.ask, relief='flat')
+        self.ask_button.pack(side='left', padx=(5, 0))
+        self.stop_button = Button(
+            controls, text='Stop', command=self.stop, relief='flat', state='disabled'
+        )
+        self.stop_button.pack(side='left', padx=(5, 0))
+        self.entry.bind('<Return>', lambda event: self.ask())
+        self.entry.bind('<Escape>', lambda event: self.stop())
+
+    @property
+    def visible(self):
+        return self.frame.winfo_ismapped()
+
+    def show(self, before):
+        self.frame.pack(side='right', fill='y', before=before)
+        self.entry.focus_set()
+
+    def hide(self):
+        self.stop()
+        self.frame.pack_forget()
+
+    def on_event(self, request_id, kind, payload):
+        """Called from the client's thread"""
+        self._events.append((request_id, kind, payload))
+
+    def write(self, text):
+        self.output_text.config(state='normal')
+        self.output_text.insert(END, text)
+        self.output_text.config(state='disabled')
+        self.output_text.see(END)
+
+    def ask(self):
+        prompt = self.entry.get().strip()
+        if not prompt or self.client is None:
+            return
+        self.stop()
+        current_directory, recent_output = self.get_context()
+        self.write(f'\n> {prompt}\n')
+        self.request_id = self.client.ask(prompt, current_directory, recent_output)
+        self.stop_button.config(state='normal')
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_MS, self.drain)
+
+    def stop(self):
+        """Cancel the request that is streaming, if any"""
+        if self.request_id is not None:
+            self.client.cancel(self.request_id)
+            self.request_id = None
+            self.write('\n[stopped]\n')
+            self.stop_button.config(state='disabled')
+
+    def drain(self):
+        while self._events:
+            request_id, kind, payload = self._events.popleft()
+            # Events from cancelled requests may still arrive
+            if request_id != self.request_id:
+                continue
+            if kind == 'token':
+                self.write(payload)
+            else:
+                if kind == 'error':
+                    self.write(f'\n[error: {payload}]\n')
+                elif kind == 'done' and payload:
+                    self.write('\n[cached]\n')
+                self.request_id = None
+                self.stop_button.config(state='disabled')
+        self._polling = self.request_id is not None
+        if self._polling:
+            self.root.after(POLL_MS, self.drain)
@@ -0,0 +1,428 @@
+import os
+import glob
+import time
+import queue
+import shutil
+import signal
+import codecs
+import threading
+
+from collections import deque
+from tkinter import Toplevel, Frame, Label, Entry, Text, Listbox, Spinbox, Button, Scrollbar
+from tkinter import END, MULTIPLE, StringVar
+
+from ansi import ESCAPE, PALETTE
+from session_store import saved_environment
+
+
+# Commands run at once unless the dialog says otherwise
+DEFAULT_PARALLELISM = 8
+MAX_PARALLELISM = 64
+# Output shown per target; the rest is counted and dropped
+MAX_TARGET_CHARS = 1024 * 1024
+READ_SIZE = 64 * 1024
+# How often, and how much, output is moved into the combined view
+POLL_MS = 30
+CHARS_PER_POLL = 64 * 1024
+# Bright palette entries used to tell the targets apart
+LABEL_COLORS = PALETTE[9:15]
+
+
+class Target:
+    """One directory a broadcast command runs in, and how it went"""
+
+    __slots__ = ('label', 'directory', 'environment', 'status', 'exit_code', 'started', 'finished', 'dropped')
+
+    def __init__(self, label, directory, environment=None):
+        self.label = label
+        self.directory = directory
+        self.environment = environment
+        # queued, running, ok, failed, error or cancelled
+        self.status = 'queued'
+        self.exit_code = None
+        self.started = None
+        self.finished = None
+        self.dropped = 0
+
+    @property
+    def failed(self):
+        return self.status in ('failed', 'error', 'cancelled')
+
+    @property
+    def duration(self):
+        if self.started is None:
+            return None
+        return (self.finished or time.monotonic()) - self.started
+
+
+def directory_targets(patterns):
+    """Targets for directory patterns such as ~/src/*, skipping non-directories"""
+    targets = []
+    for pattern in patterns:
+        pattern = os.path.expanduser(pattern.strip())
+        if not pattern:
+            continue
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            if os.path.isdir(path):
+                targets.append(Target(os.path.basename(os.path.normpath(path)) or path, path))
+    return targets
+
+
+def unique_targets(targets):
+    """Drop targets repeating a directory and disambiguate repeated labels"""
+    seen = set()
+    unique = []
+    for target in targets:
+        directory = os.path.realpath(target.directory)
+        if directory not in seen:
+            seen.add(directory)
+            unique.append(target)
+    counts = {}
+    for target in unique:
+        counts[target.label] = counts.get(target.label, 0) + 1
+    home = os.path.expanduser('~')
+    for target in unique:
+        if counts[target.label] > 1:
+            directory = target.directory
+            target.label = '~' + directory[len(home):] if directory.startswith(home) else directory
+    return unique
+
+
+class Broadcast:
+    """Runs one command in many directories on a bounded pool of workers.
+
+    At most `parallelism` commands run at once, each in its own process
+    group with stdin closed. Worker threads queue ('output', target, lines)
+    and ('status', target) events in `events`, to be drained on the Tk
+    thread.
+    """
+
+    def __init__(self, command, targets, parallelism=DEFAULT_PARALLELISM):
+        self.command = command
+        self.targets = list(targets)
+        self.parallelism = max(1, min(parallelism, MAX_PARALLELISM))
+        self.events = deque()
+        self.cancelled = False
+        self.started = None
+        self.finished = None
+        self._queue = queue.Queue()
+        self._processes = {}
+        self._lock = threading.Lock()
+        self._running = 0
+        self._shell = shutil.which('bash') or '/bin/sh'
+
+    @property
+    def done(self):
+        return self.finished is not None
+
+    def start(self):
+        self.started = time.monotonic()
+        for target in self.targets:
+            self._queue.put(target)
+        self._running = min(self.parallelism, len(self.targets))
+        if not self._running:
+            self.finished = self.started
+        for number in range(self._running):
+            threading.Thread(target=self._work, name=f'owl-broadcast-{number}', daemon=True).start()
+        return self
+
+    def cancel(self):
+        """Stop queued targets from starting and terminate the running ones"""
+        with self._lock:
+            self.cancelled = True
+            processes = list(self._processes.values())
+        for process in processes:
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+    def _work(self):
+        try:
+            while True:
+                try:
+                    target = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if self.cancelled:
+                    target.status = 'cancelled'
+                    self.events.append(('status', target))
+                    continue
+                self._run(target)
+        finally:
+            # Whatever happened to this worker, the broadcast still finishes
+            with self._lock:
+                self._running -= 1
+                if not self._running:
+                    self.finished = time.monotonic()
+                    self.events.append(('finished', None))
+
+    def _run(self, target):
+        import subprocess
+
+        target.started = time.monotonic()
+        target.status = 'running'
+        self.events.append(('status', target))
+        try:
+            process = subprocess.Popen(
+                [self._shell, '-c', self.command],
+                cwd=target.directory,
+                env=target.environment,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+            )
+        except OSError as error:
+            target.finished = time.monotonic()
+            target.status = 'error'
+            self.events.append(('output', target, f'{error}\n'))
+            self.events.append(('status', target))
+            return
+        with self._lock:
+            self._processes[target] = process
+            cancelled = self.cancelled
+        if cancelled:
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+            except OSError:
+                pass
+        decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        partial = ''
+        shown = 0
+        descriptor = process.stdout.fileno()
+        while True:
+            data = os.read(descriptor, READ_SIZE)
+            if not data:
+                break
+            text = partial + decoder.decode(data)
+            # A progress bar redrawn with \r never ends its line
+            end = len(text) if len(text) > READ_SIZE else text.rfind('\n') + 1
+            partial = text[end:]
+            if not end:
+                continue
+            lines = ESCAPE.sub('', text[:end])
+            if not lines.endswith('\n'):
+                lines += '\n'
+            if shown + len(lines) > MAX_TARGET_CHARS:
+                target.dropped += len(lines)
+                continue
+            shown += len(lines)
+            self.events.append(('output', target, lines))
+        partial = ESCAPE.sub('', partial + decoder.decode(b'', final=True))
+        if partial:
+            self.events.append(('output', target, partial + '\n'))
+        process.stdout.close()
+        target.exit_code = process.wait()
+        target.finished = time.monotonic()
+        with self._lock:
+            del self._processes[target]
+        if self.cancelled and target.exit_code < 0:
+            target.status = 'cancelled'
+        else:
+            target.status = 'ok' if target.exit_code == 0 else 'failed'
+        self.events.append(('status', target))
+
+    def counts(self):
+        """Number of targets in each status"""
+        counts = {}
+        for target in self.targets:
+            counts[target.status] = counts.get(target.status, 0) + 1
+        return counts
+
+    def summary(self):
+        """A table of every target's status, duration and exit code"""
+        width = max([len(target.label) for target in self.targets] + [6])
+        lines = [f'{"target":<{width}}  {"status":<9}  {"time":>8}  exit']
+        for target in self.targets:
+            duration = f'{target.duration:.1f}s' if target.duration is not None else '–'
+            exit_code = '' if target.exit_code is None else str(target.exit_code)
+            dropped = f'  ({target.dropped:,} characters not shown)' if target.dropped else ''
+            lines.append(f'{target.label:<{width}}  {target.status:<9}  {duration:>8}  {exit_code}{dropped}')
+        return '\n'.join(lines) + '\n'
+
+
+class BroadcastDialog:
+    """Chooses the command, tabs, directories and parallelism of a broadcast"""
+
+    def __init__(self, app):
+        self.app = app
+        styles = app.styles
+        self.window = styles.register(Toplevel(app.root), 'frame')
+        self.window.title('Broadcast Command')
+        self.window.geometry('520x480')
+
+        Label(self.window, text='Command:', font=('Arial', 10)).pack(anchor='w', padx=10, pady=(10, 0))
+        self.command = Entry(self.window, font=styles.fonts['entry'], relief='flat')
+        styles.register(self.command, 'entry')
+        self.command.pack(fill='x', padx=10, pady=5, ipady=3)
+        current = app.current_tab()
+        if current is not None and current.materialized:
+            self.command.insert(0, current.entry.get())
+
+        Label(self.window, text='Tabs:', font=('Arial', 10)).pack(anchor='w', padx=10)
+        self.tab_list = Listbox(self.window, selectmode=MULTIPLE, height=8, exportselection=False)
+        styles.register(self.tab_list, 'label')
+        self.tab_list.pack(fill='x', padx=10, pady=5)
+        self.tabs = []
+        for tab_name in app.notebook.tabs():
+            tab = app.tabs.get(str(tab_name))
+            if tab is None:
+                continue
+            title = app.notebook.tab(tab_name, 'text').rstrip(' ×')
+            self.tab_list.insert(END, f'{title} — {tab.current_directory}')
+            if tab is current:
+                self.tab_list.selection_set(len(self.tabs))
+            self.tabs.append((title, tab))
+
+        Label(
+            self.window, text='Directories (one per line, * patterns allowed):', font=('Arial', 10)
+        ).pack(anchor='w', padx=10)
+        self.directories = Text(self.window, height=6, font=styles.fonts['entry'], relief='flat')
+        styles.register(self.directories, 'entry')
+        self.directories.pack(fill='both', expand=True, padx=10, pady=5)
+
+        controls = styles.register(Frame(self.window), 'frame')
+        controls.pack(fill='x', padx=10, pady=10)
+        Label(controls, text='Run at once:', font=('Arial', 10)).pack(side='left')
+        self.parallelism = StringVar(value=str(app.broadcast_parallelism or DEFAULT_PARALLELISM))
+        Spinbox(
+            controls, from_=1, to=MAX_PARALLELISM, width=4, textvariable=self.parallelism
+        ).pack(side='left', padx=5)
+        Button(controls, text='Run', relief='flat', command=self.run).pack(side='right')
+        self.message = Label(controls, font=('Arial', 10))
+        self.message.pack(side='right', padx=10)
+        for widget in self.window.winfo_children() + controls.winfo_children():
+            if isinstance(widget, Label):
+                styles.register(widget, 'label')
+
+        self.command.bind('<Return>', lambda event: self.run())
+        self.window.bind('<Escape>', lambda event: self.window.destroy())
+        self.command.focus_set()
+
+    def targets(self):
+        targets = []
+        for index in self.tab_list.curselection():
+            title, tab = self.tabs[index]
+            environment = dict(os.environ, **saved_environment(tab.session))
+            targets.append(Target(title, tab.current_directory, environment))
+        targets.extend(directory_targets(self.directories.get('1.0', END).splitlines()))
+        return unique_targets(targets)
+
+    def run(self):
+        command = self.command.get().strip()
+        try:
+            parallelism = int(self.parallelism.get())
+        except ValueError:
+            parallelism = DEFAULT_PARALLELISM
+        targets = self.targets()
+        if not command or not targets:
+            self.message.config(text='Enter a command and choose tabs or directories')
+            return 'break'
+        self.app.broadcast_parallelism = parallelism
+        self.window.destroy()
+        BroadcastWindow(self.app.root, Broadcast(command, targets, parallelism).start(), self.app.styles)
+        return 'break'
+
+
+class BroadcastWindow:
+    """Combined view of a broadcast: every target's output, labelled, then a summary"""
+
+    def __init__(self, root, broadcast, styles):
+        self.root = root
+        self.broadcast = broadcast
+        self.window = styles.register(Toplevel(root), 'frame')
+        self.window.title(f'Broadcast: {broadcast.command}')
+        self.window.geometry('900x600')
+
+        controls = styles.register(Frame(self.window), 'frame')
+        controls.pack(fill='x', padx=10, pady=(10, 0))
+        self.status_label = Label(controls, font=('Arial', 10), anchor='w')
+        styles.register(self.status_label, 'label')
+        self.status_label.pack(side='left', fill='x', expand=True)
+        self.stop_button = Button(controls, text='Stop', relief='flat', command=broadcast.cancel)
+        self.stop_button.pack(side='right')
+
+        self.output_text = Text(
+            self.window, wrap='none', font=styles.fonts['output'], relief='flat', highlightthickness=0
+        )
+        styles.register(self.output_text, 'output')
+        scrollbar = Scrollbar(self.output_text, command=self.output_text.yview)
+        self.output_text.config(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side='right', fill='y')
+        self.output_text.pack(fill='both', expand=True, padx=10, pady=10)
+
+        self.width = max(len(target.label) for target in broadcast.targets)
+        self.label_tags = {}
+        for index, target in enumerate(broadcast.targets):
+            tag = f'target{index}'
+            self.output_text.tag_configure(tag, foreground=LABEL_COLORS[index % len(LABEL_COLORS)])
+            self.label_tags[target] = tag
+        self.output_text.tag_configure('failed', foreground=PALETTE[9])
+        self.output_text.insert(
+            END, f'$ {broadcast.command}  ({len(broadcast.targets)} targets, '
+                 f'{broadcast.parallelism} at once)\n\n'
+        )
+        self.window.protocol('WM_DELETE_WINDOW', self.close)
+        self.update_status()
+        self.root.after(POLL_MS, self.poll)
+
+    def poll(self):
+        """Insert the queued output, joining each batch into one Text insert"""
+        if not self.window.winfo_exists():
+            return
+        events = self.broadcast.events
+        budget = CHARS_PER_POLL
+        pieces = []
+        finished = False
+        while events and budget > 0:
+            event = events.popleft()
+            if event[0] == 'output':
+                _, target, text = event
+                tag = self.label_tags[target]
+                prefix = f'{target.label:<{self.width}} │ '
+                for line in text.splitlines(True):
+                    pieces.extend((prefix, tag, line, ''))
+                budget -= len(text)
+            elif event[0] == 'status' and event[1].failed:
+                target = event[1]
+                pieces.extend((
+                    f'{target.label:<{self.width}} │ ', self.label_tags[target],
+                    f'[{target.status}{"" if target.exit_code is None else f", exit {target.exit_code}"}]\n', 'failed'
+                ))
+            elif event[0] == 'finished':
+                finished = True
+        if pieces:
+            at_end = self.output_text.yview()[1] >= 1.0
+            self.output_text.insert(END, *pieces)
+            if at_end:
+                self.output_text.see(END)
+        self.update_status()
+        if finished:
+            self.show_summary()
+        else:
+            self.root.after(POLL_MS, self.poll)
+
+    def update_status(self):
+        broadcast = self.broadcast
+        counts = broadcast.counts()
+        finished = len(broadcast.targets) - counts.get('queued', 0) - counts.get('running', 0)
+        parts = [f'{finished}/{len(broadcast.targets)} done']
+        for status in ('running', 'ok', 'failed', 'error', 'cancelled'):
+            if counts.get(status):
+                parts.append(f'{counts[status]} {status}')
+        if broadcast.started is not None:
+            finished_at = broadcast.finished or time.monotonic()
+            parts.append(f'{finished_at - broadcast.started:.1f}s')
+        self.status_label.config(text='  ·  '.join(parts))
+
+    def show_summary(self):
+        self.stop_button.config(state='disabled')
+        self.output_text.insert(END, '\n' + self.broadcast.summary())
+        self.output_text.see(END)
+
+    def close(self):
+        if not self.broadcast.done:
+            self.broadcast.cancel()
+        self.window.destroy()
+
@@ -0,0 +1,76 @@
+import os
+import json
+
+
+def get_cache_directory(*parts):
+    """Get the cache directory (default: .secret_owl in the app directory).
+
+    Extra path parts name a subdirectory, which is created on demand.
+    """
+    cache_dir = os.path.join(os.getcwd(), '.secret_owl', *parts)
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+    return cache_dir
+
+
+def load_or_generate_key():
+    """Load or generate the Fernet key used to encrypt cache data."""
+    from cryptography.fernet import Fernet
+
+    key_file = os.path.join(get_cache_directory(), 'encryption_key.key')
+    if os.path.exists(key_file):
+        with open(key_file, 'rb') as f:
+            return f.read()
+    key = Fernet.generate_key()
+    with open(key_file, 'wb') as f:
+        f.write(key)
+    return key
+
+
+def get_cipher():
+    """Get a Fernet cipher using the cache encryption key."""
+    from cryptography.fernet import Fernet
+
+    return Fernet(load_or_generate_key())
+
+
+def get_existing_cipher():
+    """Get the Fernet cipher if a cache encryption key exists, without creating one."""
+    if not os.path.exists(os.path.join(get_cache_directory(), 'encryption_key.key')):
+        return None
+    return get_cipher()
+
+
+def load_secure_settings():
+    """Load the settings saved by the settings window, or {} if there are none."""
+    secure_settings_file = os.path.join(get_cache_directory(), 'secure_settings.enc')
+    if not os.path.exists(secure_settings_file):
+        return {}
+    with open(secure_settings_file, 'rb') as f:
+        encrypted_data = f.read()
+    try:
+        return json.loads(get_cipher().decrypt(encrypted_data))
+    except Exception:
+        return {}
+
+
+def load_preferences():
+    """Load the display preferences, e.g. the theme, or {} if there are none.
+
+    They are not secret, so they are kept in plain JSON that can be read
+    before the window is first drawn.
+    """
+    preferences_file = os.path.join(get_cache_directory(), 'preferences.json')
+    try:
+        with open(preferences_file) as f:
+            preferences = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return preferences if isinstance(preferences, dict) else {}
+
+
+def save_preferences(preferences):
+    """Save the display preferences for the next start."""
+    preferences_file = os.path.join(get_cache_directory(), 'preferences.json')
+    with open(preferences_file, 'w') as f:
+        json.dump(preferences, f)
@@ -0,0 +1,282 @@
+import os
+import time
+import queue
+import threading
+
+from bisect import bisect_left
+from collections import OrderedDict
+
+from shell_builtins import BUILTINS
+
+
+# Directory listings kept in the LRU cache
+MAX_CACHED_DIRECTORIES = 256
+# Cached listings and PATH directories are re-stat'ed at most this often,
+# so a slow (e.g. NFS) file system is not hit on every keystroke
+REVALIDATE_SECONDS = 2.0
+# Candidates returned for one completion
+MAX_CANDIDATES = 200
+
+# Flags offered after `-` for common commands
+COMMON_FLAGS = {
+    'ls': ['-a', '-l', '-h', '-t', '-r', '-R', '-S', '-1', '--color=auto'],
+    'grep': ['-r', '-i', '-n', '-v', '-l', '-c', '-w', '-E', '-F', '--include=', '--exclude='],
+    'rm': ['-r', '-f', '-i', '-v'],
+    'cp': ['-r', '-a', '-v', '-i', '-n'],
+    'mv': ['-v', '-i', '-n', '-f'],
+    'mkdir': ['-p', '-v'],
+    'tar': ['-x', '-c', '-z', '-j', '-v', '-f', '-t', '-C'],
+    'find': ['-name', '-iname', '-type', '-maxdepth', '-mtime', '-size', '-exec', '-delete'],
+    'git': ['--version', '--help', '-C'],
+    'ps': ['aux', '-e', '-f', '-u'],
+    'du': ['-h', '-s', '-a', '-c', '--max-depth='],
+    'df': ['-h', '-T', '-i'],
+    'tail': ['-f', '-n', '-F'],
+    'head': ['-n', '-c'],
+    'python': ['-m', '-c', '-u', '-V'],
+    'python3': ['-m', '-c', '-u', '-V'],
+    'pip': ['install', 'uninstall', 'list', 'show', 'freeze'],
+}
+
+# Words offered after these commands instead of file names
+SUBCOMMANDS = {
+    'git': [
+        'add', 'branch', 'checkout', 'cherry-pick', 'clone', 'commit', 'diff',
+        'fetch', 'init', 'log', 'merge', 'pull', 'push', 'rebase', 'reset',
+        'restore', 'show', 'stash', 'status', 'switch', 'tag',
+    ],
+}
+
+
+def _prefixed(names, prefix):
+    """The names in a sorted list that start with prefix"""
+    start = bisect_left(names, prefix)
+    matches = []
+    for name in names[start:start + MAX_CANDIDATES]:
+        if not name.startswith(prefix):
+            break
+        matches.append(name)
+    return matches
+
+
+class BackgroundLoader:
+    """One daemon thread running slow loads so the Tk thread never blocks"""
+
+    def __init__(self, name):
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, name=name, daemon=True).start()
+
+    def submit(self, key, function):
+        """Queue function() unless a load for key is already queued"""
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+        self._queue.put((key, function))
+
+    def _run(self):
+        while True:
+            key, function = self._queue.get()
+            try:
+                function()
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+
+class PathIndex:
+    """Sorted names of the executables on $PATH, rebuilt in the background.
+
+    Each PATH directory is listed once and kept with its mtime; a refresh
+    re-lists only the directories whose mtime changed.
+    """
+
+    def __init__(self, loader, path=None):
+        self._loader = loader
+        self._directories = {}
+        self._path = None
+        self._checked_at = 0.0
+        self.names = []
+        self.set_path(os.environ.get('PATH', '') if path is None else path)
+
+    def set_path(self, path):
+        """Use a new $PATH value, e.g. after the shell exported one"""
+        if path != self._path:
+            self._path = path
+            self._checked_at = 0.0
+            self.refresh()
+
+    def refresh(self):
+        """Re-check the PATH directories in the background"""
+        path = self._path
+        self._loader.submit(('path', path), lambda: self._build(path))
+
+    def executables(self, prefix):
+        """Matching executable names; never touches the disk"""
+        if time.monotonic() - self._checked_at > REVALIDATE_SECONDS:
+            self._checked_at = time.monotonic()
+            self.refresh()
+        return _prefixed(self.names, prefix)
+
+    def _build(self, path):
+        directories = {}
+        for directory in dict.fromkeys(filter(None, path.split(os.pathsep))):
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                continue
+            cached = self._directories.get(directory)
+            if cached is not None and cached[0] == mtime:
+                directories[directory] = cached
+                continue
+            names = []
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_file() and os.access(entry.path, os.X_OK):
+                                names.append(entry.name)
+                        except OSError:
+                            pass
+            except OSError:
+                continue
+            directories[directory] = (mtime, names)
+        if path != self._path:
+            return
+        self._directories = directories
+        self.names = sorted({name for _, names in directories.values() for name in names})
+
+
+class DirectoryCache:
+    """LRU cache of sorted directory listings keyed by (path, mtime).
+
+    listing() answers from the cache, or returns None and loads the
+    directory in the background.
+    """
+
+    def __init__(self, loader, max_entries=MAX_CACHED_DIRECTORIES):
+        self._loader = loader
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        # path -> (mtime, checked_at, names, directory names)
+        self._entries = OrderedDict()
+
+    def listing(self, path):
+        """(names, directory names) for path, or None while it loads"""
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None:
+                self._entries.move_to_end(path)
+        if cached is None:
+            self._loader.submit(('dir', path), lambda: self._load(path))
+            return None
+        if time.monotonic() - cached[1] > REVALIDATE_SECONDS:
+            self._loader.submit(('dir', path), lambda: self._load(path, cached[0]))
+        return cached[2], cached[3]
+
+    def _load(self, path, known_mtime=None):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime is not None and mtime == known_mtime:
+            with self._lock:
+                cached = self._entries.get(path)
+                if cached is not None:
+                    self._entries[path] = (mtime, time.monotonic()) + cached[2:]
+            return
+        names = []
+        directories = set()
+        if mtime is not None:
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        names.append(entry.name)
+                        try:
+                            if entry.is_dir():
+                                directories.add(entry.name)
+                        except OSError:
+                            pass
+            except OSError:
+                pass
+        names.sort()
+        with self._lock:
+            self._entries[path] = (mtime, time.monotonic(), names, directories)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+
+class Completer:
+    """Tab completion of commands, paths and common flags for a command line"""
+
+    def __init__(self, path=None):
+        loader = BackgroundLoader('owl-completion')
+        self.path_index = PathIndex(loader, path)
+        self.directories = DirectoryCache(loader)
+
+    def complete(self, line, current_directory):
+        """Complete the last word of line.
+
+        Returns (start, candidates) where start is the index in line where
+        the word begins, or None if a directory listing is still loading.
+        Directory candidates end with '/'.
+        """
+        start = _word_start(line)
+        word = line[start:]
+        words = line[:start].split()
+        if not words:
+            if '/' not in word:
+                return start, self._commands(word)
+        elif word.startswith('-'):
+            return start, [flag for flag in COMMON_FLAGS.get(words[0], []) if flag.startswith(word)]
+        elif len(words) == 1 and words[0] in SUBCOMMANDS and '/' not in word:
+            return start, [name for name in SUBCOMMANDS[words[0]] if name.startswith(word)]
+        paths = self._paths(word, current_directory)
+        if paths is None:
+            return None
+        return start, paths
+
+    def _commands(self, prefix):
+        names = set(self.path_index.executables(prefix))
+        names.update(name for name in BUILTINS if name.startswith(prefix))
+        return sorted(names)
+
+    def _paths(self, word, current_directory):
+        typed = word.replace('\\ ', ' ')
+        head, _, prefix = typed.rpartition('/')
+        if '/' in typed:
+            directory = os.path.expanduser(head or '/')
+        else:
+            directory = ''
+        directory = os.path.join(current_directory, directory)
+        listing = self.directories.listing(os.path.normpath(directory))
+        if listing is None:
+            return None
+        names, directories = listing
+        if not prefix.startswith('.'):
+            names = [name for name in names if not name.startswith('.')]
+        base = head + '/' if '/' in typed else ''
+        candidates = []
+        for name in _prefixed(names, prefix) if prefix else names[:MAX_CANDIDATES]:
+            candidate = (base + name).replace(' ', '\\ ')
+            candidates.append(candidate + '/' if name in directories else candidate)
+        return candidates
+
+
+def _word_start(line):
+    """Index where the last unescaped-space-separated word of line starts"""
+    index = len(line)
+    while index > 0:
+        if line[index - 1] == ' ' and not (index > 1 and line[index - 2] == '\\'):
+            break
+        index -= 1
+    return index
+
+
+def common_prefix(candidates):
+    return os.path.commonprefix(candidates) if candidates else ''
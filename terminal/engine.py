@@ -0,0 +1,273 @@
+import time
+import shlex
+import threading
+
+from collections import deque
+
+from sink import OutputSink
+from metrics import CommandTiming
+from shell import ShellSession
+from utils import classify_command
+from renderer import screen_text
+from jobs import JobTable, MAX_JOBS, is_job_command, run_job_command
+from shell_builtins import run_builtin, may_change_shell_state, parse_variables, DUMP_VARIABLES
+
+
+class TerminalSession:
+    """The UI-independent core of a terminal tab.
+
+    Owns the tab's shell, output sink, working directory, command history
+    and, while an interactive command runs, its pyte screen. A front end
+    calls `execute`, `send`, `interrupt` and `resize`, and periodically
+    calls `poll` to get the events to display; `poll` has already applied
+    them to the session state (directory, screen) by the time it returns.
+
+    Common builtins (see shell_builtins) run in-process against the
+    session's copy of the shell variables, which is refreshed in the
+    background after any command that may have changed them.
+
+    A command ending in & runs as a job (see jobs.JobTable) next to the
+    shell, and `jobs`, `fg`, `bg` and `kill %n` manage the tab's jobs even
+    while another command is running. A job brought to the foreground takes
+    the place of a running command: lines passed to `execute` become its
+    input, and `interrupt` and `suspend` signal it.
+
+    While `recording` (a recording.Recorder) is set, everything the session
+    shows, the commands and input it is given and its resizes are
+    recorded; see `start_recording`.
+
+    Every command is timed; finished timings are kept in `timings` and
+    passed to `recorder` (a MetricsRecorder) if one is given. Commands are
+    also appended to `history_store` (a HistoryStore) and added to
+    `history_index` (a HistoryIndex) if they are given.
+    """
+
+    def __init__(self, current_directory, rows=24, cols=80, recorder=None, history_store=None,
+                 history_index=None, max_jobs=MAX_JOBS):
+        self.current_directory = current_directory
+        self.rows = rows
+        self.cols = cols
+        self.recorder = recorder
+        self.history_store = history_store
+        self.history_index = history_index
+        self.history = []
+        self.previous_directory = None
+        self.directory_stack = []
+        # The shell's variables, or None while they may be out of date
+        self.variables = None
+        self.exported = set()
+        self.screen = None
+        self.stream = None
+        self.timing = None
+        self.timings = deque(maxlen=100)
+        self._finished_timings = deque()
+        self.sink = OutputSink(self._on_pressure)
+        self.jobs = JobTable(self._on_job_event, max_jobs)
+        self.recording = None
+        self.shell = ShellSession(current_directory, self._on_shell_event, dimensions=(rows, cols))
+
+    def start(self):
+        self.shell.start()
+        self.refresh_variables()
+        return self
+
+    def start_in_background(self):
+        """Spawn the shell off the calling thread; commands run meanwhile are queued"""
+        threading.Thread(target=self.start, name='owl-shell-start', daemon=True).start()
+        return self
+
+    def start_recording(self, path=None, title=None):
+        """Record the session to an asciicast file; returns its path"""
+        if self.recording is None:
+            from recording import Recorder, recording_path
+
+            self.recording = Recorder(path or recording_path('session'), self.cols, self.rows, title)
+        return self.recording.path
+
+    def stop_recording(self):
+        """Finish the recording, if any; returns its path"""
+        recording, self.recording = self.recording, None
+        if recording is None:
+            return None
+        recording.close()
+        return recording.path
+
+    def restore_environment(self, environment):
+        """Export saved variables into the shell, e.g. when restoring a tab"""
+        if environment:
+            self.shell.run_quiet('export ' + ' '.join(
+                f'{name}={shlex.quote(value)}' for name, value in sorted(environment.items())
+            ))
+            self.refresh_variables()
+
+    def refresh_variables(self):
+        """Fetch the shell's variables in the background"""
+        self.variables = None
+        self.shell.run_quiet(DUMP_VARIABLES, self._set_variables)
+
+    def _set_variables(self, dump):
+        self.variables, self.exported = parse_variables(dump)
+
+    def environment(self):
+        """The shell's exported variables, or None while they are not known"""
+        if not self.variables:
+            return None
+        return {name: value for name, value in self.variables.items() if name in self.exported}
+
+    @property
+    def busy(self):
+        return self.shell.busy or self.jobs.foreground is not None
+
+    def accepts(self, command):
+        """Check whether `execute` would take a command now"""
+        return not self.busy or self.jobs.foreground is not None or is_job_command(command)
+
+    @property
+    def command(self):
+        return self.shell.command
+
+    def execute(self, command):
+        """Run a command in the shell; returns False if one is already running"""
+        if not self.accepts(command):
+            return False
+        recording = self.recording
+        foreground = self.jobs.foreground
+        if foreground is not None and not is_job_command(command):
+            if recording is not None:
+                recording.input(command + '\n')
+            foreground.send(command + '\n')
+            return True
+        if recording is not None:
+            recording.input(command + '\n')
+            recording.output(f'$ {command}\r\n')
+        self.history.append(command)
+        if self.history_store is not None:
+            self.history_store.append(command, self.current_directory)
+        if self.history_index is not None and (
+                self.history_store is None or self.history_store.enabled):
+            self.history_index.add(command, self.current_directory)
+        if self.busy:
+            # Job control next to a running command, which keeps its timing
+            output, _ = run_job_command(self, command)
+            if output:
+                self._on_job_event('output', output)
+            return True
+        self.timing = CommandTiming(command, self.current_directory)
+        self.timing.bytes_start = self.shell.bytes_read
+        result = run_job_command(self, command)
+        if result is None:
+            result = run_builtin(self, command)
+        if result is not None:
+            self.timing.builtin = True
+            output, exit_code = result
+            if output:
+                self._on_shell_event('output', output)
+            # None: a job was brought to the foreground and finishes the command later
+            if exit_code is not None:
+                self._on_shell_event('done', (exit_code, self.current_directory))
+            return True
+        interactive = classify_command(command)
+        if interactive:
+            # Known full-screen programs get a screen before their first output
+            self.sink.push('interactive', '')
+        self.shell.run(command, interactive)
+        return True
+
+    def send(self, data):
+        if self.recording is not None:
+            self.recording.input(data)
+        self.shell.send(data)
+
+    def interrupt(self):
+        if not self.jobs.interrupt():
+            self.shell.interrupt()
+
+    def suspend(self):
+        """Stop the foreground job and put it in the background (Ctrl-Z)"""
+        return self.jobs.suspend()
+
+    def resize(self, rows, cols):
+        """Resize the PTY and, if one is active, the screen"""
+        self.rows = rows
+        self.cols = cols
+        if self.recording is not None:
+            self.recording.resize(cols, rows)
+        if self.screen is not None:
+            self.screen.resize(rows, cols)
+        self.shell.resize(rows, cols)
+
+    def poll(self, budget_chars):
+        """Get the next slice of events and apply them to the session state"""
+        events = self.sink.drain(budget_chars)
+        applied = []
+        for kind, payload in events:
+            if kind == 'interactive':
+                if self.screen is None:
+                    import pyte
+
+                    self.screen = pyte.Screen(self.cols, self.rows)
+                    self.stream = pyte.Stream(self.screen)
+                self.stream.feed(payload)
+            elif kind == 'screen' and self.stream is not None:
+                self.stream.feed(payload)
+            elif kind == 'done':
+                if payload[1] != self.current_directory:
+                    self.previous_directory = self.current_directory
+                self.current_directory = payload[1]
+                if self.screen is not None:
+                    # What an interactive command left on its screen stays in the output
+                    applied.append(('output', screen_text(self.screen)))
+                self.screen = None
+                self.stream = None
+                if self._finished_timings:
+                    timing = self._finished_timings.popleft()
+                    self.timings.append(timing)
+                    if self.recorder is not None:
+                        self.recorder.record_command(timing)
+            applied.append((kind, payload))
+        return applied
+
+    def close(self):
+        self.stop_recording()
+        self.jobs.close()
+        self.shell.close()
+        self.sink.close()
+
+    def _on_shell_event(self, kind, payload):
+        """Time the running command as its events arrive (reactor thread)"""
+        recording = self.recording
+        if recording is not None and kind in ('output', 'screen', 'interactive') and payload:
+            # Line-oriented output had its \r\n turned into \n
+            recording.output(payload.replace('\n', '\r\n') if kind == 'output' else payload)
+        timing = self.timing
+        if timing is not None:
+            if kind in ('output', 'screen', 'interactive') and payload and timing.first_byte is None:
+                timing.first_byte = time.monotonic()
+            elif kind == 'done':
+                timing.end = time.monotonic()
+                timing.exit_code = payload[0]
+                timing.bytes_out = self.shell.bytes_read - timing.bytes_start
+                self._finished_timings.append(timing)
+                self.timing = None
+                if not timing.builtin:
+                    timing.written = self.shell.command_written_at
+                    if may_change_shell_state(timing.command):
+                        self.refresh_variables()
+        self.sink.push(kind, payload)
+
+    def _on_job_event(self, kind, payload):
+        """Show job output, and finish the command when the foreground job ends"""
+        if kind == 'output':
+            if self.recording is not None:
+                self.recording.output(payload.replace('\n', '\r\n'))
+            self.sink.push('job_output', payload)
+        elif kind == 'done':
+            self._on_shell_event('done', (payload, self.current_directory))
+
+    def _on_pressure(self, paused):
+        if paused:
+            self.shell.pause_reading()
+            self.jobs.pause()
+        else:
+            self.shell.resume_reading()
+            self.jobs.resume_reading()
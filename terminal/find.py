@@ -0,0 +1,379 @@
+import re
+import queue
+import threading
+
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from tkinter import Frame, Entry, Label, Button, Checkbutton, BooleanVar, END
+
+
+# Matches reported per search
+MAX_MATCHES = 10000
+# Matches in the live output that are highlighted at once
+MAX_HIGHLIGHTS = 500
+# Decompressed spilled segments kept for repeated searches
+MAX_CACHED_SEGMENTS = 64
+# Wait after a keystroke before searching
+SEARCH_DELAY_MS = 80
+POLL_MS = 20
+# Results kept for bars that have not picked them up, e.g. closed ones
+MAX_KEPT_RESULTS = 16
+# The result of a search that a newer one, from any tab, stopped
+CANCELLED = 'cancelled'
+
+
+class Match:
+    __slots__ = ('segment', 'line', 'start', 'end')
+
+    def __init__(self, segment, line, start, end):
+        # segment is the spilled segment's index, or None for live output
+        self.segment = segment
+        self.line = line
+        self.start = start
+        self.end = end
+
+
+class Query:
+    """A search for text or a regex; plain text is found with str.find, which
+    is several times faster than an equivalent regex on large logs"""
+
+    def __init__(self, text, regex=False, case=False, word=False):
+        self.case = case
+        self.word = word
+        self.needle = None
+        self.pattern = None
+        if not regex:
+            self.needle = text if case else text.lower()
+            return
+        if word:
+            text = rf'\b(?:{text})\b'
+        self.pattern = re.compile(text, 0 if case else re.IGNORECASE)
+
+    @property
+    def folds_case(self):
+        return self.needle is not None and not self.case
+
+    def spans(self, text):
+        """Yield (start, end) of every match; text is lowercased if folds_case"""
+        if self.pattern is not None:
+            for found in self.pattern.finditer(text):
+                if found.start() != found.end():
+                    yield found.span()
+            return
+        needle = self.needle
+        if not needle:
+            return
+        length = len(needle)
+        position = text.find(needle)
+        while position != -1:
+            end = position + length
+            if self.word and (_word_character(text, position - 1) or _word_character(text, end)):
+                position = text.find(needle, position + 1)
+                continue
+            yield position, end
+            position = text.find(needle, end)
+
+
+def _word_character(text, position):
+    if position < 0 or position >= len(text):
+        return False
+    character = text[position]
+    return character.isalnum() or character == '_'
+
+
+def compile_query(query, regex=False, case=False, word=False):
+    """A Query for the find options, or None if the regex is invalid"""
+    try:
+        return Query(query, regex, case, word)
+    except re.error:
+        return None
+
+
+def _lowered(text):
+    """text lowercased, or None if that would move offsets (a few characters
+    change length when lowercased)"""
+    lowered = text.lower()
+    return lowered if len(lowered) == len(text) else None
+
+
+def _line_starts(lines):
+    starts = array('Q')
+    position = 0
+    for line in lines:
+        starts.append(position)
+        position += len(line) + 1
+    return starts
+
+
+def _find_in(query, text, starts, segment, first_line, matches, lowered=None):
+    """Append matches in text (lines joined by newlines, line i starting at
+    starts[i] - starts[0]) to matches, a deque that keeps the newest ones if
+    it has a maxlen; returns how many were found. lowered is text.lower()
+    if already known."""
+    searchable = text
+    if query.folds_case:
+        searchable = lowered if lowered is not None else _lowered(text)
+        if searchable is None:
+            query = Query(re.escape(query.needle), regex=True, word=query.word)
+            searchable = text
+    origin = starts[0] if starts else 0
+    found = 0
+    for found_start, found_end in query.spans(searchable):
+        line = bisect_right(starts, origin + found_start) - 1
+        start = origin + found_start - starts[line]
+        matches.append(Match(segment, first_line + line, start, start + found_end - found_start))
+        found += 1
+    return found
+
+
+class FindWorker:
+    """Background thread running searches over spilled segments and live output.
+
+    The live output is searched first and then the segments, newest to
+    oldest, so once MAX_MATCHES is reached the matches dropped are the
+    oldest ones. Only the newest submitted search runs to completion; an
+    older one stops at the next segment boundary once a newer one is queued,
+    and its result is CANCELLED. The worker is shared by all tabs, so each
+    bar takes the result of its own search by id.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._generation = 0
+        self._segments = OrderedDict()
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, name='owl-find', daemon=True).start()
+
+    def submit(self, query, segments, live, read):
+        """Search live, a LineIndex snapshot, and segments (paths, oldest
+        first, read with `read(path)`); returns a search id"""
+        self._generation += 1
+        self._queue.put((self._generation, query, list(segments), live, read))
+        return self._generation
+
+    def take(self, search_id):
+        """Pop a search's result: (matches, complete), CANCELLED, or None while it runs"""
+        with self._lock:
+            return self._results.pop(search_id, None)
+
+    def _publish(self, search_id, result):
+        with self._lock:
+            self._results[search_id] = result
+            while len(self._results) > MAX_KEPT_RESULTS:
+                self._results.popitem(last=False)
+
+    def _segment(self, path, read):
+        """[text, line starts, lowercased text or None] of a spilled segment"""
+        cached = self._segments.get(path)
+        if cached is None:
+            text = read(path)
+            cached = self._segments[path] = [text, _line_starts(text.split('\n')), None]
+            while len(self._segments) > MAX_CACHED_SEGMENTS:
+                self._segments.popitem(last=False)
+        else:
+            self._segments.move_to_end(path)
+        return cached
+
+    def _run(self):
+        while True:
+            generation, query, segments, live, read = self._queue.get()
+            if generation != self._generation:
+                self._publish(generation, CANCELLED)
+                continue
+            # Matches of each region searched, newest region first
+            regions = []
+            remaining = MAX_MATCHES
+            base, lines, offsets = live
+            matches = deque(maxlen=remaining)
+            complete = _find_in(query, '\n'.join(lines), offsets, None, base, matches) <= remaining
+            regions.append(matches)
+            remaining -= len(matches)
+            for index in range(len(segments) - 1, -1, -1):
+                if generation != self._generation:
+                    break
+                if not remaining:
+                    complete = False
+                    break
+                try:
+                    cached = self._segment(segments[index], read)
+                except OSError:
+                    continue
+                text, starts, lowered = cached
+                if query.folds_case and lowered is None:
+                    lowered = cached[2] = _lowered(text)
+                matches = deque(maxlen=remaining)
+                if _find_in(query, text, starts, index, 0, matches, lowered) > remaining:
+                    complete = False
+                regions.append(matches)
+                remaining -= len(matches)
+            if generation == self._generation:
+                matches = [match for region in reversed(regions) for match in region]
+                self._publish(generation, (matches, complete))
+            else:
+                self._publish(generation, CANCELLED)
+
+
+class FindBar:
+    """Ctrl-F search bar for a tab's output, including spilled scrollback"""
+
+    def __init__(self, root, tab, worker, styles):
+        self.root = root
+        self.tab = tab
+        self.worker = worker
+        self.matches = []
+        self.current = -1
+        self.complete = True
+        self.search_id = None
+        self._pending = None
+
+        self.frame = styles.register(Frame(tab.frame), 'frame')
+        font = styles.fonts['entry']
+        self.query = Entry(self.frame, width=30, font=font, relief='flat')
+        styles.register(self.query, 'entry')
+        self.query.pack(side='left', padx=(0, 5), ipady=2)
+        self.regex = BooleanVar(value=False)
+        self.case = BooleanVar(value=False)
+        self.word = BooleanVar(value=False)
+        for text, variable in (('.*', self.regex), ('Aa', self.case), ('Word', self.word)):
+            check = Checkbutton(
+                self.frame, text=text, variable=variable, command=self.schedule,
+                font=('Arial', 10), highlightthickness=0
+            )
+            styles.register(check, 'label')
+            check.pack(side='left')
+        for text, step in (('▲', -1), ('▼', 1)):
+            Button(
+                self.frame, text=text, relief='flat', command=lambda s=step: self.step(s)
+            ).pack(side='left', padx=2)
+        self.count_label = Label(self.frame, font=('Arial', 10))
+        styles.register(self.count_label, 'label')
+        self.count_label.pack(side='left', padx=10)
+        Button(self.frame, text='×', relief='flat', command=self.close).pack(side='right')
+
+        output_text = tab.output_text
+        output_text.tag_configure('find_match', background='#ffe08a', foreground='#000000')
+        output_text.tag_configure('find_current', background='#ff9632', foreground='#000000')
+
+        self.query.bind('<KeyRelease>', self.on_key)
+        self.query.bind('<Return>', lambda event: self.step(1))
+        self.query.bind('<Shift-Return>', lambda event: self.step(-1))
+        self.query.bind('<Escape>', lambda event: self.close())
+
+    def open(self, event=None):
+        if not self.frame.winfo_ismapped():
+            self.frame.pack(fill='x', padx=10, before=self.tab.output_text)
+        self.query.focus_set()
+        self.query.select_range(0, END)
+        return 'break'
+
+    def close(self):
+        self.reset()
+        self.frame.pack_forget()
+        self.tab.entry.focus_set()
+
+    def reset(self):
+        """Forget the search and its matches, e.g. when the tab's output is cleared"""
+        if self.search_id is not None:
+            self.worker.take(self.search_id)
+        self.search_id = None
+        self.matches = []
+        self.current = -1
+        self.clear_highlights()
+        self.count_label.config(text='')
+
+    def on_key(self, event):
+        if event.keysym not in ('Return', 'Escape', 'Shift_L', 'Shift_R'):
+            self.schedule()
+
+    def schedule(self):
+        """Search shortly after typing stops"""
+        if self._pending is not None:
+            self.root.after_cancel(self._pending)
+        self._pending = self.root.after(SEARCH_DELAY_MS, self.search)
+
+    def search(self):
+        self._pending = None
+        query = self.query.get()
+        self.clear_highlights()
+        self.matches = []
+        self.current = -1
+        if not query:
+            self.search_id = None
+            self.count_label.config(text='')
+            return
+        compiled = compile_query(query, self.regex.get(), self.case.get(), self.word.get())
+        if compiled is None:
+            self.search_id = None
+            self.count_label.config(text='invalid regex')
+            return
+        scrollback = self.tab.scrollback
+        self.search_id = self.worker.submit(
+            compiled, scrollback.segments, scrollback.index.snapshot(), scrollback.read_segment
+        )
+        self.count_label.config(text='searching…')
+        self.root.after(POLL_MS, self.poll, self.search_id)
+
+    def poll(self, search_id):
+        if search_id != self.search_id:
+            # Replaced by a newer search of this bar, or the bar was reset
+            self.worker.take(search_id)
+            return
+        result = self.worker.take(search_id)
+        if result is None:
+            self.root.after(POLL_MS, self.poll, search_id)
+            return
+        if result == CANCELLED:
+            self.search_id = None
+            self.count_label.config(text='cancelled')
+            return
+        self.matches, self.complete = result
+        self.highlight_live()
+        # Start from the newest match, like a backwards terminal search
+        self.current = len(self.matches)
+        self.step(-1)
+
+    def clear_highlights(self):
+        self.tab.output_text.tag_remove('find_match', '1.0', END)
+        self.tab.output_text.tag_remove('find_current', '1.0', END)
+
+    def highlight_live(self):
+        scrollback = self.tab.scrollback
+        shown = 0
+        for match in reversed(self.matches):
+            if match.segment is not None or shown >= MAX_HIGHLIGHTS:
+                break
+            position = scrollback.widget_line(match.line)
+            if position is None:
+                continue
+            self.tab.output_text.tag_add(
+                'find_match', f'{position}.{match.start}', f'{position}.{match.end}'
+            )
+            shown += 1
+
+    def step(self, direction):
+        """Move to the next (1) or previous (-1) match"""
+        if not self.matches:
+            if self.search_id is not None and self.query.get():
+                self.count_label.config(text='no matches')
+            return 'break'
+        self.current = (self.current + direction) % len(self.matches)
+        match = self.matches[self.current]
+        scrollback = self.tab.scrollback
+        if match.segment is None:
+            position = scrollback.widget_line(match.line)
+        else:
+            position = scrollback.segment_line(match.segment, match.line)
+            # Paging in moved the live lines down
+            self.clear_highlights()
+            self.highlight_live()
+        output_text = self.tab.output_text
+        output_text.tag_remove('find_current', '1.0', END)
+        if position is not None:
+            start, end = f'{position}.{match.start}', f'{position}.{match.end}'
+            output_text.tag_add('find_current', start, end)
+            output_text.see(start)
+        more = '' if self.complete else '+'
+        self.count_label.config(text=f'{self.current + 1}/{len(self.matches)}{more}')
+        return 'break'
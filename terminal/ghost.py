@@ -0,0 +1,43 @@
+from tkinter import Label, END, INSERT
+
+
+class GhostText:
+    """Greyed-out suggested completion drawn just after an entry's text"""
+
+    def __init__(self, entry, styles):
+        self.entry = entry
+        self.suggestion = ''
+        self.label = Label(
+            entry,
+            font=styles.fonts['entry'],
+            bd=0,
+            padx=0,
+            pady=0
+        )
+        styles.register(self.label, 'ghost')
+
+    def show(self, suggestion):
+        self.suggestion = suggestion
+        if not suggestion or self.entry.index(INSERT) != self.entry.index(END):
+            self.label.place_forget()
+            return
+        text = self.entry.get()
+        if text:
+            # End of the last character, allowing for horizontal scrolling
+            x, _, width, _ = self.entry.bbox(len(text) - 1)
+            x += width
+        else:
+            x = int(self.entry.cget('highlightthickness')) + 1
+        self.label.config(text=suggestion)
+        self.label.place(x=x, rely=0.5, anchor='w')
+
+    def hide(self):
+        self.show('')
+
+    def accept(self, event=None):
+        """Append the suggestion to the entry; returns 'break' if there was one"""
+        if not self.suggestion or self.entry.index(INSERT) != self.entry.index(END):
+            return None
+        self.entry.insert(END, self.suggestion)
+        self.hide()
+        return 'break'
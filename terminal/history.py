@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import threading
+
+
+# Auto-delete windows offered in the Privacy settings, in seconds
+AUTO_DELETE_WINDOWS = {
+    '1 minute': 60,
+    '1 hour': 60 * 60,
+    '1 day': 24 * 60 * 60,
+    '1 week': 7 * 24 * 60 * 60,
+    '1 month': 30 * 24 * 60 * 60,
+    '3 months': 90 * 24 * 60 * 60,
+    '6 months': 180 * 24 * 60 * 60,
+    '12 months': 365 * 24 * 60 * 60,
+}
+# Time span covered by one segment file when history is kept forever
+DEFAULT_SEGMENT_SECONDS = 24 * 60 * 60
+MIN_SEGMENT_SECONDS = 15
+
+
+class HistoryStore:
+    """Append-only, segmented command history log.
+
+    Records are appended one per line to the segment file covering the
+    current time span, as JSON or, when a Fernet cipher is set, as one
+    Fernet token per record; appending never rewrites existing data. With
+    an auto-delete window set, a background compaction pass deletes whole
+    segments once everything in them has expired, waiting while `records`
+    is reading them.
+
+    Encrypted records are still read while encryption is off, with the
+    cipher `load_cipher()` returns if it is given; `unreadable` counts the
+    records the last pass over the history could not decode.
+    """
+
+    def __init__(self, directory, cipher=None, load_cipher=None):
+        self.directory = directory
+        self.cipher = cipher
+        self.load_cipher = load_cipher
+        self.unreadable = 0
+        self._read_cipher = None
+        self._readers = 0
+        self.enabled = True
+        self.ttl = None
+        self.segment_seconds = DEFAULT_SEGMENT_SECONDS
+        # Timestamp of the newest record appended
+        self.last_timestamp = None
+        self._file = None
+        self._segment_start = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._compactor = None
+
+    def keep(self):
+        """Keep history forever"""
+        self.enabled = True
+        self.set_ttl(None)
+
+    def disable(self):
+        """Stop recording history"""
+        self.enabled = False
+        self.set_ttl(None)
+        self._close_segment()
+
+    def set_auto_delete(self, window):
+        """Delete history older than an AUTO_DELETE_WINDOWS entry"""
+        self.enabled = True
+        self.set_ttl(AUTO_DELETE_WINDOWS[window])
+
+    def set_ttl(self, ttl):
+        with self._lock:
+            self.ttl = ttl
+            # Small segments relative to the window keep expiry granular
+            segment_seconds = DEFAULT_SEGMENT_SECONDS if ttl is None else ttl / 4
+            self.segment_seconds = max(MIN_SEGMENT_SECONDS, min(DEFAULT_SEGMENT_SECONDS, segment_seconds))
+        if ttl is not None:
+            if self._compactor is None:
+                self._compactor = threading.Thread(target=self._compact_loop, name='owl-history-compactor', daemon=True)
+                self._compactor.start()
+            self._wakeup.set()
+
+    def append(self, command, current_directory, timestamp=None):
+        """Append one record to the current segment"""
+        if not self.enabled:
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        data = json.dumps({'t': timestamp, 'cwd': current_directory, 'cmd': command})
+        if self.cipher is not None:
+            line = self.cipher.encrypt(data.encode()).decode()
+        else:
+            line = data
+        with self._lock:
+            self._segment_for(timestamp).write(line + '\n')
+            self._file.flush()
+            self.last_timestamp = timestamp
+
+    def _segment_for(self, timestamp):
+        """Get the open segment file covering a timestamp, rotating if needed"""
+        if self._file is None or timestamp >= self._segment_start + self.segment_seconds:
+            if self._file is not None:
+                self._file.close()
+            self._segment_start = timestamp
+            path = os.path.join(self.directory, f'{int(timestamp * 1000):016d}.log')
+            self._file = open(path, 'a')
+        return self._file
+
+    def _close_segment(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def segments(self):
+        """Segment paths, oldest first"""
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith('.log'))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def records(self):
+        """Yield (timestamp, cwd, command) for every unexpired record, oldest first"""
+        cutoff = None if self.ttl is None else time.time() - self.ttl
+        unreadable = 0
+        with self._lock:
+            # Compaction leaves the segments alone until every reader is done
+            self._readers += 1
+        try:
+            for path in self.segments():
+                try:
+                    f = open(path)
+                except FileNotFoundError:
+                    continue
+                with f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        record = self._decode(line)
+                        if record is None:
+                            unreadable += 1
+                            continue
+                        if cutoff is not None and record['t'] < cutoff:
+                            continue
+                        yield record['t'], record['cwd'], record['cmd']
+            self.unreadable = unreadable
+        finally:
+            with self._lock:
+                self._readers -= 1
+
+    def _decode(self, line):
+        try:
+            if line.startswith('{'):
+                return json.loads(line)
+            cipher = self.cipher or self._reading_cipher()
+            if cipher is not None:
+                return json.loads(cipher.decrypt(line.encode()))
+        except Exception:
+            # Written with another key or cut short by a crash
+            pass
+        return None
+
+    def _reading_cipher(self):
+        """The cipher for records written while encryption was on, if one can be loaded"""
+        if self._read_cipher is None and self.load_cipher is not None:
+            self._read_cipher = self.load_cipher()
+        return self._read_cipher
+
+    def compact(self):
+        """Delete segments whose newest possible record has expired"""
+        with self._lock:
+            if self.ttl is None or self._readers:
+                return
+            cutoff = time.time() - self.ttl
+            segments = self.segments()
+            # A segment ends where the next one starts
+            for path, next_path in zip(segments, segments[1:] + [None]):
+                if next_path is None:
+                    end = self._segment_end(path)
+                else:
+                    end = int(os.path.basename(next_path)[:-4]) / 1000
+                if end >= cutoff:
+                    break
+                if self._file is not None and self._file.name == path:
+                    self._file.close()
+                    self._file = None
+                os.remove(path)
+
+    def _segment_end(self, path):
+        if self._file is not None and self._file.name == path:
+            return time.time()
+        return os.path.getmtime(path)
+
+    def _compact_loop(self):
+        while True:
+            ttl = self.ttl
+            if ttl is not None:
+                self.compact()
+            self._wakeup.wait(self.segment_seconds if ttl is not None else None)
+            self._wakeup.clear()
+
+    def close(self):
+        self._close_segment()
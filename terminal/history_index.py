@@ -0,0 +1,218 @@
+import math
+import time
+import threading
+
+from array import array
+from itertools import islice
+
+
+# Candidates checked per query, newest first, before giving up; queries
+# too short for trigrams and fuzzy queries check fewer
+MAX_SCAN = 5000
+MAX_SHORT_SCAN = 2000
+# Matches collected before ranking; the best `limit` of them are returned
+MAX_MATCHES = 100
+# How many distinct directories are remembered per command
+MAX_DIRECTORIES = 8
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class HistoryEntry:
+    __slots__ = ('command', 'lowered', 'count', 'last_used', 'directories')
+
+    def __init__(self, command):
+        self.command = command
+        self.lowered = command.lower()
+        self.count = 0
+        self.last_used = 0.0
+        self.directories = {}
+
+    def use(self, timestamp, current_directory):
+        self.count += 1
+        self.last_used = max(self.last_used, timestamp)
+        directories = self.directories
+        directories[current_directory] = directories.get(current_directory, 0) + 1
+        if len(directories) > MAX_DIRECTORIES:
+            del directories[min(directories, key=directories.get)]
+
+    def frecency(self, now, current_directory=None):
+        """Rank by use count, decayed by age, boosted when used in this directory"""
+        age_days = max(0.0, now - self.last_used) / 86400
+        score = (1 + math.log(self.count)) / (1 + age_days)
+        if current_directory in self.directories:
+            score *= 2
+        return score
+
+
+class HistoryIndex:
+    """In-memory trigram index over deduplicated history for fast recall.
+
+    Every distinct command has one live id; using it again retires the old
+    id and gives it a new, higher one, so ids are ordered by last use and
+    a query can walk posting lists newest first and stop early. Posting
+    lists are append-only arrays; the index is rebuilt once retired ids
+    outnumber live ones.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = []
+        self._ids = {}
+        self._postings = {}
+        self._retired = 0
+        self.ready = False
+
+    def __len__(self):
+        return len(self._ids)
+
+    def build(self, records):
+        """Index (timestamp, cwd, command) records, oldest first.
+
+        The index is built aside and swapped in at the end, after the
+        commands added while it was building, which are the newest.
+        """
+        merged = {}
+        for timestamp, current_directory, command in records:
+            entry = merged.pop(command, None) or HistoryEntry(command)
+            entry.use(timestamp, current_directory)
+            # Re-inserting keeps the dict ordered by last use
+            merged[command] = entry
+        built = HistoryIndex()
+        for entry in merged.values():
+            built._insert(entry)
+        with self._lock:
+            for live in self._entries:
+                if live is None:
+                    continue
+                old_id = built._ids.get(live.command)
+                if old_id is not None:
+                    old = built._entries[old_id]
+                    built._entries[old_id] = None
+                    built._retired += 1
+                    live.count += old.count
+                    live.last_used = max(live.last_used, old.last_used)
+                    for directory, count in old.directories.items():
+                        live.directories[directory] = live.directories.get(directory, 0) + count
+                built._insert(live)
+            self._entries = built._entries
+            self._ids = built._ids
+            self._postings = built._postings
+            self._retired = built._retired
+            if self._retired > len(self._ids) and self._retired > 1000:
+                self._rebuild()
+        self.ready = True
+
+    def build_in_background(self, records):
+        """Build from an iterable of records without blocking the caller"""
+        threading.Thread(target=self.build, args=(records,), name='owl-history-index', daemon=True).start()
+
+    def add(self, command, current_directory, timestamp=None):
+        """Record a use of a command"""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            old_id = self._ids.get(command)
+            if old_id is None:
+                entry = HistoryEntry(command)
+            else:
+                entry = self._entries[old_id]
+                self._entries[old_id] = None
+                self._retired += 1
+            entry.use(timestamp, current_directory)
+            self._insert(entry)
+            if self._retired > len(self._ids) and self._retired > 1000:
+                self._rebuild()
+
+    def _insert(self, entry):
+        entry_id = len(self._entries)
+        self._entries.append(entry)
+        self._ids[entry.command] = entry_id
+        for trigram in trigrams(entry.lowered):
+            postings = self._postings.get(trigram)
+            if postings is None:
+                postings = self._postings[trigram] = array('I')
+            postings.append(entry_id)
+
+    def _rebuild(self):
+        live = [entry for entry in self._entries if entry is not None]
+        self._entries = []
+        self._ids = {}
+        self._postings = {}
+        self._retired = 0
+        for entry in live:
+            self._insert(entry)
+
+    def search(self, query, current_directory=None, limit=20):
+        """Commands containing `query` (case-insensitive), best first.
+
+        Falls back to fuzzy (in-order characters) matching when nothing
+        contains the query as a substring.
+        """
+        query = query.lower()
+        if not query:
+            return []
+        with self._lock:
+            matches = self._substring_matches(query)
+            if not matches:
+                matches = self._fuzzy_matches(query)
+            now = time.time()
+            matches.sort(key=lambda entry: entry.frecency(now, current_directory), reverse=True)
+            return [entry.command for entry in matches[:limit]]
+
+    def _candidate_ids(self, query):
+        """Ids that may contain the query, newest first, and how many to check"""
+        grams = trigrams(query)
+        if not grams:
+            return range(len(self._entries) - 1, -1, -1), MAX_SHORT_SCAN
+        rarest = min(grams, key=lambda gram: len(self._postings.get(gram, ())))
+        return reversed(self._postings.get(rarest, ())), MAX_SCAN
+
+    def _substring_matches(self, query):
+        matches = []
+        entries = self._entries
+        candidates, max_scan = self._candidate_ids(query)
+        for entry_id in islice(candidates, max_scan):
+            entry = entries[entry_id]
+            if entry is not None and query in entry.lowered:
+                matches.append(entry)
+                if len(matches) == MAX_MATCHES:
+                    break
+        return matches
+
+    def _fuzzy_matches(self, query):
+        matches = []
+        entries = self._entries
+        for entry_id in islice(range(len(entries) - 1, -1, -1), MAX_SHORT_SCAN):
+            entry = entries[entry_id]
+            if entry is not None and _is_subsequence(query, entry.lowered):
+                matches.append(entry)
+                if len(matches) == MAX_MATCHES:
+                    break
+        return matches
+
+    def recent(self, prefix=''):
+        """Yield distinct commands starting with `prefix`, most recently used first"""
+        index = len(self._entries)
+        while True:
+            with self._lock:
+                index = min(index, len(self._entries)) - 1
+                while index >= 0:
+                    entry = self._entries[index]
+                    if entry is not None and entry.command.startswith(prefix):
+                        break
+                    index -= 1
+                if index < 0:
+                    return
+                command = entry.command
+            yield command
+
+
+def _is_subsequence(query, text):
+    position = 0
+    for char in query:
+        position = text.find(char, position) + 1
+        if not position:
+            return False
+    return True
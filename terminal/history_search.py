@@ -0,0 +1,129 @@
+from tkinter import Frame, Label, Entry, END
+
+
+class HistoryNavigator:
+    """Up/Down recall through history, limited to what was typed before the first Up"""
+
+    def __init__(self, index):
+        self.index = index
+        self.reset()
+
+    def reset(self):
+        self._typed = None
+        self._recent = None
+        self._seen = []
+        self._position = -1
+
+    def previous(self, current_text):
+        """Get the next older command, or None at the end of history"""
+        if self._typed is None:
+            self._typed = current_text
+            self._recent = self.index.recent(current_text)
+        if self._position + 1 >= len(self._seen):
+            command = next(self._recent, None)
+            if command is None:
+                return None
+            self._seen.append(command)
+        self._position += 1
+        return self._seen[self._position]
+
+    def next(self):
+        """Get the next newer command, ending with what was originally typed"""
+        if self._typed is None:
+            return None
+        if self._position <= 0:
+            typed = self._typed
+            self.reset()
+            return typed
+        self._position -= 1
+        return self._seen[self._position]
+
+
+class ReverseSearch:
+    """Ctrl-R incremental history search bar above a tab's entry"""
+
+    def __init__(self, parent, entry, index, get_directory, styles):
+        self.entry = entry
+        self.index = index
+        self.get_directory = get_directory
+        self.results = []
+        self.position = 0
+
+        font = styles.fonts['entry']
+        self.frame = styles.register(Frame(parent), 'frame')
+        self.label = Label(
+            self.frame,
+            text='(reverse-i-search)',
+            font=('Arial', 10)
+        )
+        styles.register(self.label, 'label')
+        self.label.pack(side='left', padx=(0, 5))
+        self.query = Entry(
+            self.frame,
+            width=30,
+            font=font,
+            relief='flat'
+        )
+        styles.register(self.query, 'entry')
+        self.query.pack(side='left')
+        self.match_label = Label(
+            self.frame,
+            anchor='w',
+            font=font
+        )
+        styles.register(self.match_label, 'label')
+        self.match_label.pack(side='left', fill='x', expand=True, padx=10)
+
+        self.query.bind('<KeyRelease>', self.on_query)
+        self.query.bind('<Control-r>', self.on_next)
+        self.query.bind('<Return>', self.accept)
+        self.query.bind('<Escape>', self.cancel)
+        self.query.bind('<Control-g>', self.cancel)
+
+    def open(self, event=None):
+        if not self.frame.winfo_ismapped():
+            self.frame.pack(fill='x', padx=10, before=self.entry.master)
+            self.query.delete(0, END)
+            self.results = []
+            self.show()
+        self.query.focus_set()
+        return 'break'
+
+    def on_query(self, event=None):
+        if event is not None and event.keysym in ('Return', 'Escape'):
+            return
+        self.results = self.index.search(self.query.get(), self.get_directory())
+        self.position = 0
+        self.show()
+
+    def on_next(self, event=None):
+        """Move to the next lower-ranked match"""
+        if self.position + 1 < len(self.results):
+            self.position += 1
+            self.show()
+        return 'break'
+
+    def show(self):
+        if not self.query.get():
+            status = '' if self.index.ready else 'indexing history…'
+        elif self.results:
+            status = f'{self.results[self.position]}    [{self.position + 1}/{len(self.results)}]'
+        else:
+            status = 'no match'
+        self.match_label.config(text=status)
+
+    def accept(self, event=None):
+        """Put the selected match in the entry"""
+        if self.results:
+            self.entry.delete(0, END)
+            self.entry.insert(0, self.results[self.position])
+        self.close()
+        return 'break'
+
+    def cancel(self, event=None):
+        self.close()
+        return 'break'
+
+    def close(self):
+        self.frame.pack_forget()
+        self.entry.focus_set()
@@ -0,0 +1,92 @@
+from tkinter import Text, Toplevel
+from tkinter.font import Font
+
+from renderer import ScreenRenderer
+
+
+# Escape sequences sent for keys that have no printable character
+KEY_SEQUENCES = {
+    'Return': '\r',
+    'BackSpace': '\x7f',
+    'Tab': '\t',
+    'Escape': '\x1b',
+    'Up': '\x1b[A',
+    'Down': '\x1b[B',
+    'Right': '\x1b[C',
+    'Left': '\x1b[D',
+    'Home': '\x1b[H',
+    'End': '\x1b[F',
+    'Prior': '\x1b[5~',
+    'Next': '\x1b[6~',
+    'Delete': '\x1b[3~',
+    'Insert': '\x1b[2~',
+    'F1': '\x1bOP',
+    'F2': '\x1bOQ',
+    'F3': '\x1bOR',
+    'F4': '\x1bOS',
+    'F5': '\x1b[15~',
+    'F6': '\x1b[17~',
+    'F7': '\x1b[18~',
+    'F8': '\x1b[19~',
+    'F9': '\x1b[20~',
+    'F10': '\x1b[21~',
+}
+
+
+class InteractiveWindow:
+    """A window showing the screen of a terminal session's interactive command"""
+
+    def __init__(self, root, command, session, style, font):
+        self.session = session
+        self.screen = session.screen
+        self.font = Font(font=font)
+
+        self.window = Toplevel(root)
+        self.window.title(f'Interactive: {command}')
+        self.output_text = Text(
+            self.window,
+            wrap='none',
+            width=self.screen.columns,
+            height=self.screen.lines,
+            font=font,
+            bg=style['output_bg'],
+            fg=style['output_fg'],
+            insertbackground=style['output_fg']
+        )
+        self.output_text.pack(fill='both', expand=True, padx=10, pady=10)
+        self.renderer = ScreenRenderer(self.output_text, self.screen)
+
+        self.output_text.bind('<Key>', self.on_key)
+        self.output_text.bind('<Configure>', self.on_resize)
+        self.output_text.focus_set()
+        self.window.protocol('WM_DELETE_WINDOW', self.on_close)
+
+    def refresh(self):
+        """Redraw the screen on the next frame after the session has fed it"""
+        if self.window.winfo_exists():
+            self.renderer.schedule()
+
+    def on_resize(self, event):
+        """Resize the screen and the command's PTY to fit the window"""
+        cols = max(1, event.width // self.font.measure('0'))
+        rows = max(1, event.height // self.font.metrics('linespace'))
+        if (rows, cols) != (self.screen.lines, self.screen.columns):
+            self.session.resize(rows, cols)
+            self.renderer.reset()
+
+    def on_key(self, event):
+        """Forward key presses to the running command"""
+        data = KEY_SEQUENCES.get(event.keysym, event.char)
+        if data:
+            self.session.send(data)
+        return 'break'
+
+    def on_close(self):
+        """Closing the window interrupts the command it is attached to"""
+        self.session.interrupt()
+        self.close()
+
+    def close(self):
+        self.renderer.cancel()
+        if self.window.winfo_exists():
+            self.window.destroy()
@@ -0,0 +1,456 @@
+import os
+import time
+import codecs
+import shlex
+import signal
+import shutil
+import threading
+
+from collections import deque
+
+from reactor import get_reactor
+from utils import child_pids
+
+
+# Jobs a tab may have at once
+MAX_JOBS = 8
+# Output a background job keeps until it is brought to the foreground
+JOB_OUTPUT_CHARS = 256 * 1024
+# $? of a command stopped with Ctrl-Z, as bash reports it
+STOPPED_EXIT_CODE = 128 + signal.SIGTSTP
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+
+def background_command(command):
+    """The command before a trailing &, or None if it is not run in the background"""
+    command = command.rstrip()
+    if command.endswith('&') and not command.endswith('&&') and not command.endswith('\\&'):
+        return command[:-1].rstrip() or None
+    return None
+
+
+def is_job_command(command):
+    """Check whether a command is handled by the job table rather than the shell"""
+    if background_command(command) is not None:
+        return True
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return False
+    if not argv:
+        return False
+    if argv[0] in ('jobs', 'fg', 'bg'):
+        return True
+    return argv[0] == 'kill' and any(arg.startswith('%') for arg in argv[1:])
+
+
+def process_stats(pids):
+    """(state of the first pid, CPU seconds, resident bytes) summed over pids, from /proc"""
+    state = None
+    ticks = 0
+    pages = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rpartition(')')[2].split()
+        except OSError:
+            continue
+        if state is None:
+            state = fields[0]
+        ticks += int(fields[11]) + int(fields[12])
+        pages += int(fields[21])
+    return state, ticks / CLOCK_TICKS, pages * PAGE_SIZE
+
+
+class Job:
+    """A command running in its own process group on its own PTY"""
+
+    def __init__(self, number, command, process, master):
+        self.number = number
+        self.command = command
+        self.process = process
+        self.pid = process.pid
+        self.master = master
+        # running, stopped or done
+        self.state = 'running'
+        self.exit_code = None
+        self.started = time.monotonic()
+        self.finished = None
+        self.output = deque()
+        self.output_chars = 0
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self._decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        self._eof = False
+
+    @property
+    def runtime(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    def pids(self):
+        return [self.pid] + child_pids(self.pid)
+
+    def stats(self):
+        return process_stats(self.pids())
+
+    def signal(self, number):
+        try:
+            os.killpg(self.pid, number)
+        except OSError:
+            pass
+
+    def send(self, text):
+        """Write input to the job's terminal"""
+        try:
+            os.write(self.master, text.encode('utf-8'))
+        except OSError:
+            pass
+
+    def status(self):
+        """The job's status as `jobs` shows it"""
+        if self.state == 'stopped':
+            return 'Stopped'
+        if self.state == 'running':
+            return 'Running'
+        if self.exit_code == 0:
+            return 'Done'
+        if self.exit_code < 0:
+            return signal.strsignal(-self.exit_code) or f'Signal {-self.exit_code}'
+        return f'Exit {self.exit_code}'
+
+
+class JobTable:
+    """A tab's jobs: commands started with a trailing & that run alongside its shell.
+
+    Every job gets its own PTY and process group, so its output is kept
+    apart from the shell's and from other jobs'. The PTYs are read by the
+    shared reactor; a background job's output is kept (up to
+    JOB_OUTPUT_CHARS) until the job is brought to the foreground, after
+    which it is reported live, or until it finishes, when it is reported
+    together with the job's status.
+
+    `on_event(kind, payload)` is called from the reactor and waiter threads:
+
+    - `('output', text)` for foreground output and job notifications
+    - `('done', exit_code)` when the foreground job finishes or is stopped
+    """
+
+    def __init__(self, on_event, limit=MAX_JOBS):
+        self.on_event = on_event
+        self.limit = limit
+        self.jobs = {}
+        self.foreground = None
+        # Job numbers, most recently started, stopped or foregrounded last
+        self._recent = []
+        self._lock = threading.Lock()
+        self._paused = False
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def list(self):
+        with self._lock:
+            return [self.jobs[number] for number in sorted(self.jobs)]
+
+    def start(self, command, directory, environment=None, dimensions=(24, 80)):
+        """Start a job, or return None if the tab already has `limit` jobs"""
+        import pty
+        import struct
+        import fcntl
+        import termios
+        import subprocess
+
+        with self._lock:
+            if len(self.jobs) >= self.limit:
+                return None
+            number = next(n for n in range(1, self.limit + 2) if n not in self.jobs)
+            master, slave = pty.openpty()
+            fcntl.ioctl(slave, termios.TIOCSWINSZ, struct.pack('HHHH', *dimensions, 0, 0))
+            attributes = termios.tcgetattr(slave)
+            attributes[3] &= ~termios.ECHO
+            termios.tcsetattr(slave, termios.TCSANOW, attributes)
+            try:
+                process = subprocess.Popen(
+                    [shutil.which('bash') or '/bin/sh', '-c', command],
+                    cwd=directory,
+                    env=dict(environment or os.environ, TERM='xterm-256color'),
+                    stdin=slave,
+                    stdout=slave,
+                    stderr=slave,
+                    start_new_session=True,
+                )
+            except OSError:
+                os.close(master)
+                raise
+            finally:
+                os.close(slave)
+            job = Job(number, command, process, master)
+            self.jobs[number] = job
+            self._touch(number)
+        get_reactor().register(
+            master,
+            lambda data, j=job: self._on_data(j, data),
+            lambda j=job: self._on_eof(j),
+        )
+        if self._paused:
+            get_reactor().pause(master)
+        threading.Thread(target=self._wait, args=(job,), name=f'owl-job-{job.pid}', daemon=True).start()
+        return job
+
+    def find(self, spec=None):
+        """The job for %n, %+, %%, %-, %prefix or the current job if spec is None"""
+        with self._lock:
+            recent = [number for number in self._recent if number in self.jobs]
+            if spec in (None, '%', '%%', '%+', '+'):
+                return self.jobs[recent[-1]] if recent else None
+            if spec in ('%-', '-'):
+                return self.jobs[recent[-2]] if len(recent) > 1 else None
+            spec = spec[1:] if spec.startswith('%') else spec
+            if spec.isdigit():
+                return self.jobs.get(int(spec))
+            for number in reversed(recent):
+                if self.jobs[number].command.startswith(spec):
+                    return self.jobs[number]
+        return None
+
+    def mark(self, job):
+        """+ for the current job, - for the previous one, as `jobs` shows them"""
+        recent = [number for number in self._recent if number in self.jobs]
+        if recent and recent[-1] == job.number:
+            return '+'
+        if len(recent) > 1 and recent[-2] == job.number:
+            return '-'
+        return ' '
+
+    def describe(self, job, pid=False):
+        process = f' {job.pid}' if pid else ''
+        return f'[{job.number}]{self.mark(job)}{process}  {job.status():<24}{job.command}\n'
+
+    def bring_to_foreground(self, job):
+        """Report the job's output live from now on, starting with what it kept"""
+        with job.lock:
+            kept = ''.join(job.output)
+            dropped = job.dropped
+            job.output = deque()
+            job.output_chars = 0
+            job.dropped = 0
+            self.foreground = job
+            with self._lock:
+                self._touch(job.number)
+            if dropped:
+                self.on_event('output', f'[{dropped:,} characters of earlier output not kept]\n')
+            if kept:
+                self.on_event('output', kept)
+        if job.state == 'stopped':
+            self.resume(job)
+
+    def resume(self, job):
+        """Continue a stopped job"""
+        job.state = 'running'
+        job.signal(signal.SIGCONT)
+
+    def suspend(self):
+        """Stop the foreground job (Ctrl-Z) and put it in the background"""
+        job = self.foreground
+        if job is None:
+            return False
+        job.signal(signal.SIGTSTP)
+        job.state = 'stopped'
+        with job.lock:
+            self.foreground = None
+        with self._lock:
+            self._touch(job.number)
+        self.on_event('output', '\n' + self.describe(job))
+        self.on_event('done', STOPPED_EXIT_CODE)
+        return True
+
+    def interrupt(self):
+        """Send SIGINT to the foreground job's process group"""
+        if self.foreground is None:
+            return False
+        self.foreground.signal(signal.SIGINT)
+        return True
+
+    def pause(self):
+        """Stop reading the jobs' output, e.g. while the tab's sink is full"""
+        self._paused = True
+        for job in self.list():
+            get_reactor().pause(job.master)
+
+    def resume_reading(self):
+        self._paused = False
+        for job in self.list():
+            get_reactor().resume(job.master)
+
+    def close(self):
+        """Hang up every job, as closing a terminal does"""
+        for job in self.list():
+            job.signal(signal.SIGHUP)
+            job.signal(signal.SIGCONT)
+
+    def _touch(self, number):
+        if number in self._recent:
+            self._recent.remove(number)
+        self._recent.append(number)
+
+    def _on_data(self, job, data):
+        """Forward or keep a job's output (reactor thread)"""
+        text = job._decoder.decode(data).replace('\r\n', '\n')
+        with job.lock:
+            if job is self.foreground:
+                self.on_event('output', text)
+                return
+            job.output.append(text)
+            job.output_chars += len(text)
+            while job.output_chars > JOB_OUTPUT_CHARS and len(job.output) > 1:
+                removed = job.output.popleft()
+                job.output_chars -= len(removed)
+                job.dropped += len(removed)
+
+    def _on_eof(self, job):
+        with job.lock:
+            job._eof = True
+            exited = job.exit_code is not None
+        if exited:
+            self._finish(job)
+
+    def _wait(self, job):
+        """Wait for the job to exit (waiter thread)"""
+        exit_code = job.process.wait()
+        with job.lock:
+            job.exit_code = exit_code
+            job.finished = time.monotonic()
+            eof = job._eof
+        if not eof:
+            # Let the reactor read what is left, unless a child it left behind keeps the PTY open
+            time.sleep(0.1)
+            get_reactor().unregister(job.master)
+        self._finish(job)
+
+    def _finish(self, job):
+        with self._lock:
+            if self.jobs.get(job.number) is not job:
+                return
+            del self.jobs[job.number]
+            mark = '+' if self._recent and self._recent[-1] == job.number else ' '
+            self._recent.remove(job.number)
+        try:
+            os.close(job.master)
+        except OSError:
+            pass
+        job.state = 'done'
+        with job.lock:
+            foreground = job is self.foreground
+            if foreground:
+                self.foreground = None
+            kept = ''.join(job.output)
+            job.output = deque()
+        if foreground:
+            exit_code = job.exit_code
+            # Killed by a signal: report $? as the shell would
+            self.on_event('done', exit_code if exit_code >= 0 else 128 - exit_code)
+            return
+        # A job that finished in the background shows what it printed, then its status
+        if job.dropped:
+            kept = f'[{job.dropped:,} characters of earlier output not kept]\n' + kept
+        if kept and not kept.endswith('\n'):
+            kept += '\n'
+        self.on_event('output', f'{kept}[{job.number}]{mark}  {job.status():<24}{job.command}\n')
+
+
+def builtin_jobs(session, args):
+    table = session.jobs
+    pid = '-l' in args
+    return ''.join(table.describe(job, pid) for job in table.list()), 0
+
+
+def builtin_fg(session, args):
+    table = session.jobs
+    if session.busy:
+        return 'fg: a command is already running\n', 1
+    job = table.find(args[0] if args else None)
+    if job is None:
+        return f'fg: {args[0] if args else "current"}: no such job\n', 1
+    table.on_event('output', job.command + '\n')
+    table.bring_to_foreground(job)
+    # The job now takes the place of a running command
+    return '', None
+
+
+def builtin_bg(session, args):
+    table = session.jobs
+    job = table.find(args[0] if args else None)
+    if job is None:
+        return f'bg: {args[0] if args else "current"}: no such job\n', 1
+    if job.state == 'running':
+        return f'bg: job {job.number} already in background\n', 0
+    table.resume(job)
+    return f'[{job.number}]{table.mark(job)} {job.command} &\n', 0
+
+
+def builtin_kill(session, args):
+    number = signal.SIGTERM
+    if args and args[0].startswith('-'):
+        name = args.pop(0)[1:].upper()
+        if name == 'S':
+            name = args.pop(0).upper() if args else ''
+        try:
+            number = int(name) if name.isdigit() else signal.Signals[
+                name if name.startswith('SIG') else f'SIG{name}'
+            ]
+        except (KeyError, ValueError):
+            return f'kill: {name}: invalid signal specification\n', 1
+    output = []
+    status = 0
+    for arg in args:
+        if arg.startswith('%'):
+            job = session.jobs.find(arg)
+            if job is None:
+                output.append(f'kill: {arg}: no such job\n')
+                status = 1
+                continue
+            job.signal(number)
+            if job.state == 'stopped' and number in (signal.SIGTERM, signal.SIGHUP, signal.SIGINT):
+                # A stopped job only acts on the signal once it runs again
+                session.jobs.resume(job)
+            continue
+        try:
+            os.kill(int(arg), number)
+        except (ValueError, OSError) as error:
+            output.append(f'kill: {arg}: {getattr(error, "strerror", None) or "arguments must be process or job IDs"}\n')
+            status = 1
+    return ''.join(output), status
+
+
+JOB_BUILTINS = {
+    'jobs': builtin_jobs,
+    'fg': builtin_fg,
+    'bg': builtin_bg,
+    'kill': builtin_kill,
+}
+
+
+def run_job_command(session, command):
+    """Run a job control command for a session.
+
+    Returns `(output, exit_code)`, with exit_code None if a job was brought
+    to the foreground, or None if the command is not about jobs.
+    """
+    if not is_job_command(command):
+        return None
+    background = background_command(command)
+    if background is not None:
+        try:
+            job = session.jobs.start(
+                background, session.current_directory, session.environment(),
+                (session.rows, session.cols)
+            )
+        except OSError as error:
+            return f'{background}: {error.strerror}\n', 1
+        if job is None:
+            return f'Too many jobs in this tab (at most {session.jobs.limit})\n', 1
+        return f'[{job.number}] {job.pid}\n', 0
+    argv = shlex.split(command)
+    return JOB_BUILTINS[argv[0]](session, argv[1:])
@@ -0,0 +1,153 @@
+import time
+import signal
+
+from tkinter import Toplevel, Frame, Button, Label
+from tkinter import ttk
+
+
+# How often the table is refreshed from /proc
+REFRESH_MS = 1000
+COLUMNS = (
+    ('tab', 'Tab', 110),
+    ('job', 'Job', 40),
+    ('pid', 'PID', 70),
+    ('state', 'State', 80),
+    ('runtime', 'Time', 70),
+    ('cpu', 'CPU', 60),
+    ('rss', 'RSS', 80),
+    ('command', 'Command', 300),
+)
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours}:{minutes:02d}:{seconds:02d}' if hours else f'{minutes}:{seconds:02d}'
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f'{size:.0f} {unit}'
+        size /= 1024
+    return f'{size:.1f} GB'
+
+
+class JobPanel:
+    """Window listing every tab's jobs with their PID, runtime, CPU and memory.
+
+    CPU is the share of one core the job's processes used since the last
+    refresh, and RSS their total resident memory, both read from /proc.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        styles = app.styles
+        self.window = styles.register(Toplevel(app.root), 'frame')
+        self.window.title('Jobs')
+        self.window.geometry('860x300')
+
+        self.table = ttk.Treeview(
+            self.window, columns=[name for name, _, _ in COLUMNS], show='headings', selectmode='browse'
+        )
+        for name, heading, width in COLUMNS:
+            self.table.heading(name, text=heading)
+            self.table.column(name, width=width, anchor='w', stretch=name == 'command')
+        self.table.pack(fill='both', expand=True, padx=10, pady=(10, 0))
+
+        controls = styles.register(Frame(self.window), 'frame')
+        controls.pack(fill='x', padx=10, pady=10)
+        for text, command in (
+            ('Foreground', self.foreground),
+            ('Stop', lambda: self.send(signal.SIGTSTP)),
+            ('Continue', lambda: self.send(signal.SIGCONT)),
+            ('Kill', lambda: self.send(signal.SIGTERM)),
+        ):
+            Button(controls, text=text, relief='flat', command=command).pack(side='left', padx=(0, 5))
+        self.summary = Label(controls, font=('Arial', 10))
+        styles.register(self.summary, 'label')
+        self.summary.pack(side='right')
+
+        # Row id -> (tab, job), and job -> (CPU seconds, time) at the last refresh
+        self.rows = {}
+        self.samples = {}
+        self.refresh()
+
+    def tab_titles(self):
+        notebook = self.app.notebook
+        for tab_name in notebook.tabs():
+            tab = self.app.tabs.get(str(tab_name))
+            if tab is not None:
+                yield notebook.tab(tab_name, 'text').rstrip(' ×'), tab
+
+    def refresh(self, schedule=True):
+        if not self.window.winfo_exists():
+            return
+        now = time.monotonic()
+        rows = {}
+        samples = {}
+        for title, tab in self.tab_titles():
+            for job in tab.session.jobs.list():
+                state, cpu_seconds, rss = job.stats()
+                previous = self.samples.get(job)
+                cpu = ''
+                if previous is not None and now > previous[1]:
+                    cpu = f'{100 * (cpu_seconds - previous[0]) / (now - previous[1]):.0f}%'
+                samples[job] = (cpu_seconds, now)
+                if job is tab.session.jobs.foreground:
+                    state = 'foreground'
+                elif state == 'T':
+                    state = 'stopped'
+                else:
+                    state = job.state
+                row = f'{tab.session_id}-{job.number}'
+                rows[row] = (tab, job)
+                values = (
+                    title, f'%{job.number}', job.pid, state, format_duration(job.runtime),
+                    cpu, format_bytes(rss), job.command,
+                )
+                if self.table.exists(row):
+                    self.table.item(row, values=values)
+                else:
+                    self.table.insert('', 'end', iid=row, values=values)
+        for row in set(self.rows) - set(rows):
+            self.table.delete(row)
+        self.rows = rows
+        self.samples = samples
+        tabs = len({tab for tab, _ in rows.values()})
+        self.summary.config(text=f'{len(rows)} jobs in {tabs} tabs')
+        if schedule:
+            self.window.after(REFRESH_MS, self.refresh)
+
+    def selected(self):
+        selection = self.table.selection()
+        return self.rows.get(selection[0]) if selection else None
+
+    def foreground(self):
+        """Bring the selected job to the foreground of its tab and show the tab"""
+        selected = self.selected()
+        if selected is None:
+            return
+        tab, job = selected
+        self.app.notebook.select(tab.frame)
+        self.app.show_tab(tab)
+        if not tab.session.busy:
+            tab.write(f'$ fg %{job.number}\n')
+            tab.session.execute(f'fg %{job.number}')
+
+    def send(self, number):
+        selected = self.selected()
+        if selected is None:
+            return
+        tab, job = selected
+        jobs = tab.session.jobs
+        if number == signal.SIGTSTP and job is jobs.foreground:
+            tab.session.suspend()
+        elif number == signal.SIGCONT or job.state == 'stopped' and number == signal.SIGTERM:
+            job.signal(number)
+            jobs.resume(job)
+        else:
+            job.signal(number)
+            if number == signal.SIGTSTP:
+                job.state = 'stopped'
+        self.refresh(schedule=False)
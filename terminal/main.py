@@ -1,5 +1,10 @@
+import os
+import sys
 import tkinter as tk
 
+# The model package lives next to terminal/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from terminal_app import TerminalApp
 
 
@@ -0,0 +1,254 @@
+import os
+import json
+import time
+import threading
+
+from collections import deque
+
+from cache import get_cache_directory
+
+
+# Event loop heartbeat interval and how many lag samples are kept
+HEARTBEAT_MS = 100
+LAG_SAMPLES = 600
+# How often the Prometheus textfile is rewritten at most
+TEXTFILE_INTERVAL = 10
+# The command log is moved to commands.jsonl.1 once it grows past this
+MAX_LOG_BYTES = 8 * 1024 * 1024
+
+
+class CommandTiming:
+    """Timing record of one command"""
+
+    def __init__(self, command, current_directory):
+        self.command = command
+        self.current_directory = current_directory
+        self.started = time.time()
+        self.start = time.monotonic()
+        self.written = None
+        self.first_byte = None
+        self.end = None
+        self.bytes_start = 0
+        self.bytes_out = 0
+        self.exit_code = None
+        # Run in-process instead of by the shell
+        self.builtin = False
+
+    @property
+    def spawn_ms(self):
+        """Time until the command was written to the shell"""
+        return _ms(self.start, self.written)
+
+    @property
+    def first_byte_ms(self):
+        return _ms(self.start, self.first_byte)
+
+    @property
+    def total_ms(self):
+        return _ms(self.start, self.end)
+
+    def as_dict(self):
+        return {
+            'time': self.started,
+            'command': self.command,
+            'cwd': self.current_directory,
+            'spawn_ms': self.spawn_ms,
+            'first_byte_ms': self.first_byte_ms,
+            'total_ms': self.total_ms,
+            'bytes_out': self.bytes_out,
+            'exit_code': self.exit_code,
+            'builtin': self.builtin,
+        }
+
+
+def _ms(start, end):
+    return None if end is None else round((end - start) * 1000, 3)
+
+
+class MetricsRecorder:
+    """Collects command timings and event loop lag, and exports them.
+
+    Every finished command is appended as a JSON line to
+    `metrics/commands.jsonl` in the cache directory, or as a Fernet token
+    when `cipher` is set, and not at all while `log_commands` is off (as
+    when history is disabled). While `log_command_text` is off (as when
+    history is deleted after a while) the records leave out the command
+    and its directory. The log is rotated to `commands.jsonl.1` past
+    MAX_LOG_BYTES, and `forget_commands` deletes it. Aggregate counters are kept in the Prometheus
+    textfile `metrics/owl.prom`. Both files are written by a background
+    thread, so recording never waits on the disk.
+    """
+
+    def __init__(self, directory=None, cipher=None):
+        self.directory = directory or get_cache_directory('metrics')
+        self.jsonl_path = os.path.join(self.directory, 'commands.jsonl')
+        self.textfile_path = os.path.join(self.directory, 'owl.prom')
+        self.cipher = cipher
+        self.log_commands = True
+        self.log_command_text = True
+        self.last_timing = None
+        self.commands = 0
+        self.failed_commands = 0
+        self.duration_sum = 0.0
+        self.first_byte_sum = 0.0
+        self.spawn_sum = 0.0
+        self.bytes_out = 0
+        self.lag_samples = deque(maxlen=LAG_SAMPLES)
+        self._textfile_written = 0
+        self._lock = threading.Lock()
+        # Held while the command log is written or deleted
+        self._log_lock = threading.Lock()
+        # (record, cipher) of commands not written to the log yet
+        self._pending = deque()
+        self._textfile_due = False
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._writer = None
+
+    def record_command(self, timing):
+        with self._lock:
+            self.last_timing = timing
+            self.commands += 1
+            self.failed_commands += bool(timing.exit_code)
+            self.duration_sum += timing.total_ms / 1000
+            self.first_byte_sum += (timing.first_byte_ms or 0) / 1000
+            self.spawn_sum += (timing.spawn_ms or 0) / 1000
+            self.bytes_out += timing.bytes_out
+        if self.log_commands:
+            record = timing.as_dict()
+            if not self.log_command_text:
+                del record['command'], record['cwd']
+            self._pending.append((record, self.cipher))
+        self._textfile_due = True
+        self._start_writer()
+        self._wakeup.set()
+
+    def record_lag(self, lag_ms):
+        self.lag_samples.append(lag_ms)
+        self._start_writer()
+
+    @property
+    def current_lag_ms(self):
+        return self.lag_samples[-1] if self.lag_samples else 0.0
+
+    @property
+    def max_lag_ms(self):
+        return max(self.lag_samples, default=0.0)
+
+    def _start_writer(self):
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name='owl-metrics', daemon=True)
+            self._writer.start()
+
+    def _write_loop(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(TEXTFILE_INTERVAL)
+            self._wakeup.clear()
+            self.flush()
+
+    def forget_commands(self):
+        """Delete the command log and the records not written yet"""
+        with self._log_lock:
+            self._pending.clear()
+            for path in (self.jsonl_path, self.jsonl_path + '.1'):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def flush(self):
+        """Write the pending command records and, if it is due, the textfile"""
+        try:
+            with self._log_lock:
+                lines = []
+                while self._pending:
+                    record, cipher = self._pending.popleft()
+                    data = json.dumps(record)
+                    lines.append(cipher.encrypt(data.encode()).decode() if cipher is not None else data)
+                if lines:
+                    self._append_log(lines)
+            force, self._textfile_due = self._textfile_due, False
+            self.write_textfile(force)
+        except OSError:
+            pass
+
+    def _append_log(self, lines):
+        try:
+            if os.path.getsize(self.jsonl_path) > MAX_LOG_BYTES:
+                os.replace(self.jsonl_path, self.jsonl_path + '.1')
+        except OSError:
+            pass
+        with open(self.jsonl_path, 'a') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def close(self):
+        """Stop the writer thread and write what is left"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._writer is not None:
+            self._writer.join()
+        self.flush()
+
+    def write_textfile(self, force=False):
+        """Rewrite the Prometheus textfile, at most every TEXTFILE_INTERVAL seconds unless forced"""
+        now = time.monotonic()
+        if not force and now - self._textfile_written < TEXTFILE_INTERVAL:
+            return
+        self._textfile_written = now
+        with self._lock:
+            lines = [
+                '# HELP owl_commands_total Commands run.',
+                '# TYPE owl_commands_total counter',
+                f'owl_commands_total {self.commands}',
+                '# HELP owl_commands_failed_total Commands that exited non-zero.',
+                '# TYPE owl_commands_failed_total counter',
+                f'owl_commands_failed_total {self.failed_commands}',
+                '# HELP owl_command_duration_seconds_total Total wall time of commands.',
+                '# TYPE owl_command_duration_seconds_total counter',
+                f'owl_command_duration_seconds_total {self.duration_sum:.6f}',
+                '# HELP owl_command_first_byte_seconds_total Total time to first byte of commands.',
+                '# TYPE owl_command_first_byte_seconds_total counter',
+                f'owl_command_first_byte_seconds_total {self.first_byte_sum:.6f}',
+                '# HELP owl_command_spawn_seconds_total Total time until commands reached the shell.',
+                '# TYPE owl_command_spawn_seconds_total counter',
+                f'owl_command_spawn_seconds_total {self.spawn_sum:.6f}',
+                '# HELP owl_command_output_bytes_total Bytes of command output.',
+                '# TYPE owl_command_output_bytes_total counter',
+                f'owl_command_output_bytes_total {self.bytes_out}',
+                '# HELP owl_event_loop_lag_seconds Latest Tk event loop lag.',
+                '# TYPE owl_event_loop_lag_seconds gauge',
+                f'owl_event_loop_lag_seconds {self.current_lag_ms / 1000:.6f}',
+                '# HELP owl_event_loop_lag_max_seconds Worst recent Tk event loop lag.',
+                '# TYPE owl_event_loop_lag_max_seconds gauge',
+                f'owl_event_loop_lag_max_seconds {self.max_lag_ms / 1000:.6f}',
+            ]
+        # Write atomically so a collector never sees a partial file
+        tmp_path = self.textfile_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, self.textfile_path)
+
+
+class LagMonitor:
+    """Measures Tk main loop lag from how late `after()` heartbeats fire"""
+
+    def __init__(self, root, recorder, on_sample=None, interval_ms=HEARTBEAT_MS):
+        self.root = root
+        self.recorder = recorder
+        self.on_sample = on_sample
+        self.interval_ms = interval_ms
+        self._expected = None
+
+    def start(self):
+        self._expected = time.monotonic() + self.interval_ms / 1000
+        self.root.after(self.interval_ms, self._heartbeat)
+        return self
+
+    def _heartbeat(self):
+        now = time.monotonic()
+        lag_ms = max(0.0, (now - self._expected) * 1000)
+        self.recorder.record_lag(lag_ms)
+        if self.on_sample is not None:
+            self.on_sample(lag_ms)
+        self._expected = now + self.interval_ms / 1000
+        self.root.after(self.interval_ms, self._heartbeat)
@@ -0,0 +1,129 @@
+import os
+import time
+import threading
+import traceback
+import selectors
+
+
+# How often registered consumers get a tick while their fd is quiet
+TICK_INTERVAL = 0.2
+READ_SIZE = 65536
+
+
+class Reactor:
+    """A single I/O thread multiplexing the PTYs of every shell session.
+
+    Consumers register a file descriptor together with callbacks, all of
+    which are called on the reactor thread:
+
+    - `on_data(data)` with the raw bytes as soon as they are readable
+    - `on_close()` once the fd reports EOF or an error
+    - `on_tick()` (optional) every `TICK_INTERVAL` seconds
+    """
+
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._changes = []
+        self._consumers = {}
+        self._paused = set()
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        self.selector.register(self._wakeup_read, selectors.EVENT_READ)
+        self._thread = threading.Thread(target=self._run, name='owl-reactor', daemon=True)
+        self._thread.start()
+
+    def register(self, fd, on_data, on_close, on_tick=None):
+        self._change(('register', fd, (on_data, on_close, on_tick)))
+
+    def unregister(self, fd):
+        self._change(('unregister', fd, None))
+
+    def pause(self, fd):
+        """Stop reading a fd, leaving the writer to block once the PTY fills up"""
+        self._change(('pause', fd, None))
+
+    def resume(self, fd):
+        self._change(('resume', fd, None))
+
+    def _change(self, change):
+        """Queue a registration change for the reactor thread and wake it up"""
+        with self._lock:
+            self._changes.append(change)
+        os.write(self._wakeup_write, b'\0')
+
+    def _apply_changes(self):
+        with self._lock:
+            changes, self._changes = self._changes, []
+        for action, fd, callbacks in changes:
+            if action == 'register':
+                self._consumers[fd] = callbacks
+                self._paused.discard(fd)
+                self.selector.register(fd, selectors.EVENT_READ)
+            elif fd not in self._consumers:
+                continue
+            elif action == 'unregister':
+                del self._consumers[fd]
+                if fd in self._paused:
+                    self._paused.discard(fd)
+                else:
+                    self.selector.unregister(fd)
+            elif action == 'pause' and fd not in self._paused:
+                self._paused.add(fd)
+                self.selector.unregister(fd)
+            elif action == 'resume' and fd in self._paused:
+                self._paused.discard(fd)
+                self.selector.register(fd, selectors.EVENT_READ)
+
+    def _close(self, fd):
+        on_close = self._consumers.pop(fd)[1]
+        self.selector.unregister(fd)
+        self._dispatch(on_close)
+
+    def _dispatch(self, callback, *args):
+        """Call a consumer, keeping the reactor alive if it raises"""
+        try:
+            callback(*args)
+        except Exception:
+            traceback.print_exc()
+
+    def _run(self):
+        next_tick = time.monotonic() + TICK_INTERVAL
+        while True:
+            timeout = max(0, next_tick - time.monotonic())
+            for key, _ in self.selector.select(timeout):
+                fd = key.fd
+                if fd == self._wakeup_read:
+                    try:
+                        os.read(fd, READ_SIZE)
+                    except BlockingIOError:
+                        pass
+                    continue
+                if fd not in self._consumers:
+                    continue
+                try:
+                    data = os.read(fd, READ_SIZE)
+                except OSError:
+                    data = b''
+                if data:
+                    self._dispatch(self._consumers[fd][0], data)
+                else:
+                    self._close(fd)
+            self._apply_changes()
+            if time.monotonic() >= next_tick:
+                next_tick = time.monotonic() + TICK_INTERVAL
+                for on_tick in [c[2] for c in self._consumers.values() if c[2]]:
+                    self._dispatch(on_tick)
+
+
+_reactor = None
+_reactor_lock = threading.Lock()
+
+
+def get_reactor():
+    """Get the process-wide reactor, starting it on first use"""
+    global _reactor
+    with _reactor_lock:
+        if _reactor is None:
+            _reactor = Reactor()
+        return _reactor
@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import threading
+
+from collections import deque
+
+from cache import get_cache_directory
+
+
+# How often recorded events are written out
+FLUSH_SECONDS = 1.0
+WRITE_BUFFER_BYTES = 1024 * 1024
+# Output fed to the screen per tick when replaying at unbounded speed
+REPLAY_CHARS_PER_TICK = 256 * 1024
+REPLAY_TICK_MS = 16
+
+
+def recording_path(name):
+    """A new .cast file in the recordings cache directory"""
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    return os.path.join(get_cache_directory('recordings'), f'{stamp}-{name}-{os.urandom(2).hex()}.cast')
+
+
+class Recorder:
+    """Appends a session's output, input and resizes to an asciicast v2 file.
+
+    Recording an event only timestamps it and appends it to a deque; a
+    background thread serializes the queued events once a second through
+    a large write buffer and flushes each batch to the file, so the
+    reactor thread never waits on the disk.
+    """
+
+    def __init__(self, path, width, height, title=None):
+        self.path = path
+        self.start = time.monotonic()
+        self._events = deque()
+        self._stop = threading.Event()
+        self._file = open(path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_BYTES)
+        header = {
+            'version': 2,
+            'width': width,
+            'height': height,
+            'timestamp': int(time.time()),
+            'env': {'SHELL': os.environ.get('SHELL', '/bin/bash'), 'TERM': 'xterm-256color'},
+        }
+        if title:
+            header['title'] = title
+        self._file.write(json.dumps(header) + '\n')
+        self._thread = threading.Thread(target=self._run, name='owl-recorder', daemon=True)
+        self._thread.start()
+
+    def output(self, text):
+        self._events.append((time.monotonic(), 'o', text))
+
+    def input(self, text):
+        self._events.append((time.monotonic(), 'i', text))
+
+    def resize(self, width, height):
+        self._events.append((time.monotonic(), 'r', f'{width}x{height}'))
+
+    def _run(self):
+        while not self._stop.wait(FLUSH_SECONDS):
+            self.flush()
+
+    def flush(self):
+        events = self._events
+        start = self.start
+        lines = []
+        while events:
+            moment, code, data = events.popleft()
+            lines.append(json.dumps([round(moment - start, 6), code, data], ensure_ascii=False))
+        if lines:
+            self._file.write('\n'.join(lines) + '\n')
+            # A crash loses at most the events of one interval
+            self._file.flush()
+
+    def close(self):
+        """Write the remaining events and close the file"""
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+        self._file.close()
+
+
+def read_header(path):
+    """The header of an asciicast v2 file"""
+    with open(path, encoding='utf-8') as f:
+        header = json.loads(f.readline())
+    if header.get('version') != 2:
+        raise ValueError(f'{path}: not an asciicast v2 recording')
+    return header
+
+
+def read_events(path):
+    """Yield a recording's events as (time, code, data), reading the file as it goes"""
+    with open(path, encoding='utf-8') as f:
+        f.readline()
+        for line in f:
+            if line.strip():
+                moment, code, data = json.loads(line)
+                yield moment, code, data
+
+
+def replay(path, stream, screen=None):
+    """Feed a recording's output to a pyte stream as fast as possible; returns the characters fed"""
+    fed = 0
+    for _, code, data in read_events(path):
+        if code == 'o':
+            stream.feed(data)
+            fed += len(data)
+        elif code == 'r' and screen is not None:
+            width, _, height = data.partition('x')
+            screen.resize(int(height), int(width))
+    return fed
+
+
+class ReplayWindow:
+    """Plays a recording back into a pyte screen, in real time or at a multiple of it.
+
+    Speed None replays as fast as the screen can take it, a bounded
+    amount of output per frame.
+    """
+
+    def __init__(self, root, path, styles, speed=1.0):
+        import pyte
+        from tkinter import Toplevel, Frame, Text, Label, Button, StringVar
+        from tkinter import ttk
+        from renderer import ScreenRenderer
+
+        self.root = root
+        self.header = read_header(path)
+        self.events = read_events(path)
+        self.screen = pyte.Screen(self.header['width'], self.header['height'])
+        self.stream = pyte.Stream(self.screen)
+        self.speed = speed
+        self.position = 0.0
+        self.fed = 0
+        self.paused = False
+        self._next = None
+        self._last = time.monotonic()
+        self._scheduled = None
+
+        self.window = styles.register(Toplevel(root), 'frame')
+        self.window.title(f'Replay: {os.path.basename(path)}')
+        controls = styles.register(Frame(self.window), 'frame')
+        controls.pack(fill='x', padx=10, pady=(10, 0))
+        self.speed_choice = StringVar(value='max' if speed is None else f'{speed:g}x')
+        speeds = ttk.Combobox(
+            controls, textvariable=self.speed_choice, values=['1x', '2x', '4x', '10x', 'max'], width=5,
+            state='readonly'
+        )
+        speeds.bind('<<ComboboxSelected>>', self.on_speed)
+        speeds.pack(side='left')
+        self.pause_button = Button(controls, text='Pause', relief='flat', command=self.toggle_pause)
+        self.pause_button.pack(side='left', padx=5)
+        self.status_label = Label(controls, font=('Arial', 10))
+        styles.register(self.status_label, 'label')
+        self.status_label.pack(side='left', padx=10)
+
+        self.output_text = Text(
+            self.window, wrap='none', width=self.screen.columns, height=self.screen.lines,
+            font=styles.fonts['output'], relief='flat', highlightthickness=0
+        )
+        styles.register(self.output_text, 'output')
+        self.output_text.pack(fill='both', expand=True, padx=10, pady=10)
+        self.renderer = ScreenRenderer(self.output_text, self.screen)
+        self.window.protocol('WM_DELETE_WINDOW', self.close)
+        self._scheduled = self.root.after(REPLAY_TICK_MS, self.tick)
+
+    def on_speed(self, event=None):
+        choice = self.speed_choice.get()
+        self.speed = None if choice == 'max' else float(choice.rstrip('x'))
+
+    def toggle_pause(self):
+        self.paused = not self.paused
+        self.pause_button.config(text='Play' if self.paused else 'Pause')
+
+    def tick(self):
+        """Feed the events due by now, or a bounded batch at unbounded speed"""
+        self._scheduled = None
+        now = time.monotonic()
+        if not self.paused and self.speed is not None:
+            self.position += (now - self._last) * self.speed
+        self._last = now
+        budget = REPLAY_CHARS_PER_TICK
+        finished = False
+        while not self.paused and budget > 0:
+            if self._next is None:
+                self._next = next(self.events, None)
+                if self._next is None:
+                    finished = True
+                    break
+            moment, code, data = self._next
+            if self.speed is not None and moment > self.position:
+                break
+            if self.speed is None:
+                self.position = moment
+            self._next = None
+            if code == 'o':
+                self.stream.feed(data)
+                self.fed += len(data)
+                budget -= len(data)
+            elif code == 'r':
+                width, _, height = data.partition('x')
+                self.screen.resize(int(height), int(width))
+                self.renderer.reset()
+        self.renderer.schedule()
+        self.status_label.config(
+            text=f'{self.position:.1f}s · {self.fed:,} characters{" · finished" if finished else ""}'
+        )
+        if not finished:
+            self._scheduled = self.root.after(REPLAY_TICK_MS, self.tick)
+
+    def close(self):
+        if self._scheduled is not None:
+            self.root.after_cancel(self._scheduled)
+        self.renderer.cancel()
+        self.events.close()
+        self.window.destroy()
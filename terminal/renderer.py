@@ -0,0 +1,73 @@
+from wcwidth import wcwidth
+
+
+# Redraws are coalesced to at most one per frame (~60 Hz)
+FRAME_INTERVAL_MS = 16
+
+
+def screen_line(screen, y):
+    """Get the text of one screen line, skipping wide character placeholders"""
+    line = screen.buffer[y]
+    chars = []
+    is_wide_char = False
+    for x in range(screen.columns):
+        if is_wide_char:
+            is_wide_char = False
+            continue
+        char = line[x].data
+        if not char:
+            # The placeholder a wide character leaves in the next cell
+            continue
+        is_wide_char = wcwidth(char[0]) == 2
+        chars.append(char)
+    return ''.join(chars).rstrip()
+
+
+def screen_text(screen):
+    """The text of a whole screen, without the blank lines below the last written one"""
+    lines = [screen_line(screen, y) for y in range(screen.lines)]
+    while lines and not lines[-1]:
+        lines.pop()
+    return ''.join(line + '\n' for line in lines)
+
+
+class ScreenRenderer:
+    """Render a pyte screen into a fixed Text viewport.
+
+    Only the lines pyte marks as dirty are rewritten, in place, and
+    redraws requested while a frame is pending are folded into it.
+    """
+
+    def __init__(self, output_text, screen, frame_interval_ms=FRAME_INTERVAL_MS):
+        self.output_text = output_text
+        self.screen = screen
+        self.frame_interval_ms = frame_interval_ms
+        self._scheduled = None
+        self.reset()
+
+    def reset(self):
+        """Lay out a blank viewport matching the screen size"""
+        self.output_text.delete('1.0', 'end')
+        self.output_text.insert('1.0', '\n'.join([''] * self.screen.lines))
+        self.screen.dirty.update(range(self.screen.lines))
+        self.schedule()
+
+    def schedule(self):
+        """Request a redraw on the next frame"""
+        if self._scheduled is None:
+            self._scheduled = self.output_text.after(self.frame_interval_ms, self.render)
+
+    def cancel(self):
+        if self._scheduled is not None:
+            self.output_text.after_cancel(self._scheduled)
+            self._scheduled = None
+
+    def render(self):
+        """Rewrite the dirty lines and move the cursor"""
+        self._scheduled = None
+        dirty = sorted(y for y in self.screen.dirty if y < self.screen.lines)
+        self.screen.dirty.clear()
+        for y in dirty:
+            self.output_text.replace(f'{y + 1}.0', f'{y + 1}.end', screen_line(self.screen, y))
+        cursor = self.screen.cursor
+        self.output_text.mark_set('insert', f'{cursor.y + 1}.{cursor.x}')
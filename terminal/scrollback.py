@@ -0,0 +1,308 @@
+import os
+import gzip
+import shutil
+
+from array import array
+from tkinter import END
+
+from cache import get_cache_directory
+from utils import process_exists
+
+
+DEFAULT_MAX_LINES = 10000
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+# Lines moved out of the widget at a time once a limit is exceeded
+EVICT_BATCH_LINES = 1000
+# Spilled segments shown above the live output at once
+MAX_PAGED_SEGMENTS = 8
+# Stands in for dropped segments between the paged in ones and the live output
+GAP_LINE = '[…]\n'
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def write_segment(path, text, cipher=None):
+    """Write spilled lines gzip compressed, then encrypted if a Fernet cipher is given"""
+    data = gzip.compress(text.encode('utf-8'))
+    if cipher is not None:
+        data = cipher.encrypt(data)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def read_segment(path, cipher=None):
+    """Read a segment written by write_segment, encrypted or not"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(GZIP_MAGIC):
+        if cipher is None:
+            raise OSError(f'{path}: encrypted, and cache encryption is off')
+        try:
+            data = cipher.decrypt(data)
+        except Exception:
+            raise OSError(f'{path}: encrypted with another key')
+    return gzip.decompress(data).decode('utf-8')
+
+
+def sweep_spilled():
+    """Delete segments spilled by processes that are no longer running, e.g. after a crash"""
+    root = get_cache_directory('scrollback')
+    for name in os.listdir(root):
+        pid, _, _ = name.partition('-')
+        if pid.isdigit() and process_exists(int(pid)):
+            continue
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+
+class LineIndex:
+    """Plain-text mirror of a tab's live output, one entry per line.
+
+    Kept up to date by Scrollback as output is inserted and evicted.
+    `offsets[i]` is the character offset of `lines[i]` counted from the
+    start of the tab's output, and `base` the number of lines evicted so
+    far, so a line's number stays the same while it is live.
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.offsets = array('Q')
+        self.partial = ''
+        self.base = 0
+        self._end = 0
+
+    def append(self, text):
+        if '\n' not in text:
+            self.partial += text
+            return
+        parts = (self.partial + text).split('\n')
+        self.partial = parts.pop()
+        offsets = self.offsets
+        end = self._end
+        for line in parts:
+            offsets.append(end)
+            end += len(line) + 1
+        self._end = end
+        self.lines.extend(parts)
+
+    def evict(self, count):
+        """Forget the oldest `count` lines"""
+        count = min(count, len(self.lines))
+        del self.lines[:count]
+        del self.offsets[:count]
+        self.base += count
+
+    def clear(self):
+        self.base += len(self.lines)
+        self.lines = []
+        self.offsets = array('Q')
+        self.partial = ''
+
+    def snapshot(self):
+        """An immutable copy for the search worker: (base, lines, line start offsets)"""
+        offsets = array('Q', self.offsets)
+        lines = list(self.lines)
+        if self.partial:
+            lines.append(self.partial)
+            offsets.append(self._end)
+        return self.base, lines, offsets
+
+
+class Scrollback:
+    """Keep a tab's output widget bounded, spilling the oldest lines to disk.
+
+    Evicted lines are written in batches to gzip segment files under the
+    cache directory, encrypted with `cipher` if one is set; they are
+    deleted by `clear` when the tab is cleared or closed, and by
+    `sweep_spilled` after a crash. When the user scrolls to the top of the
+    widget the next older spilled segment is paged back in above the
+    output, at most MAX_PAGED_SEGMENTS at a time; paged in lines are
+    dropped again once the view returns to the bottom.
+
+    Spilled text is stored without its tags; if a TagPool is attached, tags
+    left without any text are deleted after each eviction. `index` mirrors
+    the live lines as plain text for searching.
+    """
+
+    def __init__(self, output_text, max_lines=DEFAULT_MAX_LINES, max_bytes=DEFAULT_MAX_BYTES):
+        self.output_text = output_text
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.directory = None
+        self.segments = []
+        self.segment_lines = []
+        self.index = LineIndex()
+        # Spilled segments shown above the live output (paged_in of them,
+        # from paged_first on), how many lines they take up at the top of
+        # the widget, and whether a gap line separates them from the live
+        # output because newer segments were dropped
+        self.paged_first = 0
+        self.paged_in = 0
+        self.paged_lines = 0
+        self.gap = False
+        self.live_bytes = 0
+        self.tag_pool = None
+        # Encrypts segments spilled from now on; each segment is read back
+        # with the cipher it was written with
+        self.cipher = None
+        self._segment_ciphers = {}
+
+    def insert(self, text, *tags):
+        """Append output, evicting old lines if the tab is over its limits"""
+        self.output_text.insert(END, text, tags)
+        self.index.append(text)
+        self.live_bytes += len(text.encode('utf-8'))
+        self.trim()
+
+    def insert_spans(self, spans):
+        """Append [(text, tags)] spans in a single widget insert"""
+        if not spans:
+            return
+        arguments = []
+        for text, tags in spans:
+            arguments.extend((text, tags))
+            self.index.append(text)
+            self.live_bytes += len(text.encode('utf-8'))
+        self.output_text.insert(END, *arguments)
+        self.trim()
+
+    def line_count(self):
+        return int(self.output_text.index('end-1c').split('.')[0])
+
+    def at_bottom(self):
+        return self.output_text.yview()[1] >= 1.0
+
+    def trim(self):
+        """Evict the oldest live lines in batches while over the limits"""
+        if self.paged_lines:
+            # Leave paged in history alone while the user is reading it
+            if not self.at_bottom():
+                return
+            self.page_out()
+        while self.line_count() > self.max_lines or self.live_bytes > self.max_bytes:
+            end = f'{EVICT_BATCH_LINES + 1}.0'
+            evicted = self.output_text.get('1.0', end)
+            if not evicted:
+                break
+            self.output_text.delete('1.0', end)
+            self.live_bytes -= len(evicted.encode('utf-8'))
+            self.index.evict(evicted.count('\n'))
+            self.spill(evicted)
+            if self.tag_pool is not None:
+                self.tag_pool.collect()
+
+    def spill(self, text):
+        """Write evicted lines to a new compressed segment file"""
+        if self.directory is None:
+            # Named after the process, so sweep_spilled can tell whose segments are stale
+            self.directory = get_cache_directory('scrollback', f'{os.getpid()}-{os.urandom(8).hex()}')
+        path = os.path.join(self.directory, f'{len(self.segments):08d}.gz')
+        write_segment(path, text, self.cipher)
+        self._segment_ciphers[path] = self.cipher
+        self.segments.append(path)
+        self.segment_lines.append(text.count('\n'))
+
+    def on_scroll(self, first, last):
+        """Page older output back in when the view reaches the top"""
+        if float(first) <= 0.0 and self._next_older() is not None:
+            self.output_text.after_idle(self.page_in)
+
+    def _next_older(self):
+        """The segment page_in would insert next, or None if the oldest is shown"""
+        index = self.paged_first - 1 if self.paged_in else len(self.segments) - 1
+        return index if index >= 0 else None
+
+    def _segment_text(self, index):
+        try:
+            return self.read_segment(self.segments[index])
+        except OSError:
+            # Keep the line numbers of the segments around it right
+            return '\n' * self.segment_lines[index]
+
+    def page_in(self, force=False):
+        """Insert the next older spilled segment above the output"""
+        index = self._next_older()
+        if index is None:
+            return
+        if not force and self.output_text.yview()[0] > 0.0:
+            return
+        text = self._segment_text(index)
+        self.output_text.insert('1.0', text)
+        added = self.segment_lines[index]
+        self.paged_first = index
+        self.paged_in += 1
+        self.paged_lines += added
+        if self.paged_in > MAX_PAGED_SEGMENTS:
+            self._drop_newest_paged()
+        # Keep the line the user was looking at in view
+        self.output_text.yview(f'{added + 1}.0')
+
+    def _drop_newest_paged(self):
+        """Remove the newest paged in segment, leaving a gap line above the live output"""
+        last = self.paged_first + self.paged_in - 1
+        start = sum(self.segment_lines[self.paged_first:last]) + 1
+        self.output_text.delete(f'{start}.0', f'{start + self.segment_lines[last]}.0')
+        self.paged_in -= 1
+        self.paged_lines -= self.segment_lines[last]
+        if not self.gap:
+            self.output_text.insert(f'{start}.0', GAP_LINE)
+            self.paged_lines += 1
+            self.gap = True
+
+    def read_segment(self, path):
+        return read_segment(path, self._segment_ciphers.get(path))
+
+    def widget_line(self, line):
+        """The widget line showing a live line numbered as in `index`, or None if evicted"""
+        relative = line - self.index.base
+        if relative < 0 or relative > len(self.index.lines):
+            return None
+        return self.paged_lines + relative + 1
+
+    def segment_line(self, segment, line):
+        """Page in spilled `segment` if needed; the widget line of its `line`.
+
+        Segments a few older than those shown are paged in one by one;
+        otherwise the paged in ones are dropped and only `segment` is shown,
+        so at most MAX_PAGED_SEGMENTS are ever read for one jump.
+        """
+        oldest = self.paged_first if self.paged_in else len(self.segments)
+        newest = oldest + self.paged_in - 1
+        if segment > newest or oldest - segment > MAX_PAGED_SEGMENTS:
+            self.page_out()
+            if segment < len(self.segments) - 1:
+                self.output_text.insert('1.0', GAP_LINE)
+                self.paged_lines = 1
+                self.gap = True
+            self.output_text.insert('1.0', self._segment_text(segment))
+            self.paged_first = segment
+            self.paged_in = 1
+            self.paged_lines += self.segment_lines[segment]
+        while not self.paged_in or self.paged_first > segment:
+            self.page_in(force=True)
+        return sum(self.segment_lines[self.paged_first:segment]) + line + 1
+
+    def page_out(self):
+        """Drop paged in history from the top of the widget"""
+        self.output_text.delete('1.0', f'{self.paged_lines + 1}.0')
+        self.paged_first = 0
+        self.paged_in = 0
+        self.paged_lines = 0
+        self.gap = False
+
+    def clear(self):
+        """Clear the widget and delete all spilled segments"""
+        self.output_text.delete('1.0', END)
+        if self.tag_pool is not None:
+            self.tag_pool.clear()
+        self.paged_first = 0
+        self.paged_in = 0
+        self.paged_lines = 0
+        self.gap = False
+        self.live_bytes = 0
+        self.segments = []
+        self.segment_lines = []
+        self._segment_ciphers = {}
+        self.index.clear()
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
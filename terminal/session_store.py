@@ -0,0 +1,149 @@
+import os
+import json
+import zlib
+import shutil
+import threading
+
+
+MANIFEST = 'manifest'
+# Every Fernet token starts with its version byte and timestamp, base64 encoded
+FERNET_PREFIX = b'gAAAAA'
+# Journal characters kept per tab; the oldest chunks are deleted past this
+MAX_TAB_CHARS = 8 * 1024 * 1024
+# Exported variables that describe the old process rather than the user's setup
+VOLATILE_VARIABLES = frozenset({'PWD', 'OLDPWD', 'SHLVL', '_', 'COLUMNS', 'LINES'})
+
+
+class SessionStore:
+    """Saves the notebook's tabs so they can be restored on the next start.
+
+    The manifest holds each tab's metadata (title, cwd, environment,
+    directory stack) and the list of its scrollback chunks. Scrollback is
+    saved incrementally: every save appends only the output the tab got
+    since the last one as a new zlib-compressed chunk (Fernet-encrypted when
+    a cipher is set), so loading the manifest never touches the chunks.
+
+    Each file is decoded by what it holds, not by the current setting, so
+    files saved before encryption was turned on or off still load; an
+    encrypted file is read with the cipher `load_cipher()` returns when no
+    cipher is set. `unreadable` counts the files that could not be decoded.
+    """
+
+    def __init__(self, directory, cipher=None, load_cipher=None, max_tab_chars=MAX_TAB_CHARS):
+        self.directory = directory
+        self.cipher = cipher
+        self.load_cipher = load_cipher
+        self.max_tab_chars = max_tab_chars
+        self.unreadable = 0
+        self._read_cipher = None
+        self._lock = threading.Lock()
+        # Tab id -> [(chunk file name, characters)], as last saved
+        self._chunks = {}
+
+    def _encode(self, data):
+        data = zlib.compress(data)
+        return self.cipher.encrypt(data) if self.cipher is not None else data
+
+    def _decode(self, data):
+        if data.startswith(FERNET_PREFIX):
+            cipher = self.cipher or self._reading_cipher()
+            if cipher is None:
+                raise ValueError('encrypted and no key is available')
+            data = cipher.decrypt(data)
+        return zlib.decompress(data)
+
+    def _reading_cipher(self):
+        """The cipher for files saved while encryption was on, if one can be loaded"""
+        if self._read_cipher is None and self.load_cipher is not None:
+            self._read_cipher = self.load_cipher()
+        return self._read_cipher
+
+    def _read(self, path):
+        """Decode a saved file; None if it is missing or cannot be decoded"""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            return self._decode(data)
+        except Exception:
+            # Written with another key, or cut short by a crash
+            self.unreadable += 1
+            return None
+
+    def _write(self, path, data):
+        temporary = f'{path}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(self._encode(data))
+        os.replace(temporary, path)
+
+    def load(self):
+        """The saved tabs' metadata, in notebook order; [] if nothing was saved"""
+        data = self._read(os.path.join(self.directory, MANIFEST))
+        try:
+            manifest = json.loads(data)
+        except (TypeError, ValueError):
+            return []
+        tabs = manifest.get('tabs', [])
+        with self._lock:
+            for tab in tabs:
+                self._chunks[tab['id']] = [tuple(chunk) for chunk in tab.get('chunks', [])]
+        return tabs
+
+    def load_scrollback(self, tab_id):
+        """Decompress a saved tab's scrollback"""
+        with self._lock:
+            chunks = list(self._chunks.get(tab_id, []))
+        parts = []
+        for name, _ in chunks:
+            data = self._read(os.path.join(self.directory, tab_id, name))
+            if data is not None:
+                parts.append(data.decode('utf-8', 'replace'))
+        return ''.join(parts)
+
+    def save(self, tabs):
+        """Save tabs given as dicts with id, title, cwd, environment,
+        directory_stack, previous_directory, reset (scrollback was cleared)
+        and output (text since the last save)"""
+        with self._lock:
+            manifest = []
+            for tab in tabs:
+                tab_id = tab['id']
+                tab_directory = os.path.join(self.directory, tab_id)
+                chunks = self._chunks.get(tab_id, [])
+                if tab['reset']:
+                    shutil.rmtree(tab_directory, ignore_errors=True)
+                    chunks = []
+                if tab['output']:
+                    os.makedirs(tab_directory, exist_ok=True)
+                    number = int(chunks[-1][0].split('.')[0]) + 1 if chunks else 0
+                    name = f'{number:08d}.z'
+                    self._write(os.path.join(tab_directory, name), tab['output'].encode('utf-8'))
+                    chunks = chunks + [(name, len(tab['output']))]
+                while len(chunks) > 1 and sum(size for _, size in chunks) > self.max_tab_chars:
+                    try:
+                        os.remove(os.path.join(tab_directory, chunks[0][0]))
+                    except OSError:
+                        pass
+                    chunks = chunks[1:]
+                self._chunks[tab_id] = chunks
+                metadata = {key: value for key, value in tab.items() if key not in ('reset', 'output')}
+                metadata['chunks'] = chunks
+                manifest.append(metadata)
+            self._write(os.path.join(self.directory, MANIFEST), json.dumps({'tabs': manifest}).encode())
+            # Drop the scrollback of tabs that were closed
+            for tab_id in set(self._chunks) - {tab['id'] for tab in tabs}:
+                del self._chunks[tab_id]
+                shutil.rmtree(os.path.join(self.directory, tab_id), ignore_errors=True)
+
+
+def saved_environment(session):
+    """The exported variables a session set on top of the app's environment"""
+    if not session.variables:
+        return {}
+    return {
+        name: value for name, value in session.variables.items()
+        if name in session.exported and name not in VOLATILE_VARIABLES
+        and os.environ.get(name) != value
+    }
@@ -11,6 +11,9 @@ from tkinter import Frame, Label, Button, Entry, StringVar
 from tkinter import ttk
 from tkinter import filedialog, messagebox
 
+from cache import get_cache_directory, load_or_generate_key
+from history import AUTO_DELETE_WINDOWS
+
 
 class SettingsWindow:
     def __init__(self, parent):
@@ -38,29 +41,18 @@ class SettingsWindow:
 
     def load_or_generate_key(self):
         """Load or generate an encryption key for secure settings."""
-        key_file = os.path.join(self.get_cache_directory(), 'encryption_key.key')
-        if os.path.exists(key_file):
-            with open(key_file, 'rb') as f:
-                return f.read()
-        else:
-            key = Fernet.generate_key()
-            with open(key_file, 'wb') as f:
-                f.write(key)
-            return key
+        return load_or_generate_key()
 
     def get_cache_directory(self):
         """Get the cache directory (default: .secret_owl in the app directory)."""
-        cache_dir = os.path.join(os.getcwd(), '.secret_owl')
-        if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir)
-        return cache_dir
+        return get_cache_directory()
 
     def create_accessibility_tab(self):
         accessibility_tab = Frame(self.settings_notebook)
         self.settings_notebook.add(accessibility_tab, text='Accessibility')
 
         Label(accessibility_tab, text='Font Size:').pack(pady=5)
-        self.font_size_var = StringVar(value='12')  # Set default value
+        self.font_size_var = StringVar(value=str(self.parent.styles.font_size))
         Entry(accessibility_tab, textvariable=self.font_size_var).pack(pady=5)
 
         Label(accessibility_tab, text='Theme:').pack(pady=5)
@@ -72,6 +64,14 @@ class SettingsWindow:
         )
         theme_menu.pack(pady=5)
 
+        Label(accessibility_tab, text='Scrollback Lines per Tab:').pack(pady=5)
+        self.scrollback_lines_var = StringVar(value=str(self.parent.scrollback_lines))
+        Entry(accessibility_tab, textvariable=self.scrollback_lines_var).pack(pady=5)
+
+        Label(accessibility_tab, text='Scrollback Size per Tab (MB):').pack(pady=5)
+        self.scrollback_mb_var = StringVar(value=str(self.parent.scrollback_bytes // (1024 * 1024)))
+        Entry(accessibility_tab, textvariable=self.scrollback_mb_var).pack(pady=5)
+
     def create_vpn_tab(self):
         vpn_tab = Frame(self.settings_notebook)
         self.settings_notebook.add(vpn_tab, text='VPN')
@@ -99,7 +99,7 @@ class SettingsWindow:
         self.settings_notebook.add(privacy_tab, text='Privacy')
 
         # Pass-lock toggle
-        self.pass_lock_var = tk.BooleanVar(value=False)
+        self.pass_lock_var = tk.BooleanVar(value=self.parent.pass_lock)
         tk.Checkbutton(
             privacy_tab,
             text='Enable Pass-lock',
@@ -108,7 +108,7 @@ class SettingsWindow:
 
         # History settings
         Label(privacy_tab, text='Terminal History:').pack(pady=5)
-        self.history_var = tk.StringVar(value='keep')  # Default: keep history
+        self.history_var = tk.StringVar(value=self.parent.history_setting)
         tk.Radiobutton(
             privacy_tab,
             text='Keep History',
@@ -130,16 +130,16 @@ class SettingsWindow:
 
         # Auto-deletion time selection
         Label(privacy_tab, text='Auto-delete After:').pack(pady=5)
-        self.auto_delete_time_var = tk.StringVar(value='1 minute')
+        self.auto_delete_time_var = tk.StringVar(value=self.parent.auto_delete_time)
         auto_delete_menu = ttk.Combobox(
             privacy_tab,
             textvariable=self.auto_delete_time_var,
-            values=['1 minute', '1 hour', '1 day', '1 week', '1 month', '3 months', '6 months', '12 months']
+            values=list(AUTO_DELETE_WINDOWS)
         )
         auto_delete_menu.pack(pady=5)
 
         # Encryption for cache data
-        self.encrypt_cache_var = tk.BooleanVar(value=False)
+        self.encrypt_cache_var = tk.BooleanVar(value=self.parent.encrypt_cache)
         tk.Checkbutton(
             privacy_tab,
             text='Encrypt All Cache Data',
@@ -176,11 +176,21 @@ class SettingsWindow:
             )
             return  # Exit the method if the font size is invalid
 
-        self.parent.entry_font = ('Consolas', new_font_size)
-        self.parent.output_font = ('Consolas', new_font_size - 1)
-        self.parent.current_theme = self.theme_var.get()
-        self.parent.current_style = self.parent.themes[self.parent.current_theme]
-        self.parent.apply_style()
+        try:
+            scrollback_lines = int(self.scrollback_lines_var.get())
+            scrollback_mb = int(self.scrollback_mb_var.get())
+            if scrollback_lines <= 0 or scrollback_mb <= 0:
+                raise ValueError('Scrollback limits must be positive integers.')
+        except ValueError as e:
+            messagebox.showerror(
+                'Invalid Scrollback Limit',
+                f'Please enter positive integers for the scrollback limits. Error: {e}'
+            )
+            return
+
+        self.parent.styles.set_font_size(new_font_size)
+        self.parent.set_theme(self.theme_var.get())
+        self.parent.set_scrollback_limits(scrollback_lines, scrollback_mb * 1024 * 1024)
 
         # Apply VPN Settings
         vpn_file_path = self.vpn_file_path.get().strip()
@@ -240,17 +250,6 @@ class SettingsWindow:
         # Save secure settings
         self.save_secure_settings()
 
-        # Update font in all tabs
-        for tab_id in self.parent.notebook.tabs():
-            tab_frame = self.parent.notebook.nametowidget(tab_id)
-            for widget in tab_frame.winfo_children():
-                if isinstance(widget, Frame):
-                    for child in widget.winfo_children():
-                        if isinstance(child, Entry):
-                            child.configure(font=self.parent.entry_font)
-                elif isinstance(widget, tk.Text):
-                    widget.configure(font=self.parent.output_font)
-
     def save_secure_settings(self):
         """Save secure settings to an encrypted file."""
         secure_settings = {
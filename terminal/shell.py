@@ -0,0 +1,263 @@
+import os
+import re
+import time
+import codecs
+import itertools
+import shutil
+import threading
+
+from reactor import get_reactor
+from utils import looks_interactive, is_reading_stdin, stdin_path, child_pids, remember_interactive
+
+
+# The shell reports every finished command as an OSC 633 sequence carrying
+# a per-session token, the exit status and the working directory. Quiet
+# commands are bracketed by two more, carrying qb<n> and qe<n> instead, so
+# their output is told apart from a command's by number, not by order
+MARKER_START = '\x1b]633;'
+QUIET_WRAPPER = (
+    "printf '\\033]633;{token};qb{number}\\007'; {command}; "
+    "printf '\\033]633;{token};qe{number}\\007'"
+)
+SHELL_RC = '''[ -f ~/.bashrc ] && . ~/.bashrc
+stty -echo
+PS1=''
+PS2=''
+PROMPT_COMMAND='printf "\\033]633;{token};%s;%s\\007" "$?" "$PWD"'
+'''
+
+
+class ShellSession:
+    """A long-lived shell on a PTY that commands are written to.
+
+    The PTY is read by the shared reactor thread and the session reports
+    to `on_event` (called on that thread) as `(kind, payload)`:
+
+    - `('ready', cwd)` once the shell has started
+    - `('output', text)` for output of a line-oriented command
+    - `('interactive', text)` when the running command turns out to be
+      interactive; its output is then reported as `('screen', text)`
+    - `('done', (exit_code, cwd))` when a command has finished
+    - `('exit', None)` when the shell itself has exited
+    """
+
+    def __init__(self, current_directory, on_event, quiet_period=0.2, dimensions=(24, 80)):
+        self.current_directory = current_directory
+        self.on_event = on_event
+        self.quiet_period = quiet_period
+        self.dimensions = dimensions
+        self.token = os.urandom(8).hex()
+        self.marker = re.compile(
+            re.escape(f'{MARKER_START}{self.token};') + r'(?:(-?\d+);([^\x07]*)|q([be])(\d+))\x07'
+        )
+        self.child = None
+        # The PTY slave the shell and the commands it runs read from
+        self.terminal = None
+        self.ready = False
+        self.command = None
+        self.interactive = False
+        # Whether the running command showed it is interactive, as opposed
+        # to being run as one because it was the last time
+        self._confirmed = False
+        self._pending_commands = []
+        # Output callbacks of quiet commands in flight by number, the one
+        # whose output is being read, and how many of the prompt markers
+        # to come were printed after a quiet command rather than a command
+        self._quiet = {}
+        self._quiet_numbers = itertools.count()
+        self._quiet_current = None
+        self._quiet_output = []
+        self._quiet_prompts = 0
+        self._pending_output = ''
+        self._last_output = 0
+        # Raw bytes read from the PTY, and when the current command was written to it
+        self.bytes_read = 0
+        self.command_written_at = None
+        self._decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        self._lock = threading.Lock()
+
+    @property
+    def busy(self):
+        return self.command is not None
+
+    def start(self):
+        # Imported here so the window can draw before the PTY modules load
+        import tempfile
+        import pexpect
+
+        fd, self._rc_file = tempfile.mkstemp(prefix='owl-shell-', suffix='.rc')
+        with os.fdopen(fd, 'w') as f:
+            f.write(SHELL_RC.format(token=self.token))
+        self.child = pexpect.spawn(
+            shutil.which('bash') or '/bin/bash',
+            ['--rcfile', self._rc_file, '--noediting', '-i'],
+            cwd=self.current_directory,
+            env=dict(os.environ, TERM='xterm-256color'),
+            encoding='utf-8',
+            codec_errors='replace',
+            dimensions=self.dimensions
+        )
+        # pexpect sleeps 50 ms before every write by default
+        self.child.delaybeforesend = None
+        self.terminal = stdin_path(self.child.pid)
+        get_reactor().register(
+            self.child.child_fd, self._on_data, self._on_close, self._on_tick
+        )
+        return self
+
+    def run(self, command, interactive=False):
+        """Write a command to the shell; it is queued until the shell is ready.
+
+        Output of a command already known to be `interactive` is reported as
+        screen output from the start.
+        """
+        with self._lock:
+            self.command = command
+            self.interactive = interactive
+            self._confirmed = False
+            self._last_output = time.monotonic()
+            self.command_written_at = None
+            if not self.ready:
+                self._pending_commands.append(command)
+                return
+        self.command_written_at = time.monotonic()
+        self.child.write(command + '\n')
+
+    def run_quiet(self, command, on_output=None):
+        """Run a command for its effect on the shell state without reporting it.
+
+        If given, `on_output(text)` is called with the command's output once
+        it has finished (on the reactor thread).
+        """
+        with self._lock:
+            number = next(self._quiet_numbers)
+            self._quiet[number] = on_output
+            command = QUIET_WRAPPER.format(token=self.token, number=number, command=command)
+            if not self.ready:
+                self._pending_commands.append(command)
+                return
+        self.child.write(command + '\n')
+
+    def send(self, data):
+        """Send raw input to the running command"""
+        if self.child is not None and self.child.isalive():
+            self.child.write(data)
+
+    def interrupt(self):
+        """Send Ctrl-C to the running command"""
+        if self.child is not None and self.child.isalive():
+            self.child.sendintr()
+
+    def resize(self, rows, cols):
+        self.dimensions = (rows, cols)
+        if self.child is not None and self.child.isalive():
+            self.child.setwinsize(rows, cols)
+
+    def pause_reading(self):
+        """Stop reading output until `resume_reading`; the command blocks when the PTY is full"""
+        get_reactor().pause(self.child.child_fd)
+
+    def resume_reading(self):
+        get_reactor().resume(self.child.child_fd)
+
+    def close(self):
+        if self.child is not None:
+            get_reactor().unregister(self.child.child_fd)
+            self.child.close(force=True)
+
+    def _on_data(self, data):
+        self._last_output = time.monotonic()
+        self.bytes_read += len(data)
+        self._feed(self._decoder.decode(data))
+
+    def _on_close(self):
+        self.on_event('exit', None)
+
+    def _on_tick(self):
+        """Treat a command that went quiet blocked on a terminal read as interactive"""
+        if not self.busy or self._confirmed or not self.ready:
+            return
+        if time.monotonic() - self._last_output < self.quiet_period:
+            return
+        if any(is_reading_stdin(pid, self.terminal) for pid in child_pids(self.child.pid)):
+            self._confirmed = True
+            if not self.interactive:
+                self.interactive = True
+                remember_interactive(self.command, True)
+                self.on_event('interactive', '')
+
+    def _feed(self, data):
+        data = self._pending_output + data
+        self._pending_output = ''
+        while True:
+            match = self.marker.search(data)
+            if match is None:
+                break
+            self._output(data[:match.start()])
+            if match.group(3) is not None:
+                self._quiet_marker(match.group(3), int(match.group(4)))
+            else:
+                self._finish(int(match.group(1)), match.group(2))
+            data = data[match.end():]
+        # Hold back what may be the start of a marker split across reads
+        cut = data.rfind('\x1b')
+        if cut != -1 and '\x07' not in data[cut:]:
+            tail = data[cut:]
+            if MARKER_START.startswith(tail) or tail.startswith(MARKER_START):
+                self._pending_output = tail
+                data = data[:cut]
+        self._output(data)
+
+    def _output(self, text):
+        if not text or not self.ready:
+            return
+        if self._quiet_current is not None:
+            self._quiet_output.append(text)
+            return
+        if self.interactive:
+            if not self._confirmed and looks_interactive(text):
+                self._confirmed = True
+            self.on_event('screen', text)
+        elif self.busy and looks_interactive(text):
+            self.interactive = True
+            self._confirmed = True
+            remember_interactive(self.command, True)
+            self.on_event('interactive', text)
+        else:
+            self.on_event('output', text.replace('\r\n', '\n'))
+
+    def _finish(self, exit_code, cwd):
+        self.current_directory = cwd
+        if not self.ready:
+            with self._lock:
+                self.ready = True
+                pending, self._pending_commands = self._pending_commands, []
+            os.remove(self._rc_file)
+            self.on_event('ready', cwd)
+            for command in pending:
+                self.command_written_at = time.monotonic()
+                self.child.write(command + '\n')
+            return
+        if self._quiet_prompts:
+            self._quiet_prompts -= 1
+            return
+        if self.command is None:
+            return
+        # A command that was run as interactive but never acted like it is forgotten
+        remember_interactive(self.command, self._confirmed)
+        self.command = None
+        self.interactive = False
+        self.on_event('done', (exit_code, cwd))
+
+    def _quiet_marker(self, edge, number):
+        """Start or finish collecting the output of quiet command `number`"""
+        if edge == 'b':
+            self._quiet_current = number
+            self._quiet_output = []
+            return
+        self._quiet_current = None
+        self._quiet_prompts += 1
+        on_output = self._quiet.pop(number, None)
+        output, self._quiet_output = ''.join(self._quiet_output), []
+        if on_output is not None:
+            on_output(output.replace('\r\n', '\n'))
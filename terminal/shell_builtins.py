@@ -0,0 +1,268 @@
+import os
+import re
+import shlex
+import shutil
+
+
+# Anything beyond a simple command (pipes, lists, redirections, globs,
+# substitutions, escapes, comments, tilde expansion and any $ other than
+# $NAME) is left to the shell
+NOT_SIMPLE = re.compile(r'[`|&;<>*?\[\](){}\\\n~#]|\$(?![A-Za-z_])')
+SIMPLE_VARIABLE = re.compile(r'\$\{(\w+)\}')
+VARIABLE = re.compile(r'\$(?:\{(\w+)\}|(\w+))')
+NAME = re.compile(r'^[A-Za-z_]\w*$')
+
+# Bash builtins and keywords that can change the state of the shell
+STATE_CHANGING = frozenset({
+    '.', 'source', 'export', 'unset', 'declare', 'typeset', 'local', 'readonly',
+    'set', 'eval', 'alias', 'unalias', 'cd', 'pushd', 'popd', 'read', 'shift',
+    'exec', 'let', 'function', 'mapfile', 'readarray', 'getopts', 'hash', 'shopt',
+})
+
+# Prints every shell variable as NAME=value, NUL separated, prefixed
+# with x if it is exported and v if it is not
+DUMP_VARIABLES = (
+    'for __owl_v in $(compgen -e); do printf \'x%s=%s\\0\' "$__owl_v" "${!__owl_v}"; done; '
+    'for __owl_v in $(compgen -v); do printf \'v%s=%s\\0\' "$__owl_v" "${!__owl_v}"; done; '
+    'unset __owl_v'
+)
+
+
+def parse(command):
+    """Split a simple command into argv, or None if the shell has to run it"""
+    if NOT_SIMPLE.search(SIMPLE_VARIABLE.sub(r'$\1', command)):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+    return argv or None
+
+
+def may_change_shell_state(command):
+    """Check whether running a command in the shell could change its variables"""
+    argv = parse(command)
+    if argv is None:
+        return True
+    name = argv[0]
+    return '=' in name or name in STATE_CHANGING or shutil.which(name) is None
+
+
+def parse_variables(dump):
+    """Parse the output of DUMP_VARIABLES into a dict and a set of exported names"""
+    variables = {}
+    exported = set()
+    for entry in dump.split('\0'):
+        name, sep, value = entry[1:].partition('=')
+        if sep and NAME.match(name):
+            variables.setdefault(name, value)
+            if entry[0] == 'x':
+                exported.add(name)
+    return variables, exported
+
+
+def expand(session, word):
+    """Expand $NAME and ${NAME} in a word against the session's variables"""
+    return VARIABLE.sub(
+        lambda m: session.variables.get(m.group(1) or m.group(2), ''), word
+    )
+
+
+def abbreviate(session, path):
+    """Abbreviate the home directory to ~ like `dirs` does"""
+    home = session.variables.get('HOME') or os.path.expanduser('~')
+    if path == home or path.startswith(home.rstrip('/') + '/'):
+        return '~' + path[len(home.rstrip('/')):]
+    return path
+
+
+def has_options(args):
+    """Check for options; the builtins here only take plain arguments"""
+    return any(arg.startswith(('-', '+')) and arg != '-' for arg in args)
+
+
+def follows_cdpath(session):
+    """Check whether cd could search CDPATH, which is left to the shell"""
+    return session.variables is None or bool(session.variables.get('CDPATH'))
+
+
+def change_directory(session, target):
+    """Change the session directory in-process and mirror it in the shell"""
+    path = os.path.abspath(os.path.join(session.current_directory, os.path.expanduser(target)))
+    if not os.path.isdir(path):
+        reason = 'Not a directory' if os.path.exists(path) else 'No such file or directory'
+        return f'cd: {target}: {reason}\n', 1
+    if not os.access(path, os.X_OK):
+        return f'cd: {target}: Permission denied\n', 1
+    session.previous_directory = session.current_directory
+    session.current_directory = path
+    session.shell.run_quiet(f'cd -- {shlex.quote(path)}')
+    return '', 0
+
+
+def builtin_cd(session, args):
+    if len(args) > 1 or has_options(args) or follows_cdpath(session):
+        return None
+    if not args:
+        target = session.variables.get('HOME') or os.path.expanduser('~')
+    elif args[0] == '-':
+        if session.previous_directory is None:
+            return 'cd: OLDPWD not set\n', 1
+        output, status = change_directory(session, session.previous_directory)
+        return output or f'{session.current_directory}\n', status
+    else:
+        target = args[0]
+    return change_directory(session, target)
+
+
+def builtin_pwd(session, args):
+    if args:
+        return None
+    return f'{session.current_directory}\n', 0
+
+
+def builtin_dirs(session, args):
+    if args or session.variables is None:
+        return None
+    stack = [session.current_directory] + session.directory_stack
+    return ' '.join(abbreviate(session, path) for path in stack) + '\n', 0
+
+
+def builtin_pushd(session, args):
+    if len(args) > 1 or has_options(args) or follows_cdpath(session):
+        return None
+    if not args:
+        if not session.directory_stack:
+            return 'pushd: no other directory\n', 1
+        target = session.directory_stack[0]
+        current = session.current_directory
+        output, status = change_directory(session, target)
+        if status == 0:
+            session.directory_stack[0] = current
+    else:
+        current = session.current_directory
+        output, status = change_directory(session, args[0])
+        if status == 0:
+            session.directory_stack.insert(0, current)
+    if status:
+        return output.replace('cd:', 'pushd:', 1), status
+    return builtin_dirs(session, [])
+
+
+def builtin_popd(session, args):
+    if args or session.variables is None:
+        return None
+    if not session.directory_stack:
+        return 'popd: directory stack empty\n', 1
+    output, status = change_directory(session, session.directory_stack[0])
+    if status:
+        return output.replace('cd:', 'popd:', 1), status
+    session.directory_stack.pop(0)
+    return builtin_dirs(session, [])
+
+
+def builtin_echo(session, args):
+    if args and args[0].startswith('-') and args[0] != '-n':
+        return None
+    newline = '\n'
+    if args and args[0] == '-n':
+        newline = ''
+        args = args[1:]
+    return ' '.join(args) + newline, 0
+
+
+def builtin_export(session, args):
+    if has_options(args) or session.variables is None:
+        return None
+    if not args:
+        return ''.join(
+            f'declare -x {name}={shlex.quote(value)}\n'
+            for name, value in sorted(session.variables.items())
+            if name in session.exported
+        ), 0
+    assignments = []
+    for arg in args:
+        name, sep, value = arg.partition('=')
+        if not NAME.match(name):
+            return f'export: `{arg}\': not a valid identifier\n', 1
+        if sep:
+            session.variables[name] = value
+        session.exported.add(name)
+        assignments.append(f'{name}={shlex.quote(session.variables.get(name, ""))}')
+    session.shell.run_quiet('export ' + ' '.join(assignments))
+    return '', 0
+
+
+def builtin_unset(session, args):
+    if has_options(args):
+        # e.g. unset -f removes a function, not a variable
+        return None
+    if session.variables is not None:
+        for name in args:
+            session.variables.pop(name, None)
+            session.exported.discard(name)
+    if args:
+        session.shell.run_quiet('unset ' + ' '.join(shlex.quote(name) for name in args))
+    return '', 0
+
+
+def builtin_clear(session, args):
+    if args:
+        return None
+    session.sink.push('clear', None)
+    return '', 0
+
+
+def builtin_history(session, args):
+    if len(args) > 1 or (args and not args[0].isdigit()):
+        # Options such as -c and -d act on the shell's own history
+        return None
+    entries = session.history
+    if args:
+        entries = entries[-int(args[0]):]
+    start = len(session.history) - len(entries) + 1
+    return ''.join(
+        f'{number:5d}  {command}\n' for number, command in enumerate(entries, start)
+    ), 0
+
+
+def builtin_exit(session, args):
+    if args:
+        # Let the shell exit with the status asked for
+        return None
+    session.sink.push('close', None)
+    return '', 0
+
+
+BUILTINS = {
+    'cd': builtin_cd,
+    'pwd': builtin_pwd,
+    'dirs': builtin_dirs,
+    'pushd': builtin_pushd,
+    'popd': builtin_popd,
+    'echo': builtin_echo,
+    'export': builtin_export,
+    'unset': builtin_unset,
+    'clear': builtin_clear,
+    'history': builtin_history,
+    'exit': builtin_exit,
+}
+
+
+def run_builtin(session, command):
+    """Run a command in-process if it is a supported builtin.
+
+    Returns `(output, exit_code)`, or None if the command has to go to the
+    shell (not a builtin, not a simple command, it has options or arguments
+    the in-process version does not handle like bash, or it needs the
+    shell's variables and the session does not know them at the moment).
+    """
+    argv = parse(command)
+    if argv is None or argv[0] not in BUILTINS:
+        return None
+    if '$' in command:
+        # Single quotes would have stopped the expansion done here
+        if session.variables is None or "'" in command:
+            return None
+        argv = [expand(session, arg) for arg in argv]
+    return BUILTINS[argv[0]](session, argv[1:])
@@ -0,0 +1,208 @@
+import os
+import threading
+
+from collections import deque
+
+from cache import get_cache_directory
+from utils import process_exists
+
+
+# Queued characters at which the shell stops being read, and the level
+# it has to drain back to before reading resumes
+HIGH_WATER_CHARS = 1024 * 1024
+LOW_WATER_CHARS = 256 * 1024
+# Output of a single command beyond which only head and tail are shown
+DEFAULT_TRUNCATE_CHARS = 4 * 1024 * 1024
+DEFAULT_TAIL_CHARS = 64 * 1024
+# Spilled output is encrypted in blocks of this many characters, one
+# Fernet token per line of the spill file
+SPILL_BLOCK_CHARS = 64 * 1024
+ENCRYPTED_SUFFIX = '.enc'
+
+
+def sweep_output():
+    """Delete output spilled by processes that are no longer running, e.g. after a crash"""
+    directory = get_cache_directory('output')
+    for name in os.listdir(directory):
+        pid, _, _ = name.partition('-')
+        if pid.isdigit() and process_exists(int(pid)):
+            continue
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+
+def read_spilled(path, cipher=None):
+    """Yield the bytes of a spill file in blocks, decrypting an encrypted one with cipher"""
+    with open(path, 'rb') as f:
+        if not path.endswith(ENCRYPTED_SUFFIX):
+            yield from iter(lambda: f.read(1024 * 1024), b'')
+            return
+        if cipher is None:
+            raise OSError(f'{path}: encrypted, and no key is available')
+        for line in f:
+            yield cipher.decrypt(line.rstrip(b'\n'))
+
+
+class OutputSink:
+    """Per-tab event queue between the reactor thread and the Tk thread.
+
+    Shell events are pushed from the reactor thread and drained on the Tk
+    thread in bounded slices. When too much output is queued the sink asks
+    for reading to be paused (`on_pressure(True)`) so the command blocks on
+    its PTY instead of the UI falling behind, and asks for it to resume
+    (`on_pressure(False)`) once the queue has drained.
+
+    Output of a single command past `truncate_chars` is no longer queued:
+    it is written to a spill file and only a tail is kept. When the command
+    finishes a `('truncated', (path, size))` event is queued, followed by
+    the tail. Spill files are encrypted while `cipher` is set (see
+    `read_spilled`) and deleted by `close`.
+
+    Output of a tab's jobs is pushed as `('job_output', text)`; it is
+    queued as ordinary output but is not part of the running command, so
+    the head + tail policy does not apply to it.
+    """
+
+    def __init__(self, on_pressure, truncate_chars=DEFAULT_TRUNCATE_CHARS, tail_chars=DEFAULT_TAIL_CHARS):
+        self.on_pressure = on_pressure
+        self.truncate_chars = truncate_chars
+        self.tail_chars = tail_chars
+        self.pending_chars = 0
+        self.paused = False
+        self.cipher = None
+        self.spilled = []
+        self._events = deque()
+        self._lock = threading.Lock()
+        self._reset_command()
+
+    def _reset_command(self):
+        self.command_chars = 0
+        self._head = []
+        self._tail = deque()
+        self._tail_size = 0
+        self._spill_file = None
+        self._spill_path = None
+        self._spill_cipher = None
+        self._spill_block = []
+        self._spill_block_chars = 0
+        self._spill_bytes = 0
+
+    def push(self, kind, payload):
+        """Queue a shell event (reactor thread)"""
+        with self._lock:
+            if kind == 'output':
+                payload = self._limit(payload)
+                if not payload:
+                    return
+            elif kind == 'job_output':
+                kind = 'output'
+            elif kind == 'done' and self._spill_file is not None:
+                self._finish_spill()
+            if kind == 'done':
+                self._reset_command()
+            self._append(kind, payload)
+            if self.pending_chars > HIGH_WATER_CHARS and not self.paused:
+                self.paused = True
+                self.on_pressure(True)
+
+    def _append(self, kind, payload):
+        self._events.append((kind, payload))
+        if kind in ('output', 'screen', 'interactive'):
+            self.pending_chars += len(payload)
+
+    def _limit(self, text):
+        """Apply the head + tail + spill policy to a command's output"""
+        self.command_chars += len(text)
+        if self._spill_file is None:
+            if self.command_chars <= self.truncate_chars:
+                self._head.append(text)
+                return text
+            self._spill_cipher = self.cipher
+            suffix = ENCRYPTED_SUFFIX if self._spill_cipher is not None else '.log'
+            # Named after this process so sweep_output can tell leftovers of a crash
+            self._spill_path = os.path.join(
+                get_cache_directory('output'), f'{os.getpid()}-{os.urandom(16).hex()}{suffix}'
+            )
+            self._spill_file = open(self._spill_path, 'wb')
+            self.spilled.append(self._spill_path)
+            for text in self._head:
+                self._spill(text)
+            self._head = []
+            self._append(
+                'output',
+                '\n[output too large, saving it to a file; the tail is shown when the command finishes]\n'
+            )
+        self._spill(text)
+        self._tail.append(text)
+        self._tail_size += len(text)
+        while self._tail_size - len(self._tail[0]) >= self.tail_chars:
+            self._tail_size -= len(self._tail.popleft())
+        return ''
+
+    def _spill(self, text):
+        if self._spill_cipher is None:
+            data = text.encode('utf-8')
+            self._spill_bytes += len(data)
+            self._spill_file.write(data)
+            return
+        self._spill_block.append(text)
+        self._spill_block_chars += len(text)
+        if self._spill_block_chars >= SPILL_BLOCK_CHARS:
+            self._flush_spill_block()
+
+    def _flush_spill_block(self):
+        if not self._spill_block:
+            return
+        data = ''.join(self._spill_block).encode('utf-8')
+        self._spill_bytes += len(data)
+        self._spill_file.write(self._spill_cipher.encrypt(data) + b'\n')
+        self._spill_block = []
+        self._spill_block_chars = 0
+
+    def _finish_spill(self):
+        if self._spill_cipher is not None:
+            self._flush_spill_block()
+        self._spill_file.close()
+        tail = ''.join(self._tail)[-self.tail_chars:]
+        # Start the tail at a line boundary
+        newline = tail.find('\n')
+        if 0 <= newline < len(tail) - 1:
+            tail = tail[newline + 1:]
+        self._append('truncated', (self._spill_path, self._spill_bytes))
+        self._append('output', tail)
+
+    def drain(self, budget_chars):
+        """Pop queued events, splitting output so at most `budget_chars` are returned (Tk thread)"""
+        events = []
+        with self._lock:
+            while self._events and budget_chars > 0:
+                kind, payload = self._events.popleft()
+                if kind in ('output', 'screen', 'interactive'):
+                    if len(payload) > budget_chars:
+                        # The rest of an interactive chunk belongs to the screen
+                        rest_kind = 'screen' if kind == 'interactive' else kind
+                        self._events.appendleft((rest_kind, payload[budget_chars:]))
+                        payload = payload[:budget_chars]
+                    budget_chars -= len(payload)
+                    self.pending_chars -= len(payload)
+                events.append((kind, payload))
+            if self.paused and self.pending_chars < LOW_WATER_CHARS:
+                self.paused = False
+                self.on_pressure(False)
+        return events
+
+    def close(self):
+        """Close and delete the spill files"""
+        with self._lock:
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+            for path in self.spilled:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.spilled = []
+            self._events.clear()
@@ -0,0 +1,137 @@
+from tkinter import ttk
+from tkinter.font import Font
+
+
+DEFAULT_FONT_SIZE = 12
+MIN_FONT_SIZE = 6
+MAX_FONT_SIZE = 48
+# Used when a theme asked for is not known, e.g. a deleted user theme file
+DEFAULT_THEME = 'original-light'
+
+# Widget options each role takes from the theme
+ROLES = {
+    'frame': {'bg': 'bg'},
+    'label': {'bg': 'bg', 'fg': 'fg'},
+    'entry': {
+        'bg': 'entry_bg',
+        'fg': 'entry_fg',
+        'insertbackground': 'entry_fg',
+        'highlightcolor': 'highlight',
+        'highlightbackground': 'highlight',
+    },
+    'ghost': {'bg': 'entry_bg', 'fg': 'highlight'},
+    'output': {
+        'bg': 'output_bg',
+        'fg': 'output_fg',
+        'insertbackground': 'output_fg',
+        'highlightcolor': 'highlight',
+        'highlightbackground': 'highlight',
+    },
+}
+
+
+class StyleRegistry:
+    """Shared named fonts and themed widget roles for the whole app.
+
+    Every widget uses one of a few shared Font objects, so zooming is a
+    single Font.configure that Tk propagates to all of them. Colors work the
+    same way for ttk widgets: the window chrome and tab frames are ttk
+    widgets whose named styles are configured once per theme change. Classic
+    Tk widgets (Text, Entry and the panels built from them) have no shared
+    color resource, so they are registered once with a role and a theme
+    change reconfigures exactly the registered widgets.
+    """
+
+    def __init__(self, root, themes, theme=DEFAULT_THEME, font_size=DEFAULT_FONT_SIZE):
+        self.root = root
+        self.themes = themes
+        self.theme = theme if theme in themes else DEFAULT_THEME
+        self.font_size = font_size
+        self.fonts = {
+            'entry': Font(root, family='Consolas', size=font_size),
+            'output': Font(root, family='Consolas', size=font_size - 1),
+            'prompt': Font(root, family='Arial', size=font_size),
+        }
+        # Bold/italic variants of the output font, e.g. for ANSI colors
+        self._variants = {}
+        self._widgets = {}
+        self.ttk_style = ttk.Style(root)
+        self._configure_ttk()
+
+    @property
+    def style(self):
+        return self.themes[self.theme]
+
+    def register(self, widget, role):
+        """Theme a widget now and on every theme change; returns the widget"""
+        self._widgets[str(widget)] = (widget, role)
+        widget.bind('<Destroy>', self._on_destroy, add='+')
+        self._configure(widget, role)
+        return widget
+
+    def _on_destroy(self, event):
+        self._widgets.pop(str(event.widget), None)
+
+    def _configure(self, widget, role):
+        style = self.style
+        widget.configure(**{option: style[key] for option, key in ROLES[role].items()})
+
+    def _configure_ttk(self):
+        style = self.style
+        configure = self.ttk_style.configure
+        # The root window is not a ttk widget, but there is only one
+        self.root.configure(bg=style['bg'])
+        configure('TNotebook', background=style['bg'])
+        configure('TNotebook.Tab', background=style['tab_bg'], foreground=style['tab_fg'])
+        configure('TFrame', background=style['bg'])
+        configure('TLabel', background=style['bg'], foreground=style['fg'])
+        # Toolbar, sidebar and status bar
+        configure('Bar.TFrame', background=style['entry_bg'])
+        configure(
+            'Bar.TLabel', background=style['entry_bg'], foreground=style['entry_fg'],
+            font=('Arial', 10)
+        )
+        configure(
+            'Bar.TButton', background=style['entry_bg'], foreground=style['entry_fg'],
+            font=('Arial', 10), relief='flat', borderwidth=0, focusthickness=0, padding=(10, 5)
+        )
+        self.ttk_style.map(
+            'Bar.TButton',
+            background=[('active', style['highlight'])],
+            foreground=[('active', style['entry_fg'])]
+        )
+        configure('Icon.Bar.TButton', font=('Arial', 14), padding=(10, 10))
+
+    def set_theme(self, theme):
+        """Switch to a theme, or to DEFAULT_THEME if it is not known; returns the theme used"""
+        if theme not in self.themes:
+            theme = DEFAULT_THEME
+        if theme == self.theme:
+            return theme
+        self.theme = theme
+        self._configure_ttk()
+        for widget, role in list(self._widgets.values()):
+            self._configure(widget, role)
+        return theme
+
+    def variant(self, bold, italic):
+        """A shared Font like the output font but bold and/or italic"""
+        font = self._variants.get((bold, italic))
+        if font is None:
+            font = self.fonts['output'].copy()
+            font.configure(weight='bold' if bold else 'normal', slant='italic' if italic else 'roman')
+            self._variants[(bold, italic)] = font
+        return font
+
+    def set_font_size(self, size):
+        """Resize every font in place; Tk re-lays out the widgets using them"""
+        size = max(MIN_FONT_SIZE, min(MAX_FONT_SIZE, size))
+        self.font_size = size
+        self.fonts['entry'].configure(size=size)
+        self.fonts['output'].configure(size=size - 1)
+        self.fonts['prompt'].configure(size=size)
+        for font in self._variants.values():
+            font.configure(size=size - 1)
+
+    def zoom(self, steps):
+        self.set_font_size(self.font_size + steps)
@@ -0,0 +1,136 @@
+import os
+
+from collections import deque
+from tkinter import END
+
+from ansi import AnsiParser
+
+
+# Output a hidden tab keeps before dropping the oldest
+BACKLOG_CHARS = 1024 * 1024
+# Unsaved output kept per tab between session saves
+JOURNAL_CHARS = 8 * 1024 * 1024
+
+
+class TerminalTab:
+    """The Tk front end of one terminal tab: its widgets and TerminalSession.
+
+    Only the frame exists until the tab is first shown; see
+    TerminalApp.materialize_tab. While the tab is hidden, session events
+    wait in `backlog` instead of being rendered, except screen output,
+    which the session has already applied to its screen and which only
+    sets `screen_dirty`.
+    """
+
+    def __init__(self, frame, session, session_id=None):
+        self.frame = frame
+        # Names the tab in the saved session
+        self.session_id = session_id or os.urandom(16).hex()
+        self.entry = None
+        self.output_text = None
+        self.entry_label = None
+        self.session = session
+        self.backlog = deque()
+        self.backlog_chars = 0
+        self.backlog_dropped = 0
+        self.screen_dirty = False
+        # Output since the session was last saved, and whether it was cleared
+        self.journal = deque()
+        self.journal_chars = 0
+        self.journal_reset = False
+        # Saved metadata of a restored tab that has not been shown yet
+        self.pending_restore = None
+        self.environment = {}
+        self.scrollback = None
+        self.ansi = AnsiParser()
+        self.interactive_window = None
+        self.history_navigator = None
+        self.reverse_search = None
+        self.ghost = None
+        self.find_bar = None
+        # WatchView of a `:watch` command
+        self.watch = None
+        # The entry text at the last Tab that could not complete further
+        self.completion_line = None
+
+    @property
+    def materialized(self):
+        return self.entry is not None
+
+    @property
+    def current_directory(self):
+        return self.session.current_directory
+
+    def write(self, text, *tags, record=True):
+        """Append text to the tab's output and keep it scrolled to the end"""
+        if record:
+            self.record(text)
+        self.scrollback.insert(text, *tags)
+        self.output_text.see(END)
+
+    def write_output(self, text):
+        """Append command output, rendering its SGR colors with pooled tags"""
+        pool = self.scrollback.tag_pool
+        spans = []
+        for span, style in self.ansi.feed(text):
+            tag = pool.tag(style)
+            spans.append((span, (tag,) if tag else ()))
+        self.scrollback.insert_spans(spans)
+        self.output_text.see(END)
+
+    def defer(self, kind, payload):
+        """Queue an event while the tab is hidden, dropping the oldest output past BACKLOG_CHARS"""
+        if kind == 'screen':
+            if self.interactive_window is not None:
+                # The window is a toplevel of its own, shown whichever tab is
+                self.interactive_window.refresh()
+            else:
+                self.screen_dirty = True
+            return
+        if kind == 'interactive':
+            # Already fed to the session's screen
+            payload = ''
+        self.backlog.append((kind, payload))
+        if kind != 'output':
+            return
+        self.backlog_chars += len(payload)
+        kept = []
+        while self.backlog_chars > BACKLOG_CHARS and self.backlog:
+            event = self.backlog.popleft()
+            if event[0] == 'output':
+                self.backlog_chars -= len(event[1])
+                self.backlog_dropped += len(event[1])
+            else:
+                kept.append(event)
+        self.backlog.extendleft(reversed(kept))
+
+    def record(self, text):
+        """Remember output for the next session save"""
+        self.journal.append(text)
+        self.journal_chars += len(text)
+        while self.journal_chars > JOURNAL_CHARS and len(self.journal) > 1:
+            self.journal_chars -= len(self.journal.popleft())
+            # What was saved before no longer joins up with the journal
+            self.journal_reset = True
+
+    def clear_journal(self):
+        self.journal = deque()
+        self.journal_chars = 0
+        self.journal_reset = True
+
+    def take_journal(self):
+        """(cleared, output) since the last call"""
+        text = ''.join(self.journal)
+        reset = self.journal_reset
+        self.journal = deque()
+        self.journal_chars = 0
+        self.journal_reset = False
+        return reset, text
+
+    def take_backlog(self):
+        events = self.backlog
+        self.backlog = deque()
+        self.backlog_chars = 0
+        self.backlog_dropped = 0
+        self.screen_dirty = False
+        return events
@@ -1,14 +1,63 @@
 import os
+import itertools
 import threading
-import subprocess
 
 from tkinter import ttk
 from tkinter.font import Font
-from tkinter import Entry, Text, Scrollbar, END, Frame, Label, Button, Toplevel, Menu
-
-from themes import themes
-from settings import SettingsWindow
-from utils import get_prompt, is_interactive, handle_cd, run_interactive_command
+from tkinter import Entry, Text, Scrollbar, END, INSERT, Menu
+
+from themes import themes, load_user_themes
+from style import StyleRegistry, DEFAULT_THEME
+from tab import TerminalTab
+from engine import TerminalSession
+from viewer import FileViewer
+from metrics import MetricsRecorder, LagMonitor
+from history import HistoryStore
+from history_index import HistoryIndex
+from history_search import HistoryNavigator, ReverseSearch
+from completion import Completer, common_prefix
+from ghost import GhostText
+from cache import (
+    get_cache_directory, get_cipher, get_existing_cipher, load_secure_settings,
+    load_preferences, save_preferences
+)
+from scrollback import Scrollback, DEFAULT_MAX_LINES, DEFAULT_MAX_BYTES, sweep_spilled
+from sink import sweep_output
+from interactive import InteractiveWindow
+from session_store import SessionStore, saved_environment
+from ansi import TagPool
+from jobs import is_job_command
+from watch import Watcher, WatchView, parse_watch
+from utils import get_prompt
+
+
+# How often session output is moved into the widgets
+OUTPUT_POLL_MS = 20
+# Upper bound on characters inserted per tab per poll so the UI stays responsive
+OUTPUT_CHARS_PER_POLL = 64 * 1024
+# Hidden tabs only queue their output, so they can take more per poll
+BACKGROUND_CHARS_PER_POLL = 1024 * 1024
+# How often the open tabs are saved for the next start
+SESSION_SAVE_MS = 30 * 1000
+# Modules that are slow to import are loaded in the background this long after start
+WARM_UP_DELAY_MS = 1000
+# How often, and how many times, Tab completion retries while a directory loads
+COMPLETION_RETRY_MS = 16
+COMPLETION_RETRIES = 60
+# The suggestion model is snapshotted to disk after this many new commands
+SUGGESTION_SNAPSHOT_EVERY = 20
+
+
+def sweep_cache():
+    """Delete scrollback and output spilled by earlier runs that did not quit cleanly"""
+    sweep_spilled()
+    sweep_output()
+
+
+def warm_up():
+    """Import what the first interactive command and the settings window need"""
+    import pyte
+    import settings
 
 
 class TerminalApp:
@@ -16,17 +65,47 @@ class TerminalApp:
         self.root = root
         self.root.title('OwlAI Terminal')
         self.root.geometry('900x600')
-        self.root.configure(bg='#1e1e1e')
-
-        self.themes = themes
-        self.current_theme = 'original-light'
-        self.current_style = self.themes[self.current_theme]
 
-        self.entry_font = ('Consolas', 12)
-        self.output_font = ('Consolas', 11)
+        self.themes = dict(themes, **load_user_themes())
+        # Shared fonts and themed widgets; zoom and theme changes go through it
+        self.styles = StyleRegistry(
+            self.root, self.themes, load_preferences().get('theme', DEFAULT_THEME)
+        )
+        self.entry_font = self.styles.fonts['entry']
+        self.output_font = self.styles.fonts['output']
 
         self.current_directory = os.path.expanduser('~')
 
+        # Per-tab scrollback limits
+        self.scrollback_lines = DEFAULT_MAX_LINES
+        self.scrollback_bytes = DEFAULT_MAX_BYTES
+
+        # Tabs keyed by notebook tab id
+        self.tabs = {}
+        self.metrics = MetricsRecorder()
+
+        # Privacy settings saved by the settings window; they are decrypted,
+        # and the ciphers built, by finish_startup once the window has drawn
+        self.pass_lock = False
+        self.history_setting = 'keep'
+        self.auto_delete_time = '1 minute'
+        self.encrypt_cache = False
+        self.started = False
+
+        self.history = HistoryStore(get_cache_directory('history'), None, get_existing_cipher)
+        # Searchable view of the history, filled in the background
+        self.history_index = HistoryIndex()
+        self.completer = Completer()
+        self.find_worker = None
+        # Commands a broadcast runs at once, as last chosen in its dialog
+        self.broadcast_parallelism = None
+        # Loaded in the background; commands run before then are learned from the history
+        self.suggestions = None
+        self.suggestion_snapshot = os.path.join(get_cache_directory('model'), 'suggestions.snap')
+        threading.Thread(target=sweep_cache, name='owl-sweep', daemon=True).start()
+        # Numbers the tags of links to saved output, which are never reused
+        self.link_numbers = itertools.count()
+
         # Create a menu bar
         self.menu_bar = Menu(self.root)
         self.root.config(menu=self.menu_bar)
@@ -34,8 +113,11 @@ class TerminalApp:
         # File menu
         self.file_menu = Menu(self.menu_bar, tearoff=0)
         self.file_menu.add_command(label="New Tab", command=self.add_tab)
+        self.file_menu.add_command(label="Broadcast Command…", command=self.open_broadcast)
+        self.file_menu.add_command(label="Record Tab (start/stop)", command=self.toggle_recording)
+        self.file_menu.add_command(label="Replay Recording…", command=self.open_replay)
         self.file_menu.add_separator()
-        self.file_menu.add_command(label="Exit", command=self.root.quit)
+        self.file_menu.add_command(label="Exit", command=self.quit)
         self.menu_bar.add_cascade(label="File", menu=self.file_menu)
 
         # Edit menu
@@ -47,8 +129,18 @@ class TerminalApp:
 
         # View menu
         self.view_menu = Menu(self.menu_bar, tearoff=0)
-        self.view_menu.add_command(label="Zoom In")
-        self.view_menu.add_command(label="Zoom Out")
+        self.view_menu.add_command(label="Jobs", command=self.open_jobs, accelerator="Ctrl+Shift+J")
+        self.root.bind_all('<Control-J>', lambda event: self.open_jobs())
+        self.view_menu.add_command(
+            label="Zoom In", accelerator="Ctrl+=", command=lambda: self.styles.zoom(1)
+        )
+        self.view_menu.add_command(
+            label="Zoom Out", accelerator="Ctrl+-", command=lambda: self.styles.zoom(-1)
+        )
+        for sequence in ('<Control-equal>', '<Control-plus>', '<Control-KP_Add>'):
+            self.root.bind_all(sequence, lambda event: self.styles.zoom(1))
+        for sequence in ('<Control-minus>', '<Control-KP_Subtract>'):
+            self.root.bind_all(sequence, lambda event: self.styles.zoom(-1))
         self.menu_bar.add_cascade(label="View", menu=self.view_menu)
 
         # Navigate menu
@@ -68,141 +160,222 @@ class TerminalApp:
         self.help_menu.add_command(label="About")
         self.menu_bar.add_cascade(label="Help", menu=self.help_menu)
 
-        # Toolbar
-        self.toolbar = Frame(self.root, bg='#2d2d2d', height=40)
+        # Toolbar, sidebar and status bar are ttk widgets colored by the theme's 'Bar' styles
+        self.toolbar = ttk.Frame(self.root, style='Bar.TFrame', height=40)
         self.toolbar.pack(side='top', fill='x')
 
         # Toolbar buttons
-        self.new_tab_button = Button(
+        self.new_tab_button = ttk.Button(
             self.toolbar,
             text='+ New Tab',
             command=self.add_tab,
-            bg='#2d2d2d',
-            fg='#ffffff',
-            relief='flat',
-            bd=0,
-            highlightthickness=0,
-            activebackground='#3d3d3d',
-            activeforeground='#ffffff',
-            font=('Arial', 10),
-            padx=10,
-            pady=5,
-            borderwidth=0,
-            highlightcolor='#2d2d2d',
-            highlightbackground='#2d2d2d',
-            border=0,
+            style='Bar.TButton',
+            takefocus=False,
             cursor='hand2'
         )
         self.new_tab_button.pack(side='left', padx=5, pady=5)
 
-        self.settings_button = Button(
+        self.settings_button = ttk.Button(
             self.toolbar,
             text='⚙️',
             command=self.open_settings,
-            bg='#2d2d2d',
-            fg='#ffffff',
-            relief='flat',
-            bd=0,
-            highlightthickness=0,
-            activebackground='#3d3d3d',
-            activeforeground='#ffffff',
-            font=('Arial', 12),
-            padx=10,
-            pady=5,
-            borderwidth=0,
-            highlightcolor='#2d2d2d',
-            highlightbackground='#2d2d2d',
-            border=0,
+            style='Icon.Bar.TButton',
+            takefocus=False,
             cursor='hand2'
         )
         self.settings_button.pack(side='right', padx=5, pady=5)
 
         # Sidebar
-        self.sidebar = Frame(self.root, bg='#2d2d2d', width=50)
+        self.sidebar = ttk.Frame(self.root, style='Bar.TFrame', width=50)
         self.sidebar.pack(side='left', fill='y')
 
         # Sidebar buttons
-        self.terminal_button = Button(
+        self.terminal_button = ttk.Button(
             self.sidebar,
             text='🖥️',
-            bg='#2d2d2d',
-            fg='#ffffff',
-            relief='flat',
-            bd=0,
-            highlightthickness=0,
-            activebackground='#3d3d3d',
-            activeforeground='#ffffff',
-            font=('Arial', 14),
-            padx=10,
-            pady=10,
-            borderwidth=0,
-            highlightcolor='#2d2d2d',
-            highlightbackground='#2d2d2d',
-            border=0,
+            style='Icon.Bar.TButton',
+            takefocus=False,
             cursor='hand2'
         )
         self.terminal_button.pack(pady=10)
 
-        self.owl_ai_button = Button(
+        self.owl_ai_button = ttk.Button(
             self.sidebar,
             text='🦉',
-            bg='#2d2d2d',
-            fg='#ffffff',
-            relief='flat',
-            bd=0,
-            highlightthickness=0,
-            activebackground='#3d3d3d',
-            activeforeground='#ffffff',
-            font=('Arial', 14),
-            padx=10,
-            pady=10,
-            borderwidth=0,
-            highlightcolor='#2d2d2d',
-            highlightbackground='#2d2d2d',
-            border=0,
-            cursor='hand2'
+            style='Icon.Bar.TButton',
+            takefocus=False,
+            cursor='hand2',
+            command=self.toggle_assistant
         )
         self.owl_ai_button.pack(pady=10)
 
         # Main content area
-        self.main_content = Frame(self.root, bg='#1e1e1e')
+        self.main_content = ttk.Frame(self.root)
         self.main_content.pack(side='right', fill='both', expand=True)
 
+        self.assistant = None
+
         self.notebook = ttk.Notebook(self.main_content)
         self.notebook.pack(fill='both', expand=True, padx=10, pady=10)
 
-        self.add_tab()
+        self.session_store = SessionStore(get_cache_directory('session'), None, get_existing_cipher)
 
         # Status bar
-        self.status_bar = Frame(self.root, bg='#2d2d2d', height=20)
+        self.status_bar = ttk.Frame(self.root, style='Bar.TFrame', height=20)
         self.status_bar.pack(side='bottom', fill='x')
 
-        self.status_label = Label(
+        self.status_label = ttk.Label(
             self.status_bar,
             text=f'Current Directory: {self.current_directory}',
-            bg='#2d2d2d',
-            fg='#ffffff',
-            font=('Arial', 10)
+            style='Bar.TLabel'
         )
         self.status_label.pack(side='left', padx=10)
 
-        self.notebook.bind('<ButtonPress-1>', self.on_tab_click)
+        self.metrics_label = ttk.Label(self.status_bar, text='Lag: 0 ms', style='Bar.TLabel')
+        self.metrics_label.pack(side='right', padx=10)
+        self.lag_monitor = LagMonitor(
+            self.root, self.metrics, lambda lag_ms: self.update_metrics_label()
+        ).start()
 
-    def add_tab(self):
-        """Add a new tab to the notebook"""
-        tab_frame = Frame(self.notebook, bg=self.current_style['bg'])
-        tab_id = f'Terminal {self.notebook.index('end') + 1}'
-        self.notebook.add(tab_frame, text=f'{tab_id} ×')
+        self.notebook.bind('<ButtonPress-1>', self.on_tab_click)
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+
+        self.root.protocol('WM_DELETE_WINDOW', self.quit)
+        self.root.after_idle(self.finish_startup)
+        self.root.after(OUTPUT_POLL_MS, self.drain_output)
+        self.root.after(SESSION_SAVE_MS, self.autosave_session)
+        self.root.after(
+            WARM_UP_DELAY_MS,
+            lambda: threading.Thread(target=warm_up, name='owl-warm-up', daemon=True).start()
+        )
 
-        entry_frame = Frame(tab_frame, bg=self.current_style['bg'])
+    def finish_startup(self):
+        """Apply the saved privacy settings and restore the tabs once the window has drawn.
+
+        Decrypting the settings and building ciphers loads `cryptography`,
+        so it waits until after the first frame.
+        """
+        secure_settings = load_secure_settings()
+        self.pass_lock = secure_settings.get('pass_lock', False)
+        self.history_setting = secure_settings.get('history_setting', 'keep')
+        self.auto_delete_time = secure_settings.get('auto_delete_time', '1 minute')
+        if secure_settings.get('encrypt_cache', False):
+            self.enable_cache_encryption()
+        if self.history_setting == 'auto_delete':
+            self.set_history_auto_delete(self.auto_delete_time)
+        elif self.history_setting == 'disable':
+            self.disable_history()
+        self.history_index.build_in_background(self.history.records())
+        threading.Thread(target=self.load_suggestions, name='owl-suggestions', daemon=True).start()
+        self.restore_session()
+        self.started = True
+
+    def add_tab(self, current_directory=None, title=None, start=True, session_id=None):
+        """Add a new tab to the notebook; its widgets are built when it is first shown"""
+        tab_frame = ttk.Frame(self.notebook)
+        tab_id = f"Terminal {self.notebook.index('end') + 1}"
+        self.notebook.add(tab_frame, text=title or f'{tab_id} ×')
+
+        session = TerminalSession(
+            current_directory or self.current_directory, recorder=self.metrics,
+            history_store=self.history, history_index=self.history_index
+        )
+        session.sink.cipher = self.history.cipher
+        tab = TerminalTab(tab_frame, session.start_in_background() if start else session, session_id)
+        self.tabs[str(tab_frame)] = tab
+        return tab
+
+    def restore_session(self):
+        """Recreate the saved tabs; their shells and scrollback load when first shown"""
+        saved = self.session_store.load()
+        for metadata in saved:
+            current_directory = metadata['cwd']
+            if not os.path.isdir(current_directory):
+                current_directory = None
+            tab = self.add_tab(
+                current_directory, metadata.get('title'), start=False, session_id=metadata['id']
+            )
+            tab.pending_restore = metadata
+            tab.environment = metadata.get('environment', {})
+        if not saved:
+            self.add_tab()
+
+    def restore_tab(self, tab):
+        """Fill in a restored tab's scrollback and start its shell"""
+        metadata = tab.pending_restore
+        tab.pending_restore = None
+        scrollback = self.session_store.load_scrollback(tab.session_id)
+        if scrollback:
+            tab.write_output(scrollback)
+            # Not journaled, so restarts do not pile up markers in the saved scrollback
+            tab.write('[restored]\n', record=False)
+        session = tab.session
+        session.previous_directory = metadata.get('previous_directory')
+        session.directory_stack = list(metadata.get('directory_stack', []))
+        session.start_in_background()
+        session.restore_environment(tab.environment)
+
+    def snapshot_session(self):
+        """Collect what changed in every tab since the last save (Tk thread)"""
+        tabs = []
+        for tab_name in self.notebook.tabs():
+            tab = self.tabs.get(str(tab_name))
+            if tab is None:
+                continue
+            session = tab.session
+            if tab.pending_restore is None and session.variables is not None:
+                tab.environment = saved_environment(session)
+            reset, output = tab.take_journal()
+            tabs.append({
+                'id': tab.session_id,
+                'title': self.notebook.tab(tab_name, 'text'),
+                'cwd': session.current_directory,
+                'environment': tab.environment,
+                'previous_directory': session.previous_directory,
+                'directory_stack': session.directory_stack,
+                'reset': reset,
+                'output': output,
+            })
+        return tabs
+
+    def save_session(self, background=False):
+        if not self.started:
+            # The saved tabs have not been restored yet and would be overwritten
+            return
+        tabs = self.snapshot_session()
+        if background:
+            threading.Thread(target=self.session_store.save, args=(tabs,), daemon=True).start()
+        else:
+            self.session_store.save(tabs)
+
+    def autosave_session(self):
+        self.save_session(background=True)
+        self.root.after(SESSION_SAVE_MS, self.autosave_session)
+
+    def quit(self):
+        """Save the open tabs and leave the main loop"""
+        try:
+            self.save_session()
+        except OSError:
+            pass
+        self.metrics.close()
+        for tab in self.tabs.values():
+            tab.session.stop_recording()
+            tab.session.sink.close()
+            if tab.scrollback is not None:
+                tab.scrollback.clear()
+        self.root.quit()
+
+    def materialize_tab(self, tab):
+        """Build a tab's widgets the first time it is shown"""
+        tab_frame = tab.frame
+        entry_frame = ttk.Frame(tab_frame)
         entry_frame.pack(pady=10, padx=10, fill='x')
 
-        entry_label = Label(
+        entry_label = ttk.Label(
             entry_frame,
-            text=f'{get_prompt(self.current_directory)}',
-            bg=self.current_style['bg'],
-            fg=self.current_style['fg'],
-            font=('Arial', 12)
+            text=f'{get_prompt(tab.current_directory)}',
+            font=self.styles.fonts['prompt']
         )
         entry_label.pack(side='left', padx=(0, 10))
 
@@ -210,13 +383,10 @@ class TerminalApp:
             entry_frame,
             width=120,
             font=self.entry_font,
-            bg=self.current_style['entry_bg'],
-            fg=self.current_style['entry_fg'],
             relief='flat',
-            highlightthickness=1,
-            highlightcolor=self.current_style['highlight'],
-            highlightbackground=self.current_style['highlight']
+            highlightthickness=1
         )
+        self.styles.register(entry, 'entry')
         entry.focus_set()
         entry.pack(fill='x', expand=True, ipady=5)
 
@@ -225,135 +395,548 @@ class TerminalApp:
             wrap='word',
             height=30,
             font=self.output_font,
-            bg=self.current_style['output_bg'],
-            fg=self.current_style['output_fg'],
-            relief='flat', highlightthickness=1,
-            highlightcolor=self.current_style['highlight'],
-            highlightbackground=self.current_style['highlight']
+            relief='flat', highlightthickness=1
         )
+        self.styles.register(output_text, 'output')
         output_text.pack(fill='both', expand=True, padx=10, pady=(0, 10))
 
+        tab.entry = entry
+        tab.output_text = output_text
+        tab.entry_label = entry_label
+        tab.history_navigator = HistoryNavigator(self.history_index)
+        tab.reverse_search = ReverseSearch(
+            tab_frame, entry, self.history_index,
+            lambda t=tab: t.current_directory, self.styles
+        )
+        tab.scrollback = Scrollback(
+            output_text, self.scrollback_lines, self.scrollback_bytes
+        )
+        tab.scrollback.tag_pool = TagPool(output_text, variant=self.styles.variant)
+        tab.scrollback.cipher = self.history.cipher
+
         scrollbar = Scrollbar(output_text)
-        output_text.config(yscrollcommand=scrollbar.set)
+        output_text.config(
+            yscrollcommand=lambda first, last, t=tab: (
+                scrollbar.set(first, last), t.scrollback.on_scroll(first, last)
+            )
+        )
         scrollbar.pack(side='right', fill='y')
         scrollbar.config(command=output_text.yview)
 
         entry.bind(
             '<Return>',
-            lambda event, e=entry, o=output_text, l=entry_label:
-            self.execute_command(e, o, l)
+            lambda event, t=tab:
+            self.execute_command(t)
         )
+        entry.bind('<Up>', lambda event, t=tab: self.recall_history(t, older=True))
+        entry.bind('<Down>', lambda event, t=tab: self.recall_history(t, older=False))
+        entry.bind('<Control-r>', tab.reverse_search.open)
+        entry.bind('<Tab>', lambda event, t=tab: self.complete_command(t))
+        tab.ghost = GhostText(entry, self.styles)
+        entry.bind('<KeyRelease>', lambda event, t=tab: self.update_suggestion(t, event))
+        for key in ('<Right>', '<End>'):
+            entry.bind(key, tab.ghost.accept)
         output_text.bind(
             '<Control-l>',
-            lambda event, o=output_text:
-            self.clear_output(o)
+            lambda event, t=tab:
+            self.clear_output(t)
         )
+        for widget in (entry, output_text):
+            widget.bind(
+                '<Control-c>',
+                lambda event, t=tab:
+                self.cancel_command(t)
+            )
+            widget.bind('<Control-z>', lambda event, t=tab: self.suspend_command(t))
+            widget.bind('<Control-f>', lambda event, t=tab: self.open_find(t))
 
     def on_tab_click(self, event):
         """Handle click events on the tab label to close the tab"""
         tab_id = self.notebook.identify(event.x, event.y)
         if tab_id:
-            tab_index = self.notebook.index(tab_id)
+            tab_index = self.notebook.index(f'@{event.x},{event.y}')
             tab_text = self.notebook.tab(tab_id, 'text')
             font = Font(family='Arial', size=10)
             text_width = font.measure(tab_text)
             close_button_width = font.measure(' ×')
             close_button_start = text_width - close_button_width
             if event.x >= close_button_start:
-                self.notebook.forget(tab_id)
-                if not self.notebook.tabs():
-                    self.root.quit()
-
-    def apply_style(self):
-        """Apply the current style to all widgets"""
-        self.root.configure(bg=self.current_style['bg'])
-        self.new_tab_button.configure(
-            bg=self.current_style['bg'], fg=self.current_style['fg']
+                self.close_tab(self.notebook.tabs()[tab_index])
+
+    def close_tab(self, tab_id):
+        """Close a tab and the shell session it owns"""
+        tab = self.tabs.pop(str(tab_id), None)
+        if tab is not None:
+            if tab.watch is not None:
+                tab.watch.close()
+            tab.session.close()
+            if tab.scrollback is not None:
+                tab.scrollback.clear()
+        self.notebook.forget(tab_id)
+        if not self.notebook.tabs():
+            self.quit()
+
+    @property
+    def current_theme(self):
+        return self.styles.theme
+
+    @property
+    def current_style(self):
+        return self.styles.style
+
+    def set_theme(self, theme):
+        """Switch to another theme and keep it for the next start"""
+        theme = self.styles.set_theme(theme)
+        save_preferences(dict(load_preferences(), theme=theme))
+
+    def clear_output(self, tab, event=None):
+        """Clear the output text area and the tab's spilled scrollback"""
+        tab.scrollback.clear()
+        tab.clear_journal()
+        if tab.find_bar is not None:
+            # Its matches point into the segments just deleted
+            tab.find_bar.reset()
+
+    def set_scrollback_limits(self, max_lines, max_bytes):
+        """Apply new scrollback limits to every tab"""
+        self.scrollback_lines = max_lines
+        self.scrollback_bytes = max_bytes
+        for tab in self.tabs.values():
+            if tab.scrollback is None:
+                continue
+            tab.scrollback.max_lines = max_lines
+            tab.scrollback.max_bytes = max_bytes
+            tab.scrollback.trim()
+
+    def current_tab(self):
+        """Get the currently selected tab"""
+        selected = self.notebook.select()
+        return self.tabs.get(str(selected)) if selected else None
+
+    def on_tab_changed(self, event=None):
+        """Show the selected tab, catching it up on output it got in the background"""
+        tab = self.current_tab()
+        if tab is not None:
+            self.show_tab(tab)
+            self.update_directory(tab, tab.current_directory)
+
+    def show_tab(self, tab):
+        if not tab.materialized:
+            self.materialize_tab(tab)
+        if tab.pending_restore is not None:
+            self.restore_tab(tab)
+        self.flush_backlog(tab)
+        tab.entry.focus_set()
+
+    def flush_backlog(self, tab):
+        """Apply the events a tab buffered while hidden, joining its output into one insert"""
+        if tab.backlog_dropped:
+            tab.write(f'[{tab.backlog_dropped} characters of output skipped while the tab was hidden]\n')
+        screen_dirty = tab.screen_dirty
+        events = tab.take_backlog()
+        output = []
+        for kind, payload in events:
+            if kind == 'output':
+                output.append(payload)
+                continue
+            if output:
+                tab.write_output(''.join(output))
+                output = []
+            self.handle_event(tab, kind, payload)
+            if str(tab.frame) not in self.tabs:
+                return
+        if output:
+            tab.write_output(''.join(output))
+        if screen_dirty and tab.interactive_window is not None:
+            tab.interactive_window.refresh()
+
+    def update_directory(self, tab, current_directory):
+        """Show a tab's working directory as reported by its session"""
+        tab.entry_label.config(text=get_prompt(current_directory))
+        if tab is self.current_tab():
+            self.current_directory = current_directory
+            if hasattr(self, 'status_label'):
+                self.status_label.config(text=f'Current Directory: {current_directory}')
+
+    def update_metrics_label(self):
+        """Show the last command's timings and the event loop lag in the status bar"""
+        parts = []
+        timing = self.metrics.last_timing
+        if timing is not None:
+            first_byte = f'{timing.first_byte_ms:.0f} ms' if timing.first_byte_ms is not None else '–'
+            parts.append(
+                f'Last: {timing.total_ms:.0f} ms (spawn {timing.spawn_ms or 0:.1f} ms, '
+                f'first byte {first_byte}, {timing.bytes_out:,} B, exit {timing.exit_code})'
+            )
+        parts.append(f'Lag: {self.metrics.current_lag_ms:.0f} ms (max {self.metrics.max_lag_ms:.0f} ms)')
+        if self.history.unreadable:
+            parts.append(f'{self.history.unreadable:,} history records could not be decrypted')
+        if self.session_store.unreadable:
+            parts.append(f'{self.session_store.unreadable:,} saved session files could not be decrypted')
+        self.metrics_label.config(text='  ·  '.join(parts))
+
+    def execute_command(self, tab, event=None):
+        """Run a command in the tab's terminal session"""
+        command = tab.entry.get().strip()
+        if command[:1] == ':' and command[1:2].isalpha():
+            tab.entry.delete(0, END)
+            tab.write(f'{command}\n')
+            self.run_app_command(tab, command)
+        elif command:
+            session = tab.session
+            if not session.accepts(command):
+                tab.write('A command is already running (Ctrl-C to cancel, or end it with & to run it as a job)\n')
+                return
+            tab.entry.delete(0, END)
+            tab.history_navigator.reset()
+            job_input = session.jobs.foreground is not None and not is_job_command(command)
+            current_directory = session.current_directory
+            if job_input:
+                # Input for the job in the foreground; its terminal echoes nothing
+                tab.write(f'{command}\n')
+            else:
+                tab.write(f'$ {command}\n')
+            session.execute(command)
+            if not job_input:
+                self.learn_command(tab, command, current_directory)
+            self.update_suggestion(tab)
+
+    def run_app_command(self, tab, command):
+        """Run a command the app handles itself, written with a leading colon"""
+        name, _, arguments = command[1:].partition(' ')
+        if name == 'watch':
+            parsed = parse_watch(arguments)
+            if parsed is None:
+                tab.write('usage: :watch <interval>[s|ms] <command>\n')
+                return
+            self.start_watch(tab, *parsed)
+        elif name == 'unwatch':
+            if tab.watch is not None:
+                tab.watch.close()
+        else:
+            tab.write(f':{name}: unknown command (try :watch or :unwatch)\n')
+
+    def start_watch(self, tab, interval, command):
+        """Re-run a command on a timer, showing its output in a region above the tab's output"""
+        if tab.watch is not None:
+            tab.watch.close()
+        watcher = Watcher(command, interval, tab.current_directory, tab.session.environment())
+        tab.watch = WatchView(self.root, tab, watcher.start(), self.styles)
+
+    def learn_command(self, tab, command, current_directory):
+        """Teach the suggestion model a command just run, snapshotting it now and then"""
+        if not self.history.enabled or self.suggestions is None:
+            return
+        history = tab.session.history
+        # The history record's timestamp, so training on history after a
+        # restart skips what the snapshot has already learned
+        self.suggestions.learn(
+            command, current_directory, history[-2] if len(history) > 1 else None,
+            self.history.last_timestamp
         )
-        self.settings_button.configure(
-            bg=self.current_style['bg'], fg=self.current_style['fg']
+        if self.suggestions.learned % SUGGESTION_SNAPSHOT_EVERY == 0:
+            threading.Thread(target=self.save_suggestions, daemon=True).start()
+
+    def load_suggestions(self):
+        """Load the snapshotted suggestion model and learn any newer history"""
+        from model.suggest import CommandModel
+
+        cipher = get_cipher() if self.encrypt_cache else None
+        model = CommandModel.load(self.suggestion_snapshot, cipher)
+        trained_until = model.trained_until
+        model.train(self.history.records())
+        self.suggestions = model
+        if model.trained_until > trained_until:
+            self.save_suggestions()
+
+    def save_suggestions(self):
+        if self.suggestions is None:
+            return
+        try:
+            self.suggestions.save(
+                self.suggestion_snapshot, get_cipher() if self.encrypt_cache else None
+            )
+        except OSError:
+            pass
+
+    def update_suggestion(self, tab, event=None):
+        """Show the model's suggested completion as ghost text after the entry"""
+        if event is not None and event.keysym in ('Return', 'Tab', 'Right', 'End'):
+            return
+        if self.suggestions is None:
+            return
+        history = tab.session.history
+        tab.ghost.show(self.suggestions.predict(
+            tab.entry.get(), tab.current_directory, history[-1] if history else None
+        ))
+
+    def complete_command(self, tab, attempt=0):
+        """Complete the word before the cursor; a second Tab lists the candidates"""
+        line = tab.entry.get()[:tab.entry.index(INSERT)]
+        variables = tab.session.variables
+        if variables and 'PATH' in variables:
+            self.completer.path_index.set_path(variables['PATH'])
+        result = self.completer.complete(line, tab.current_directory)
+        if result is None:
+            # Directory listing is loading in the background
+            if attempt < COMPLETION_RETRIES:
+                self.root.after(COMPLETION_RETRY_MS, self.complete_command, tab, attempt + 1)
+            return 'break'
+        start, candidates = result
+        word = line[start:]
+        if len(candidates) == 1:
+            completion = candidates[0]
+            if not completion.endswith('/'):
+                completion += ' '
+        else:
+            completion = common_prefix(candidates)
+        if len(completion) > len(word):
+            tab.entry.delete(start, len(line))
+            tab.entry.insert(start, completion)
+            tab.completion_line = None
+        elif candidates and tab.completion_line == line:
+            tab.write('  '.join(candidates) + '\n')
+        else:
+            tab.completion_line = line
+            tab.entry.bell()
+        return 'break'
+
+    def open_find(self, tab):
+        """Show the tab's find bar, searching its output and spilled scrollback"""
+        from find import FindWorker, FindBar
+
+        if self.find_worker is None:
+            self.find_worker = FindWorker()
+        if tab.find_bar is None:
+            tab.find_bar = FindBar(self.root, tab, self.find_worker, self.styles)
+        return tab.find_bar.open()
+
+    def recall_history(self, tab, older=True):
+        """Replace the entry with an older or newer command from the history"""
+        if older:
+            command = tab.history_navigator.previous(tab.entry.get())
+        else:
+            command = tab.history_navigator.next()
+        if command is not None:
+            tab.entry.delete(0, END)
+            tab.entry.insert(0, command)
+        return 'break'
+
+    def cancel_command(self, tab, event=None):
+        """Interrupt the command running in a tab"""
+        if tab.session.busy:
+            tab.session.interrupt()
+            return 'break'
+
+    def suspend_command(self, tab, event=None):
+        """Stop the tab's foreground job and put it in the background"""
+        if tab.session.suspend():
+            return 'break'
+
+    def open_jobs(self):
+        """Open the table of every tab's jobs"""
+        from jobs_panel import JobPanel
+
+        JobPanel(self)
+
+    def drain_output(self):
+        """Move a bounded slice of the shown tab's output into its widgets.
+
+        Hidden tabs are drained too, so their commands keep running, but
+        their events only go into the tab's backlog until it is shown.
+        """
+        current = self.current_tab()
+        for tab in list(self.tabs.values()):
+            if tab is not current or not tab.materialized:
+                for kind, payload in tab.session.poll(BACKGROUND_CHARS_PER_POLL):
+                    if kind == 'output':
+                        tab.record(payload)
+                    tab.defer(kind, payload)
+                continue
+            for kind, payload in tab.session.poll(OUTPUT_CHARS_PER_POLL):
+                if str(tab.frame) not in self.tabs:
+                    break
+                if kind == 'output':
+                    tab.record(payload)
+                self.handle_event(tab, kind, payload)
+        self.root.after(OUTPUT_POLL_MS, self.drain_output)
+
+    def handle_event(self, tab, kind, payload):
+        """Show one session event in a tab on the Tk thread"""
+        if kind == 'output':
+            tab.write_output(payload)
+        elif kind == 'interactive':
+            if tab.session.screen is None:
+                # The command finished in the same slice; its screen follows as output
+                return
+            if tab.interactive_window is None:
+                self.open_interactive_window(tab, tab.session.command)
+            tab.interactive_window.refresh()
+        elif kind == 'screen':
+            if tab.interactive_window is not None:
+                tab.interactive_window.refresh()
+        elif kind == 'truncated':
+            path, size = payload
+            link = f'output-link-{next(self.link_numbers)}'
+            tab.output_text.tag_config(link, foreground=self.current_style['highlight'], underline=True)
+            tab.output_text.tag_bind(link, '<Button-1>', lambda event, p=path: self.open_file_viewer(p))
+            tab.write(f'\n[{size / (1024 * 1024):.1f} MB of output saved to {path} — open full output]\n', link)
+        elif kind == 'done':
+            exit_code, current_directory = payload
+            if tab.interactive_window is not None:
+                tab.interactive_window.close()
+                tab.interactive_window = None
+            if exit_code:
+                tab.write(f'[exit {exit_code}]\n')
+            tab.write('\n')
+            self.update_directory(tab, current_directory)
+        elif kind == 'clear':
+            self.clear_output(tab)
+        elif kind == 'close':
+            self.close_tab(str(tab.frame))
+        elif kind == 'exit':
+            tab.write('[shell exited]\n')
+
+    def open_file_viewer(self, path):
+        """Open a memory-mapped viewer on a file of saved output"""
+        try:
+            FileViewer(self.root, path, self.current_style, self.output_font, get_existing_cipher())
+        except Exception as error:
+            from tkinter import messagebox
+
+            # Deleted, or encrypted with a key that is gone
+            messagebox.showerror('Saved output', f'Cannot open {path}: {error}', parent=self.root)
+
+    def open_interactive_window(self, tab, command):
+        """Open a window showing the screen of the tab's interactive command"""
+        tab.interactive_window = InteractiveWindow(
+            self.root,
+            command,
+            tab.session,
+            self.current_style,
+            self.output_font
         )
-        for tab_id in self.notebook.tabs():
-            tab_frame = self.notebook.nametowidget(tab_id)
-            tab_frame.configure(bg=self.current_style['bg'])
-            for widget in tab_frame.winfo_children():
-                if isinstance(widget, Frame):
-                    widget.configure(bg=self.current_style['bg'])
-                    for child in widget.winfo_children():
-                        if isinstance(child, Label):
-                            child.configure(
-                                bg=self.current_style['bg'],
-                                fg=self.current_style['fg']
-                            )
-                        elif isinstance(child, Entry):
-                            child.configure(
-                                bg=self.current_style['entry_bg'],
-                                fg=self.current_style['entry_fg'],
-                                highlightcolor=self.current_style['highlight'],
-                                highlightbackground=self.current_style['highlight']
-                            )
-                elif isinstance(widget, Text):
-                    widget.configure(
-                        bg=self.current_style['output_bg'],
-                        fg=self.current_style['output_fg'],
-                        highlightcolor=self.current_style['highlight'],
-                        highlightbackground=self.current_style['highlight']
-                    )
-
-    def clear_output(self, output_text, event=None):
-        """Clear the output text area"""
-        output_text.delete(1.0, END)
-
-    def execute_command(self, entry, output_text, entry_label, event=None):
-        """Execute command using subprocess or handle interactive commands"""
-        command = entry.get().strip()
-        if command:
-            entry_label.config(text=get_prompt(self.current_directory))
-            if command.startswith('cd '):
-                handle_cd(self, command, output_text, entry_label)
-            else:
-                if is_interactive(command):
-                    self.open_interactive_window(command)
-                else:
-                    try:
-                        result = subprocess.run(
-                            command,
-                            shell=True,
-                            text=True,
-                            capture_output=True,
-                            cwd=self.current_directory
-                        )
-                        chars = f'$ {command}\n{result.stdout}{result.stderr}\n'
-                        output_text.insert(END, chars)
-                        output_text.see(END)
-                    except Exception as e:
-                        output_text.insert(END, f'Error: {str(e)}\n')
-                    finally:
-                        entry.delete(0, END)
-
-    def open_interactive_window(self, command):
-        """Open a new window for interactive commands"""
-        interactive_window = Toplevel(self.root)
-        interactive_window.title(f'Interactive: {command}')
-        interactive_window.geometry('800x600')
-        output_text = Text(
-            interactive_window,
-            wrap='word',
-            font=self.output_font,
-            bg=self.current_style['output_bg'],
-            fg=self.current_style['output_fg']
+
+    def enable_pass_lock(self):
+        self.pass_lock = True
+
+    def disable_pass_lock(self):
+        self.pass_lock = False
+
+    def keep_history(self):
+        """Record history and keep it forever"""
+        self.history_setting = 'keep'
+        self.history.keep()
+        self.metrics.log_commands = True
+        self.metrics.log_command_text = True
+
+    def set_history_auto_delete(self, window):
+        """Record history and delete records older than `window`, e.g. '1 hour'"""
+        if self.history_setting == 'keep':
+            # The command log holds commands from before the window
+            self.metrics.forget_commands()
+        self.history_setting = 'auto_delete'
+        self.auto_delete_time = window
+        self.history.set_auto_delete(window)
+        # Timings only, since the log is not compacted like the history
+        self.metrics.log_commands = True
+        self.metrics.log_command_text = False
+
+    def disable_history(self):
+        """Stop recording history"""
+        if self.history_setting == 'keep':
+            self.metrics.forget_commands()
+        self.history_setting = 'disable'
+        self.history.disable()
+        # The command log would keep the history that was just turned off
+        self.metrics.log_commands = False
+
+    def enable_cache_encryption(self):
+        """Encrypt cache data written from now on with the Fernet key"""
+        self.encrypt_cache = True
+        if self.history.cipher is None:
+            self.history.cipher = get_cipher()
+        self.metrics.cipher = self.history.cipher
+        self.session_store.cipher = self.history.cipher
+        self.set_scrollback_cipher(self.history.cipher)
+
+    def disable_cache_encryption(self):
+        self.encrypt_cache = False
+        self.history.cipher = None
+        self.metrics.cipher = None
+        self.session_store.cipher = None
+        self.set_scrollback_cipher(None)
+
+    def set_scrollback_cipher(self, cipher):
+        """Encrypt scrollback and output spilled from now on with cipher, or stop encrypting them"""
+        for tab in self.tabs.values():
+            tab.session.sink.cipher = cipher
+            if tab.scrollback is not None:
+                tab.scrollback.cipher = cipher
+
+    def toggle_assistant(self):
+        """Show or hide the OwlAI pane, building it and starting its client on first use"""
+        if self.assistant is None:
+            from assistant_pane import AssistantPane
+
+            self.assistant = AssistantPane(self.root, self.root, self.assistant_context, self.styles)
+        if self.assistant.visible:
+            self.assistant.hide()
+            return
+        if self.assistant.client is None:
+            from model.assistant import AssistantClient, HttpBackend, ResponseCache
+
+            cipher = get_cipher() if self.encrypt_cache else None
+            cache = ResponseCache(
+                os.path.join(get_cache_directory('assistant'), 'responses.json'), cipher
+            )
+            self.assistant.client = AssistantClient(HttpBackend(), cache, self.assistant.on_event)
+        self.assistant.show(self.main_content)
+
+    def assistant_context(self):
+        """The current tab's directory and the end of its output"""
+        tab = self.current_tab()
+        if tab is None or not tab.materialized:
+            return self.current_directory, ''
+        return tab.current_directory, tab.output_text.get('end-4000c', 'end-1c')
+
+    def toggle_recording(self):
+        """Start or stop recording the current tab to an asciicast file"""
+        from recording import recording_path
+
+        tab = self.current_tab()
+        if tab is None:
+            return
+        if tab.session.recording is not None:
+            tab.write(f'[recording saved to {tab.session.stop_recording()}]\n')
+            return
+        title = self.notebook.tab(tab.frame, 'text').rstrip(' ×')
+        path = tab.session.start_recording(
+            recording_path(title.replace(' ', '-').lower()), title
         )
-        output_text.pack(fill='both', expand=True, padx=10, pady=10)
-        scrollbar = Scrollbar(output_text)
-        output_text.config(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side='right', fill='y')
-        scrollbar.config(command=output_text.yview)
-        threading.Thread(
-            target=run_interactive_command,
-            args=(command, output_text, self.current_directory),
-            daemon=True,
-        ).start()
+        tab.write(f'[recording to {path}]\n')
+
+    def open_replay(self):
+        """Play back a recording chosen from the recordings directory"""
+        from tkinter import filedialog
+        from recording import ReplayWindow
+
+        path = filedialog.askopenfilename(
+            parent=self.root,
+            initialdir=get_cache_directory('recordings'),
+            filetypes=[('asciicast recordings', '*.cast'), ('All files', '*')]
+        )
+        if path:
+            ReplayWindow(self.root, path, self.styles)
+
+    def open_broadcast(self):
+        """Open the dialog for running one command in many tabs' directories at once"""
+        from broadcast import BroadcastDialog
+
+        BroadcastDialog(self)
 
     def open_settings(self):
         """Open the settings window with tabs for Accessibility and VPN"""
+        from settings import SettingsWindow
+
         SettingsWindow(self)
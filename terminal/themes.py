@@ -1,3 +1,11 @@
+import os
+import json
+
+
+# Extra themes, one JSON file per theme, e.g. ~/.config/owlai/themes/solarized.json
+USER_THEMES_DIRECTORY = os.path.expanduser('~/.config/owlai/themes')
+
+
 themes = {
     'original-light': {
         'bg': '#f0f0f0',
@@ -76,4 +84,26 @@ themes = {
         'tab_bg': '#1a1a1a',
         'tab_fg': '#ff0099'
     }
-}
\ No newline at end of file
+}
+
+def load_user_themes(directory=USER_THEMES_DIRECTORY):
+    """Load themes from JSON files in `directory`, named after the file.
+
+    Keys a file leaves out are taken from 'original-dark'; unreadable
+    files are skipped.
+    """
+    user_themes = {}
+    if not os.path.isdir(directory):
+        return user_themes
+    for file_name in sorted(os.listdir(directory)):
+        name, extension = os.path.splitext(file_name)
+        if extension != '.json':
+            continue
+        try:
+            with open(os.path.join(directory, file_name)) as f:
+                theme = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if isinstance(theme, dict):
+            user_themes[name] = dict(themes['original-dark'], **theme)
+    return user_themes
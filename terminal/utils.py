@@ -1,86 +1,115 @@
 import os
-import pyte
-import pexpect
+import re
+import shlex
+from collections import OrderedDict
 
-import tkinter as tk
+
+# Full-screen/TUI programs that are always run in an interactive window
+INTERACTIVE_PROGRAMS = frozenset({
+    'vi', 'vim', 'nvim', 'nano', 'emacs', 'micro', 'less', 'more', 'man',
+    'top', 'htop', 'btop', 'atop', 'iotop', 'watch', 'tmux', 'screen',
+    'mc', 'ranger', 'nnn', 'ssh', 'telnet', 'ftp', 'sftp', 'ipython',
+    'mysql', 'psql', 'sqlite3', 'redis-cli', 'mongo', 'mongosh', 'fzf',
+})
+
+# Alternate screen, application cursor keys and absolute cursor addressing
+INTERACTIVE_SEQUENCES = re.compile(
+    r'\x1b\[\?(?:1049|1047|47|1)h|\x1b\[\d+;\d+[Hf]'
+)
+
+# Number of the read() syscall as reported by /proc/<pid>/syscall
+READ_SYSCALLS = {'x86_64': '0', 'aarch64': '63', 'riscv64': '63', 'i686': '3', 'armv7l': '3'}
+
+# Commands that turned out to be interactive when run before, most
+# recent last; keyed by the whole command, since e.g. `git log` pages but
+# `git status` does not
+_interactive_cache = OrderedDict()
+INTERACTIVE_CACHE_SIZE = 256
 
 
 def get_prompt(current_directory):
     """Get the terminal prompt with the current directory"""
     return f'{os.getlogin()}@{os.uname().nodename}:{current_directory}$ '
 
-def is_interactive(command):
-    """Check if a command is interactive"""
+def command_name(command):
+    """Get the program name (argv[0]) of a shell command"""
     try:
-        child = pexpect.spawn(command, timeout=1)
-        child.expect(pexpect.EOF, timeout=1)
-        return False
-    except pexpect.TIMEOUT:
+        argv = shlex.split(command)
+    except ValueError:
+        return ''
+    for token in argv:
+        # Skip leading VAR=value assignments
+        if '=' in token and not token.startswith('='):
+            continue
+        return os.path.basename(token)
+    return ''
+
+def classify_command(command):
+    """Guess up front whether a command is interactive, without running it"""
+    name = command_name(command)
+    if name in INTERACTIVE_PROGRAMS:
         return True
-    except Exception:
-        return False
+    return command.strip() in _interactive_cache
+
+def remember_interactive(command, interactive):
+    """Remember how a command behaved so the next run can skip detection"""
+    command = command.strip()
+    if not interactive:
+        _interactive_cache.pop(command, None)
+        return
+    _interactive_cache[command] = True
+    _interactive_cache.move_to_end(command)
+    while len(_interactive_cache) > INTERACTIVE_CACHE_SIZE:
+        _interactive_cache.popitem(last=False)
 
-def handle_cd(terminal_app, command, output_text, entry_label):
-    """Handle the 'cd' command to change the current directory"""
+def looks_interactive(output):
+    """Check output for escape sequences only full-screen programs emit"""
+    return INTERACTIVE_SEQUENCES.search(output) is not None
+
+def child_pids(pid):
+    """Get the pids of all descendants of a process"""
+    pids = []
     try:
-        target_dir = command.split(' ', 1)[1].strip()
-        new_dir = os.path.abspath(
-            os.path.join(terminal_app.current_directory, target_dir)
-        )
-        os.chdir(new_dir)
-        terminal_app.current_directory = new_dir
-        output_text.insert(tk.END, f'Changed directory to {new_dir}\n')
-        output_text.see(tk.END)
-        entry_label.config(text=get_prompt(terminal_app.current_directory))
-    except Exception as e:
-        output_text.insert(tk.END, f'Error: {str(e)}\n')
-        output_text.see(tk.END)
-
-def run_interactive_command(command, output_text, current_directory):
-    """Run the interactive command in the new window"""
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            children = [int(child) for child in f.read().split()]
+    except OSError:
+        return pids
+    for child in children:
+        pids.append(child)
+        pids.extend(child_pids(child))
+    return pids
+
+def process_exists(pid):
+    """Check if a process is running, e.g. the one that created a cache file"""
     try:
-        screen = pyte.Screen(80, 24)
-        stream = pyte.ByteStream(screen)
-        child = pexpect.spawn(
-            command,
-            cwd=current_directory,
-            env={'TERM': 'xterm-256color'},
-            encoding='utf-8',
-            codec_errors='replace',
-            dimensions=(24, 80)
-        )
-        output_text.insert(tk.END, f'$ {command}\n')
-        output_text.see(tk.END)
-        while True:
-            index = child.expect([pexpect.EOF, pexpect.TIMEOUT])
-            if index == 0:
-                break
-            elif index == 1:
-                output = child.before
-                if output:
-                    try:
-                        decoded_output = output.encode(
-                            'utf-8', errors='replace'
-                        ).decode('utf-8')
-                        stream.feed(decoded_output)
-                        output_text.insert(tk.END, screen.display)
-                        output_text.see(tk.END)
-                        screen.reset()
-                    except UnicodeError:
-                        output_text.insert(tk.END, output)
-                        output_text.see(tk.END)
-        output = child.before
-        if output:
-            try:
-                decoded_output = output.encode(
-                    'utf-8', errors='replace'
-                ).decode('utf-8')
-                stream.feed(decoded_output)
-                output_text.insert(tk.END, screen.display)
-                output_text.see(tk.END)
-            except UnicodeError:
-                output_text.insert(tk.END, output)
-                output_text.see(tk.END)
-    except Exception as e:
-        output_text.insert(tk.END, f'Error: {str(e)}\n')
-        output_text.see(tk.END)
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+def stdin_path(pid):
+    """Get what a process's stdin refers to, e.g. /dev/pts/3 or pipe:[1234]"""
+    try:
+        return os.readlink(f'/proc/{pid}/fd/0')
+    except OSError:
+        return None
+
+def is_reading_stdin(pid, terminal):
+    """Check if a process or one of its descendants is blocked reading the terminal.
+
+    Only processes whose stdin is `terminal` (a PTY slave path) count, so
+    e.g. `cat` waiting on a quiet pipe in `tail -f log | cat` does not.
+    """
+    read_syscall = READ_SYSCALLS.get(os.uname().machine)
+    for process in [pid] + child_pids(pid):
+        try:
+            with open(f'/proc/{process}/syscall') as f:
+                fields = f.read().split()
+        except OSError:
+            continue
+        if len(fields) > 1 and fields[0] == read_syscall and int(fields[1], 16) == 0:
+            if stdin_path(process) == terminal:
+                return True
+    return False
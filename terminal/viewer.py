@@ -0,0 +1,91 @@
+import os
+import mmap
+
+from tkinter import Text, Scrollbar, Toplevel, Frame, Label, Button, END
+
+from sink import ENCRYPTED_SUFFIX, read_spilled
+
+
+# Bytes of the file shown at a time
+PAGE_BYTES = 256 * 1024
+
+
+class FileViewer:
+    """View a large file a page at a time through a memory map.
+
+    Encrypted spilled output is decrypted into memory instead, with cipher,
+    so its plaintext never touches the disk.
+    """
+
+    def __init__(self, root, path, style, font, cipher=None):
+        self.path = path
+        self.offset = 0
+        self._file = None
+        if path.endswith(ENCRYPTED_SUFFIX):
+            self.map = b''.join(read_spilled(path, cipher))
+            self.size = len(self.map)
+        else:
+            self._file = open(path, 'rb')
+            self.size = os.path.getsize(path)
+            self.map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+
+        self.window = Toplevel(root)
+        self.window.title(f'Output: {path}')
+        self.window.geometry('900x600')
+        self.window.protocol('WM_DELETE_WINDOW', self.close)
+
+        controls = Frame(self.window)
+        controls.pack(fill='x', padx=10, pady=(10, 0))
+        Button(controls, text='⏮ Start', command=lambda: self.show(0)).pack(side='left')
+        Button(controls, text='◀ Previous', command=self.previous_page).pack(side='left', padx=5)
+        Button(controls, text='Next ▶', command=self.next_page).pack(side='left')
+        Button(controls, text='End ⏭', command=lambda: self.show(self.size - PAGE_BYTES)).pack(side='left', padx=5)
+        self.position_label = Label(controls)
+        self.position_label.pack(side='right')
+
+        self.output_text = Text(
+            self.window,
+            wrap='none',
+            font=font,
+            bg=style['output_bg'],
+            fg=style['output_fg']
+        )
+        self.output_text.pack(fill='both', expand=True, padx=10, pady=10)
+        scrollbar = Scrollbar(self.output_text)
+        self.output_text.config(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side='right', fill='y')
+        scrollbar.config(command=self.output_text.yview)
+
+        self.show(0)
+
+    def show(self, offset):
+        """Show the page starting at the first full line after `offset`"""
+        offset = max(0, min(offset, self.size))
+        if offset:
+            newline = self.map.find(b'\n', offset)
+            offset = newline + 1 if newline != -1 else offset
+        end = min(self.size, offset + PAGE_BYTES)
+        if end < self.size:
+            newline = self.map.rfind(b'\n', offset, end)
+            end = newline + 1 if newline > offset else end
+        self.offset = offset
+        self.end = end
+        self.output_text.delete('1.0', END)
+        self.output_text.insert('1.0', self.map[offset:end].decode('utf-8', errors='replace'))
+        self.position_label.config(
+            text=f'{offset:,}–{end:,} of {self.size:,} bytes'
+        )
+
+    def next_page(self):
+        if self.end < self.size:
+            self.show(self.end - 1)
+
+    def previous_page(self):
+        self.show(self.offset - PAGE_BYTES)
+
+    def close(self):
+        if self._file is not None:
+            if self.size:
+                self.map.close()
+            self._file.close()
+        self.window.destroy()
@@ -0,0 +1,201 @@
+import os
+import time
+import signal
+import shutil
+import threading
+
+from collections import deque
+from tkinter import Frame, Label, Button, Text, END
+
+from ansi import ESCAPE
+
+
+# Shortest interval between runs
+MIN_INTERVAL = 0.1
+# Lines of output shown, and characters of a run kept
+MAX_LINES = 500
+MAX_CHARS = 256 * 1024
+# Height of the region in lines, and how often results are checked
+MAX_HEIGHT = 30
+POLL_MS = 100
+
+
+def parse_watch(arguments):
+    """(interval seconds, command) from `<interval> <cmd>`, e.g. `2 df -h` or `500ms ls`"""
+    interval, _, command = arguments.strip().partition(' ')
+    command = command.strip()
+    scale = 1
+    if interval.endswith('ms'):
+        interval, scale = interval[:-2], 0.001
+    elif interval.endswith('s'):
+        interval = interval[:-1]
+    try:
+        seconds = float(interval) * scale
+    except ValueError:
+        return None
+    if not command or seconds <= 0:
+        return None
+    return max(seconds, MIN_INTERVAL), command
+
+
+def changed_lines(old, new):
+    """Indexes of the lines of new that differ from the line at the same position in old"""
+    return [index for index, line in enumerate(new) if index >= len(old) or old[index] != line]
+
+
+class Watcher:
+    """Re-runs a command every `interval` seconds on a background thread.
+
+    Only the newest result is kept in `results` as (lines, exit code,
+    finished at); results the Tk thread has not picked up yet are replaced,
+    so a slow UI never queues up old runs.
+    """
+
+    def __init__(self, command, interval, directory, environment=None):
+        self.command = command
+        self.interval = interval
+        self.directory = directory
+        self.environment = environment
+        self.runs = 0
+        self.results = deque(maxlen=1)
+        self._process = None
+        self._stop = threading.Event()
+        self._shell = shutil.which('bash') or '/bin/sh'
+
+    def start(self):
+        threading.Thread(target=self._run, name='owl-watch', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        process = self._process
+        if process is not None:
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.results.append(self._run_once())
+            self.runs += 1
+            self._stop.wait(self.interval)
+
+    def _run_once(self):
+        import subprocess
+
+        try:
+            self._process = subprocess.Popen(
+                [self._shell, '-c', self.command],
+                cwd=self.directory,
+                env=self.environment,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+            )
+        except OSError as error:
+            return [str(error)], 127, time.time()
+        output = self._process.stdout.read(MAX_CHARS)
+        # Anything past MAX_CHARS is read and dropped so the command can finish
+        while self._process.stdout.read(MAX_CHARS):
+            pass
+        self._process.stdout.close()
+        exit_code = self._process.wait()
+        self._process = None
+        text = ESCAPE.sub('', output.decode('utf-8', 'replace')).replace('\r\n', '\n')
+        return text.rstrip('\n').split('\n')[:MAX_LINES], exit_code, time.time()
+
+
+class WatchView:
+    """A fixed region at the top of a tab showing a watched command's latest output.
+
+    Each result is compared line by line with the one shown; only lines
+    that changed are rewritten and highlighted, and a result identical to
+    the one shown causes no Tk work at all. Nothing goes to the tab's
+    scrollback, so the tab's memory stays flat however long it runs.
+    """
+
+    def __init__(self, root, tab, watcher, styles):
+        self.root = root
+        self.tab = tab
+        self.watcher = watcher
+        self.lines = []
+        self.exit_code = None
+        self._highlighted = []
+        self._scheduled = None
+
+        self.frame = styles.register(Frame(tab.frame), 'frame')
+        header = styles.register(Frame(self.frame), 'frame')
+        header.pack(fill='x')
+        self.header_label = Label(
+            header, text=f'Every {watcher.interval:g}s: {watcher.command}', font=('Arial', 10), anchor='w'
+        )
+        styles.register(self.header_label, 'label')
+        self.header_label.pack(side='left', fill='x', expand=True)
+        self.status_label = Label(header, font=('Arial', 10))
+        styles.register(self.status_label, 'label')
+        self.status_label.pack(side='left', padx=10)
+        Button(header, text='×', relief='flat', command=self.close).pack(side='right')
+
+        self.output_text = Text(
+            self.frame, wrap='none', height=1, font=styles.fonts['output'], relief='flat',
+            highlightthickness=1
+        )
+        styles.register(self.output_text, 'output')
+        self.output_text.tag_configure('watch_changed', background='#ffe08a', foreground='#000000')
+        self.output_text.pack(fill='x')
+        self.output_text.bind('<Control-c>', lambda event: self.close())
+        self.frame.pack(fill='x', padx=10, pady=(0, 5), before=tab.output_text)
+        self._scheduled = self.root.after(POLL_MS, self.poll)
+
+    def poll(self):
+        self._scheduled = None
+        results = self.watcher.results
+        if results:
+            self.show(*results.pop())
+        self._scheduled = self.root.after(POLL_MS, self.poll)
+
+    def show(self, lines, exit_code, finished_at):
+        """Rewrite the lines that differ from what is shown"""
+        if lines == self.lines and exit_code == self.exit_code:
+            return
+        output_text = self.output_text
+        for index in self._highlighted:
+            output_text.tag_remove('watch_changed', f'{index + 1}.0', f'{index + 1}.end')
+        first = not self.lines and self.exit_code is None
+        changed = changed_lines(self.lines, lines)
+        for index in changed:
+            if index < len(self.lines):
+                output_text.replace(f'{index + 1}.0', f'{index + 1}.end', lines[index], 'watch_changed')
+            else:
+                output_text.insert(END, ('\n' if index else '') + lines[index], 'watch_changed')
+        if len(lines) < len(self.lines):
+            output_text.delete(f'{max(len(lines), 1)}.end', END)
+        if first:
+            output_text.tag_remove('watch_changed', '1.0', END)
+            changed = []
+        if len(lines) != len(self.lines):
+            output_text.config(height=max(1, min(len(lines), MAX_HEIGHT)))
+        self._highlighted = changed
+        self.lines = lines
+        self.exit_code = exit_code
+        exit_text = f' · exit {exit_code}' if exit_code else ''
+        self.status_label.config(
+            text=f'{len(changed)} lines changed at {time.strftime("%H:%M:%S", time.localtime(finished_at))}'
+                 f' · run {self.watcher.runs}{exit_text}'
+        )
+
+    def close(self):
+        self.watcher.stop()
+        if self._scheduled is not None:
+            self.root.after_cancel(self._scheduled)
+            self._scheduled = None
+        self.frame.destroy()
+        if self.tab.watch is self:
+            self.tab.watch = None
+        return 'break'
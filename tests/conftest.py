@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+
+import pytest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The app imports its modules by bare name, as terminal/main.py does when run
+for path in (ROOT, os.path.join(ROOT, 'terminal')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture(autouse=True)
+def work_directory(tmp_path, monkeypatch):
+    """Run each test from a scratch directory so cache files do not land in the repo"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def session(tmp_path):
+    """A started TerminalSession in a scratch directory"""
+    from benchmarks.common import start_session
+
+    session = start_session(str(tmp_path))
+    yield session
+    session.close()
+
+
+def run(session, command, timeout=30):
+    """Execute a command and return (output, exit code) once it is done"""
+    from benchmarks.common import wait_for
+
+    output = []
+    assert session.execute(command)
+
+    def on_event(kind, payload):
+        if kind == 'output':
+            output.append(payload)
+
+    exit_code, _ = wait_for(session, 'done', timeout, on_event=on_event)
+    return ''.join(output), exit_code
+
+
+def wait_for_variables(session, timeout=30):
+    """Poll a session until it knows the shell's variables"""
+    deadline = time.monotonic() + timeout
+    while session.variables is None and time.monotonic() < deadline:
+        session.poll(64 * 1024)
+        time.sleep(0.01)
+    assert session.variables is not None
@@ -0,0 +1,37 @@
+from ansi import AnsiParser, DEFAULT_STYLE, PALETTE
+
+
+def text(spans):
+    return ''.join(span for span, _ in spans)
+
+
+def test_plain_text():
+    assert AnsiParser().feed('hello') == [('hello', None)]
+
+
+def test_sgr_styles():
+    spans = AnsiParser().feed('a\x1b[1;31mb\x1b[0mc')
+    assert spans == [('a', None), ('b', (PALETTE[1], None, True, False, False, False)), ('c', None)]
+
+
+def test_256_and_true_color():
+    parser = AnsiParser()
+    parser.feed('\x1b[38;5;196m')
+    assert parser.style[0] == '#ff0000'
+    parser.feed('\x1b[48;2;1;2;3m')
+    assert parser.style[1] == '#010203'
+    parser.feed('\x1b[m')
+    assert parser.style == DEFAULT_STYLE
+
+
+def test_other_escapes_are_dropped():
+    parser = AnsiParser()
+    assert text(parser.feed('\x1b(Ba\x1b)0b\x1b]0;title\x07c\x1b[2Kd\x1b=e')) == 'abcde'
+
+
+def test_sequence_split_across_chunks():
+    parser = AnsiParser()
+    assert text(parser.feed('a\x1b[3')) == 'a'
+    assert parser.feed('2mb') == [('b', (PALETTE[2], None, False, False, False, False))]
+    assert text(parser.feed('c\x1b(')) == 'c'
+    assert text(parser.feed('Bd')) == 'd'
@@ -0,0 +1,117 @@
+import queue
+import asyncio
+import threading
+
+import pytest
+
+from model.assistant import AssistantClient, HttpBackend, ResponseCache
+from model.stub_server import answer, handle
+
+
+@pytest.fixture
+def stub():
+    """Start the stub server on a free port; yields a function setting its delay and returning its URL"""
+    loop = asyncio.new_event_loop()
+    settings = {'delay': 0.0}
+    started = threading.Event()
+    servers = []
+
+    async def start():
+        server = await asyncio.start_server(
+            lambda reader, writer: handle(reader, writer, settings['delay']), '127.0.0.1', 0
+        )
+        servers.append(server)
+        started.set()
+
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(start(), loop)
+    assert started.wait(5)
+    port = servers[0].sockets[0].getsockname()[1]
+
+    def url(delay=0.0):
+        settings['delay'] = delay
+        return f'http://127.0.0.1:{port}/v1/stream'
+
+    yield url
+
+    async def stop():
+        servers[0].close()
+        # Connections of cancelled requests may still be streaming
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(stop(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+class Events:
+    """Collects a client's events, which arrive on its loop thread"""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+
+    def __call__(self, request_id, kind, payload):
+        self.queue.put((request_id, kind, payload))
+
+    def until_finished(self, timeout=10):
+        events = []
+        while True:
+            event = self.queue.get(timeout=timeout)
+            events.append(event)
+            if event[1] in ('done', 'error', 'cancelled'):
+                return events
+
+
+def test_streaming_and_cache_hit(stub, tmp_path):
+    path = str(tmp_path / 'responses.json')
+    events = Events()
+    client = AssistantClient(HttpBackend(stub()), ResponseCache(path), events)
+    try:
+        request_id = client.ask('why?', '/repo', 'make: *** [all] Error 1\n')
+        received = events.until_finished()
+        tokens = [payload for _, kind, payload in received if kind == 'token']
+        assert len(tokens) > 1
+        assert ''.join(tokens) == answer('why?', '/repo', 'make: *** [all] Error 1\n')
+        assert received[-1] == (request_id, 'done', False)
+
+        # The same question about the same output is answered from the cache in one piece
+        request_id = client.ask('why?', '/repo', 'make: *** [all] Error 1\n')
+        assert events.until_finished() == [
+            (request_id, 'token', ''.join(tokens)), (request_id, 'done', True)
+        ]
+    finally:
+        client.close()
+    assert len(ResponseCache(path)._entries) == 1
+
+
+def test_cancellation(stub, tmp_path):
+    events = Events()
+    cache = ResponseCache(str(tmp_path / 'responses.json'))
+    client = AssistantClient(HttpBackend(stub(delay=0.2)), cache, events)
+    try:
+        request_id = client.ask('why?', '/repo', '')
+        assert events.queue.get(timeout=10)[1] == 'token'
+        client.cancel(request_id)
+        received = events.until_finished()
+        assert received[-1] == (request_id, 'cancelled', None)
+        assert all(kind != 'done' for _, kind, _ in received)
+    finally:
+        client.close()
+    assert not cache._entries
+
+
+def test_backend_error(tmp_path):
+    events = Events()
+    cache = ResponseCache(str(tmp_path / 'responses.json'))
+    # Nothing listens on port 9 (discard) here
+    client = AssistantClient(HttpBackend('http://127.0.0.1:9/v1/stream'), cache, events)
+    try:
+        client.ask('why?', '/repo', '')
+        assert events.until_finished()[-1][1] == 'error'
+    finally:
+        client.close()
@@ -0,0 +1,55 @@
+from engine import TerminalSession
+from shell_builtins import run_builtin
+from conftest import run, wait_for_variables
+
+
+def test_builtins(session, tmp_path):
+    (tmp_path / 'sub').mkdir()
+    wait_for_variables(session)
+    assert run(session, 'cd sub') == ('', 0)
+    assert session.current_directory == str(tmp_path / 'sub')
+    assert run(session, 'pwd') == (f'{tmp_path / "sub"}\n', 0)
+    output, exit_code = run(session, 'cd missing')
+    assert exit_code == 1 and 'No such file or directory' in output
+    # The shell follows the in-process cd
+    assert run(session, '/bin/pwd') == (f'{tmp_path / "sub"}\n', 0)
+
+
+def test_builtins_without_variables(tmp_path):
+    session = TerminalSession(str(tmp_path))
+    try:
+        assert session.variables is None
+        # Commands that need the shell's variables go to the shell
+        for command in ('cd', 'dirs', 'pushd /', 'popd', 'echo $HOME', 'cd ~'):
+            assert run_builtin(session, command) is None
+        assert run_builtin(session, 'pwd') == (f'{tmp_path}\n', 0)
+    finally:
+        session.close()
+
+
+def test_builtins_leave_bash_behavior_to_the_shell(session, tmp_path):
+    (tmp_path / 'sub').mkdir()
+    wait_for_variables(session)
+    for command in (
+        'cd sub other', 'cd -P sub', 'pwd -P', 'dirs -v', 'pushd +1', 'popd -n',
+        'export -p', 'export -n HOME', 'unset -f fn', 'history -c', 'history 1 2',
+        'clear -x', 'exit 3',
+    ):
+        assert run_builtin(session, command) is None, command
+    assert run_builtin(session, 'cd -') is not None
+    # cd and pushd could search CDPATH
+    session.variables['CDPATH'] = str(tmp_path)
+    assert run_builtin(session, 'cd sub') is None
+    assert run_builtin(session, 'pushd sub') is None
+    assert run_builtin(session, 'unset CDPATH') == ('', 0)
+    assert run_builtin(session, 'cd sub') == ('', 0)
+
+
+def test_unset_function_runs_in_the_shell(session):
+    wait_for_variables(session)
+    run(session, 'fn() { echo from fn; }')
+    run(session, 'fn=value')
+    assert run(session, 'unset -f fn') == ('', 0)
+    output, exit_code = run(session, 'fn')
+    assert exit_code == 127
+    assert run(session, 'echo $fn') == ('value\n', 0)
@@ -0,0 +1,51 @@
+import time
+
+from completion import Completer, common_prefix
+
+
+def complete(completer, line, directory, timeout=10):
+    """Complete line, waiting while the directory listing loads"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = completer.complete(line, directory)
+        if result is not None:
+            return result
+        time.sleep(0.01)
+    raise TimeoutError(line)
+
+
+def test_commands(tmp_path):
+    program = tmp_path / 'owl-test-program'
+    program.write_text('#!/bin/sh\n')
+    program.chmod(0o755)
+    completer = Completer(str(tmp_path))
+    # PATH is listed in the background; until then no commands are offered
+    deadline = time.monotonic() + 10
+    while not completer.path_index.names and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert complete(completer, 'owl-te', str(tmp_path)) == (0, ['owl-test-program'])
+    assert 'cd' in complete(completer, 'c', str(tmp_path))[1]
+
+
+def test_paths(tmp_path):
+    (tmp_path / 'src').mkdir()
+    (tmp_path / 'setup.py').write_text('')
+    (tmp_path / 'my file').write_text('')
+    (tmp_path / '.hidden').write_text('')
+    completer = Completer('')
+    directory = str(tmp_path)
+    assert complete(completer, 'ls s', directory) == (3, ['setup.py', 'src/'])
+    assert complete(completer, 'ls my', directory) == (3, ['my\\ file'])
+    assert complete(completer, 'ls .h', directory) == (3, ['.hidden'])
+    assert complete(completer, f'cat {directory}/sr', '/') == (4, [f'{directory}/src/'])
+
+
+def test_flags_and_subcommands(tmp_path):
+    completer = Completer('')
+    assert complete(completer, 'ls -l', str(tmp_path)) == (3, ['-l'])
+    assert complete(completer, 'git sta', str(tmp_path)) == (4, ['stash', 'status'])
+
+
+def test_common_prefix():
+    assert common_prefix(['stash', 'status']) == 'sta'
+    assert common_prefix([]) == ''
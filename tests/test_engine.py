@@ -0,0 +1,14 @@
+from conftest import run
+
+
+def test_execute(session):
+    output, exit_code = run(session, 'echo hello; false')
+    assert output.strip() == 'hello'
+    assert exit_code == 1
+    assert session.history == ['echo hello; false']
+
+
+def test_directory_follows_the_shell(session, tmp_path):
+    (tmp_path / 'sub').mkdir()
+    run(session, 'builtin cd sub')
+    assert session.current_directory == str(tmp_path / 'sub')
@@ -0,0 +1,47 @@
+import time
+
+from find import FindWorker, CANCELLED, compile_query
+from scrollback import LineIndex
+
+
+def live(*lines):
+    index = LineIndex()
+    index.append(''.join(line + '\n' for line in lines))
+    return index.snapshot()
+
+
+def wait(worker, search_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = worker.take(search_id)
+        if result is not None:
+            return result
+        time.sleep(0.005)
+    raise TimeoutError(search_id)
+
+
+def test_results_are_kept_per_search():
+    worker = FindWorker()
+    segments = {'old': 'error in segment\nfine\n'}
+    first = worker.submit(compile_query('error'), ['old'], live('no error here'), segments.get)
+    matches, complete = wait(worker, first)
+    assert complete
+    assert [(match.segment, match.line) for match in matches] == [(0, 0), (None, 0)]
+    # Another tab's search does not take this one's result
+    second = worker.submit(compile_query('fine'), [], live('fine'), segments.get)
+    assert worker.take(first) is None
+    assert len(wait(worker, second)[0]) == 1
+
+
+def test_superseded_search_is_cancelled():
+    worker = FindWorker()
+
+    def slow_read(path):
+        time.sleep(0.05)
+        return 'match\n' * 10
+
+    first = worker.submit(compile_query('match'), [f'{n}' for n in range(20)], live(), slow_read)
+    time.sleep(0.02)
+    second = worker.submit(compile_query('match'), [], live('match'), slow_read)
+    assert wait(worker, first) == CANCELLED
+    assert len(wait(worker, second)[0]) == 1
@@ -0,0 +1,48 @@
+import time
+
+from cryptography.fernet import Fernet
+
+from history import HistoryStore
+
+
+def test_store_round_trip(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.append('ls', '/tmp', 1.0)
+    store.append('pwd', '/', 2.0)
+    assert list(store.records()) == [(1.0, '/tmp', 'ls'), (2.0, '/', 'pwd')]
+    assert store.last_timestamp == 2.0
+    store.close()
+
+
+def test_store_reads_encrypted_records_with_encryption_off(tmp_path):
+    cipher = Fernet(Fernet.generate_key())
+    store = HistoryStore(str(tmp_path), cipher)
+    store.append('secret', '/', 1.0)
+    store.close()
+    with open(store.segments()[0]) as f:
+        assert 'secret' not in f.read()
+
+    unkeyed = HistoryStore(str(tmp_path))
+    assert list(unkeyed.records()) == []
+    assert unkeyed.unreadable == 1
+    keyed = HistoryStore(str(tmp_path), load_cipher=lambda: cipher)
+    assert list(keyed.records()) == [(1.0, '/', 'secret')]
+    assert keyed.unreadable == 0
+
+
+def test_compaction_waits_for_readers(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    now = time.time()
+    store.ttl = 60
+    store.segment_seconds = 1
+    store.append('old', '/', now - 1000)
+    store.append('older than a minute', '/', now - 500)
+    store.append('new', '/', now)
+    reader = store.records()
+    assert next(reader)[2] == 'new'
+    store.compact()
+    assert len(store.segments()) == 3
+    reader.close()
+    store.compact()
+    assert len(store.segments()) == 2
+    store.close()
@@ -0,0 +1,27 @@
+from history_index import HistoryIndex
+
+
+def test_index_search_and_recent():
+    index = HistoryIndex()
+    index.build([(1.0, '/', 'git status'), (2.0, '/', 'ls -la'), (3.0, '/', 'git stash')])
+    assert index.ready and len(index) == 3
+    assert set(index.search('git st')) == {'git status', 'git stash'}
+    assert index.search('gsus') == ['git status']
+    index.add('git status', '/')
+    assert len(index) == 3
+    assert list(index.recent('git')) == ['git status', 'git stash']
+    assert list(index.recent()) == ['git status', 'git stash', 'ls -la']
+
+
+def test_build_keeps_commands_added_meanwhile_newest():
+    index = HistoryIndex()
+    # Typed while the background build was still reading history
+    index.add('make test', '/src', timestamp=100.0)
+    index.add('git log', '/src', timestamp=101.0)
+    index.build([(1.0, '/', 'git log'), (2.0, '/', 'ls'), (3.0, '/', 'make')])
+    assert len(index) == 4
+    assert list(index.recent()) == ['git log', 'make test', 'make', 'ls']
+    assert list(index.recent('make')) == ['make test', 'make']
+    entry = index._entries[index._ids['git log']]
+    assert entry.count == 2 and entry.last_used == 101.0
+    assert set(entry.directories) == {'/', '/src'}
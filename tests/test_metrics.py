@@ -0,0 +1,47 @@
+import os
+import json
+
+from metrics import CommandTiming, MetricsRecorder
+
+
+def timing(command):
+    timing = CommandTiming(command, '/secret/project')
+    timing.end = timing.start + 0.01
+    timing.exit_code = 0
+    return timing
+
+
+def read_log(recorder):
+    with open(recorder.jsonl_path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_command_log(tmp_path):
+    recorder = MetricsRecorder(str(tmp_path))
+    recorder.record_command(timing('make'))
+    recorder.close()
+    assert [record['command'] for record in read_log(recorder)] == ['make']
+    assert os.path.exists(recorder.textfile_path)
+
+
+def test_command_text_left_out_and_forgotten(tmp_path):
+    recorder = MetricsRecorder(str(tmp_path))
+    recorder.record_command(timing('make'))
+    recorder.flush()
+    recorder.forget_commands()
+    recorder.log_command_text = False
+    recorder.record_command(timing('ls secrets'))
+    recorder.close()
+    records = read_log(recorder)
+    assert len(records) == 1
+    assert 'command' not in records[0] and 'cwd' not in records[0]
+    assert records[0]['total_ms'] == 10.0
+
+
+def test_disabled_log(tmp_path):
+    recorder = MetricsRecorder(str(tmp_path))
+    recorder.log_commands = False
+    recorder.record_command(timing('make'))
+    recorder.close()
+    assert not os.path.exists(recorder.jsonl_path)
+    assert recorder.commands == 1
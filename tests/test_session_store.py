@@ -0,0 +1,45 @@
+from cryptography.fernet import Fernet
+
+from session_store import SessionStore
+
+
+def tab(output, tab_id='tab-1'):
+    return {
+        'id': tab_id, 'title': 'Tab', 'cwd': '/', 'environment': {}, 'directory_stack': [],
+        'previous_directory': None, 'reset': False, 'output': output,
+    }
+
+
+def test_round_trip(tmp_path):
+    store = SessionStore(str(tmp_path))
+    store.save([tab('one\n')])
+    store.save([tab('two\n')])
+    loaded = SessionStore(str(tmp_path))
+    assert [saved['id'] for saved in loaded.load()] == ['tab-1']
+    assert loaded.load_scrollback('tab-1') == 'one\ntwo\n'
+
+
+def test_encryption_toggled_between_saves(tmp_path):
+    cipher = Fernet(Fernet.generate_key())
+    store = SessionStore(str(tmp_path), cipher)
+    store.save([tab('secret\n')])
+    store.cipher = None
+    store.save([tab('plain\n')])
+
+    keyed = SessionStore(str(tmp_path), load_cipher=lambda: cipher)
+    assert len(keyed.load()) == 1
+    assert keyed.load_scrollback('tab-1') == 'secret\nplain\n'
+    assert keyed.unreadable == 0
+
+    # Saved with encryption on, loaded with it off and the key available
+    encrypted = SessionStore(str(tmp_path), cipher)
+    encrypted.save([tab('more\n')])
+    assert SessionStore(str(tmp_path), load_cipher=lambda: cipher).load()
+
+
+def test_missing_key_is_counted(tmp_path):
+    store = SessionStore(str(tmp_path), Fernet(Fernet.generate_key()))
+    store.save([tab('secret\n')])
+    unkeyed = SessionStore(str(tmp_path))
+    assert unkeyed.load() == []
+    assert unkeyed.unreadable == 1
@@ -0,0 +1,30 @@
+import time
+
+from benchmarks.common import POLL_BUDGET_CHARS
+
+
+def run_collecting(session, command, send=None, timeout=30):
+    """Execute a command and return the kinds of the events it produced"""
+    assert session.execute(command)
+    kinds = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for kind, _ in session.poll(POLL_BUDGET_CHARS):
+            kinds.append(kind)
+            if kind == 'interactive' and send is not None:
+                session.send(send)
+            if kind == 'done':
+                return kinds
+        time.sleep(0.01)
+    raise TimeoutError(command)
+
+
+def test_quiet_pipeline_is_not_interactive(session):
+    # cat is blocked reading its pipe, not the terminal, well past the quiet period
+    kinds = run_collecting(session, 'sleep 1 | cat')
+    assert 'interactive' not in kinds
+
+
+def test_terminal_read_is_interactive(session):
+    kinds = run_collecting(session, 'head -n 1', send='line\n')
+    assert 'interactive' in kinds
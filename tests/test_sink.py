@@ -0,0 +1,81 @@
+import os
+
+from sink import OutputSink, HIGH_WATER_CHARS, LOW_WATER_CHARS
+
+
+def test_backpressure():
+    calls = []
+    sink = OutputSink(calls.append)
+    chunk = 'x' * 64 * 1024
+    while sink.pending_chars <= HIGH_WATER_CHARS:
+        sink.push('output', chunk)
+    assert sink.paused and calls == [True]
+    sink.push('output', chunk)
+    assert calls == [True]
+    while sink.pending_chars >= LOW_WATER_CHARS:
+        assert sink.paused
+        sink.drain(64 * 1024)
+    assert not sink.paused and calls == [True, False]
+
+
+def test_drain_budget():
+    sink = OutputSink(lambda paused: None)
+    sink.push('output', 'abcdef')
+    sink.push('done', (0, '/'))
+    assert sink.drain(4) == [('output', 'abcd')]
+    assert sink.drain(100) == [('output', 'ef'), ('done', (0, '/'))]
+    assert sink.pending_chars == 0
+
+
+def test_truncation_keeps_head_and_tail():
+    sink = OutputSink(lambda paused: None, truncate_chars=100, tail_chars=20)
+    sink.push('output', 'a' * 100)
+    for number in range(50):
+        sink.push('output', f'line {number}\n')
+    sink.push('done', (0, '/'))
+    events = sink.drain(10 ** 6)
+    kinds = [kind for kind, _ in events]
+    assert kinds == ['output', 'output', 'truncated', 'output', 'done']
+    path, size = events[2][1]
+    assert os.path.getsize(path) == size
+    assert events[3][1].endswith('line 49\n') and len(events[3][1]) <= 20
+    sink.close()
+
+
+def spill(sink, lines=50):
+    sink.push('output', 'a' * 100)
+    for number in range(lines):
+        sink.push('output', f'line {number}\n')
+    sink.push('done', (0, '/'))
+    return [payload for kind, payload in sink.drain(10 ** 6) if kind == 'truncated'][0]
+
+
+def test_encrypted_spill_and_close_deletes_it():
+    from cryptography.fernet import Fernet
+    from sink import read_spilled
+
+    cipher = Fernet(Fernet.generate_key())
+    sink = OutputSink(lambda paused: None, truncate_chars=100, tail_chars=20)
+    sink.cipher = cipher
+    path, size = spill(sink)
+    with open(path, 'rb') as f:
+        assert b'line 49' not in f.read()
+    text = b''.join(read_spilled(path, cipher))
+    assert len(text) == size and text.endswith(b'line 49\n')
+    sink.close()
+    assert not os.path.exists(path)
+
+
+def test_sweep_deletes_leftovers_of_dead_processes():
+    from cache import get_cache_directory
+    from sink import sweep_output
+
+    directory = get_cache_directory('output')
+    leftover = os.path.join(directory, '999999999-dead.log')
+    open(leftover, 'w').close()
+    sink = OutputSink(lambda paused: None, truncate_chars=100, tail_chars=20)
+    path, _ = spill(sink)
+    sweep_output()
+    assert not os.path.exists(leftover)
+    assert os.path.exists(path)
+    sink.close()
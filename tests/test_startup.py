@@ -0,0 +1,45 @@
+import json
+import statistics
+
+import pytest
+
+from benchmarks import bench_startup
+
+
+def test_import_within_budget():
+    """terminal_app imports within budget and leaves the deferred modules unloaded"""
+    samples = []
+    for _ in range(3):
+        elapsed, loaded = json.loads(bench_startup.python(bench_startup.IMPORT_SCRIPT).stdout)
+        assert loaded == []
+        samples.append(elapsed)
+    assert statistics.median(samples) <= bench_startup.BUDGETS['startup_import_ms']
+
+
+CONSTRUCT_SCRIPT = '''
+import sys, json, tkinter
+try:
+    root = tkinter.Tk()
+except tkinter.TclError as error:
+    print(json.dumps({'skip': str(error)}))
+    sys.exit()
+import terminal_app
+app = terminal_app.TerminalApp(root)
+constructed = 'cryptography' in sys.modules
+root.update()
+print(json.dumps({'constructed': constructed, 'encrypt_cache': app.encrypt_cache, 'tabs': len(app.tabs)}))
+app.quit()
+'''
+
+
+def test_construct_without_cryptography(tmp_path):
+    """Saved settings are decrypted after the first frame, not while the app is built"""
+    from cache import get_cipher
+
+    settings = get_cipher().encrypt(json.dumps({'encrypt_cache': True}).encode())
+    with open(tmp_path / '.secret_owl' / 'secure_settings.enc', 'wb') as f:
+        f.write(settings)
+    result = json.loads(bench_startup.python(CONSTRUCT_SCRIPT).stdout)
+    if 'skip' in result:
+        pytest.skip(f'Tk cannot start: {result["skip"]}')
+    assert result == {'constructed': False, 'encrypt_cache': True, 'tabs': 1}
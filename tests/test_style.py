@@ -0,0 +1,32 @@
+import tkinter
+
+import pytest
+
+from cache import load_preferences, save_preferences
+from themes import themes
+
+
+def test_preferences_round_trip(work_directory):
+    assert load_preferences() == {}
+    save_preferences({'theme': 'matrix'})
+    assert load_preferences() == {'theme': 'matrix'}
+    (work_directory / '.secret_owl' / 'preferences.json').write_text('not json')
+    assert load_preferences() == {}
+
+
+def test_theme_change_restyles_chrome():
+    from style import StyleRegistry
+
+    try:
+        root = tkinter.Tk()
+    except tkinter.TclError as error:
+        pytest.skip(f'Tk cannot start: {error}')
+    try:
+        styles = StyleRegistry(root, themes, 'original-dark')
+        assert root.cget('bg') == themes['original-dark']['bg']
+        assert styles.set_theme('matrix') == 'matrix'
+        assert root.cget('bg') == themes['matrix']['bg']
+        assert styles.ttk_style.lookup('Bar.TFrame', 'background') == themes['matrix']['entry_bg']
+        assert styles.set_theme('no-such-theme') == 'original-light'
+    finally:
+        root.destroy()
@@ -0,0 +1,41 @@
+from model.suggest import CommandModel
+
+
+RECORDS = [
+    (1.0, '/repo', 'git status'),
+    (2.0, '/repo', 'git diff'),
+    (3.0, '/repo', 'git status'),
+    (4.0, '/repo', 'git diff'),
+]
+
+
+def test_predict():
+    model = CommandModel()
+    model.train(RECORDS)
+    assert model.predict('', '/repo', 'git status') == 'git diff'
+    assert model.predict('git s', '/repo') == 'tatus'
+    assert model.predict('nothing like it', '/repo') == ''
+
+
+def test_save_load_and_train_without_double_counting(tmp_path):
+    path = str(tmp_path / 'suggestions.snap')
+    model = CommandModel()
+    model.train(RECORDS[:2])
+    model.save(path)
+
+    loaded = CommandModel.load(path)
+    assert loaded.trained_until == 2.0
+    # Training on the whole history again only learns the newer records
+    loaded.train(RECORDS)
+    assert loaded.learned == 2
+
+    fresh = CommandModel()
+    fresh.train(RECORDS)
+    assert loaded._followers == fresh._followers
+
+
+def test_learn_with_timestamp_is_not_retrained(tmp_path):
+    model = CommandModel()
+    model.learn('make', '/repo', None, 5.0)
+    model.train([(5.0, '/repo', 'make')])
+    assert model.learned == 1
@@ -0,0 +1,17 @@
+from watch import parse_watch, changed_lines, MIN_INTERVAL
+
+
+def test_parse_watch():
+    assert parse_watch('2 df -h') == (2.0, 'df -h')
+    assert parse_watch('1.5s ls') == (1.5, 'ls')
+    assert parse_watch('500ms ls') == (0.5, 'ls')
+    assert parse_watch('1ms ls') == (MIN_INTERVAL, 'ls')
+    assert parse_watch('2') is None
+    assert parse_watch('0 ls') is None
+    assert parse_watch('soon ls') is None
+
+
+def test_changed_lines():
+    assert changed_lines([], ['a', 'b']) == [0, 1]
+    assert changed_lines(['a', 'b'], ['a', 'c', 'd']) == [1, 2]
+    assert changed_lines(['a', 'b', 'c'], ['a']) == []